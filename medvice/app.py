@@ -1,67 +1,17 @@
 from flask import Flask, render_template, request, redirect, url_for, Blueprint, session
-import sqlite3
+from user_repository import user_repository, public_user
 app = Blueprint('app',__name__)
 
-def get_user_id_from_tc(tc_no):
-    conn = sqlite3.connect(r'C:\\Users\\melis\\YZTA_m\\medvica\\yzta_team_forty\\medvice\\db\\db.db')
-    cursor = conn.cursor()
-    
-    query = "SELECT id FROM user WHERE tc_no = ?"
-    cursor.execute(query, (tc_no,))
-    row = cursor.fetchone()
-    conn.close()
-    
-    if row:
-        return {
-            "id": row[0]
-        }
-    return None
-
-def get_user_from_id(user_id):
-    conn = sqlite3.connect(r'C:\\Users\\melis\\YZTA_m\\medvica\\yzta_team_forty\\medvice\\db\\db.db')
-    cursor = conn.cursor()
-    
-    query = "SELECT name, tc_no, password FROM user WHERE tc_no = ?"
-    cursor.execute(query, (user_id,))
-    row = cursor.fetchone()
-    conn.close()
-    
-    if row:
-        return {
-            "name":  row[0],
-            "tc_no":  row[1],
-            "password":  row[2]
-        }
-    return None
-
-def get_user_from_name(name):
-    conn = sqlite3.connect(r'C:\\Users\\melis\\YZTA_m\\medvica\\yzta_team_forty\\medvice\\db\\db.db')
-    cursor = conn.cursor()
-    
-    query = "SELECT id, name, tc_no, password FROM user WHERE name = ?"
-    cursor.execute(query, (name,))
-    row = cursor.fetchone()
-    conn.close()
-    
-    if row:
-        return {
-            "id": row[0],
-            "name":  row[1],
-            "tc_no":  row[2],
-            "password":  row[3]
-        }
-    return None
-
-
 @app.route("/login", methods=["GET", "POST"])
 def login():
     error = None
     if request.method == "POST":
         username = request.form["username"]
         password = request.form["password"]
-        user = get_user_from_name(username)
-        if username == user.get('name') and user.get('password')  == password:
-            return redirect(url_for("welcome", username=username))
+        user = user_repository.by_name(username)
+        if user and user['password'] == password:
+            session['user'] = public_user(user)
+            return redirect(url_for("app.welcome", username=username, user_id=user['id']))
         else:
             error = "❌ Kullanıcı adı veya şifre hatalı."
     return render_template("login.html", error=error)
@@ -69,13 +19,8 @@ def login():
 '''
 DÜZENLENECEK
 def get_test_with_id(user_id):
-    conn = sqlite3.connect(r'C:\\Users\\melis\\YZTA_m\\medvica\\yzta_team_forty\\medvice\\db\\db.db')
-    cursor = conn.cursor()
-    
     query = "SELECT id, name, tc_no, password FROM user WHERE name = ?"
-    cursor.execute(query, (name,))
-    row = cursor.fetchone()
-    conn.close()
+    row = query_one(query, (name,))
     
     if row:
         return {
@@ -1,32 +1,100 @@
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for
+from flask import Blueprint, Response, render_template, request, jsonify, redirect, url_for, session
 from flask_sqlalchemy import SQLAlchemy
-import sqlite3
 from datetime import datetime, timedelta
+import hashlib
 import json
 import os
-import random  # Bu satırı ekleyin
+import time
+from metrics import timed_query
+from data_access import query_one, query_all
+from schedule import schedule_engine, first_free_slots_for_department
+from directory import clinic_directory, TYPE_ORDER, TYPEAHEAD_LIMIT
+from reservations import reservation_service, InvalidBooking, SlotInPast, SlotUnavailable, HoldExpired
+from dashboard_page import invalidate_dashboard
+from geo import NEAREST_LIMIT, parse_location
+from response_cache import ResponseCache
 
-def get_db_path():
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    return os.path.join(current_dir, "db", "db.db")
-    
 appointment_page = Blueprint('appointment_page', __name__)
 
+# Bölüm / hastane / doktor listeleri: gövdeler dizin sürümüne bağlı önbellekte, güçlü ETag ile
+directory_responses = ResponseCache('directory_response', lambda: clinic_directory.snapshot().version)
+
+# ---------- Veri erişimi (süreleri timed_query ile ölçülür) ----------
+
+@timed_query
+def load_departments():
+    return query_all('SELECT id, name, icon FROM department ORDER BY name')
+
+
+@timed_query
+def load_department_hospitals(department_id):
+    """Bölümde doktoru olan hastaneler (puana göre); bölüm yoksa None.
+
+    rating TEXT sütunda; konumlu yanıttaki (dizin anlık görüntüsü) gibi sayı dönsün diye REAL'e çevrilir.
+    """
+    if not query_one('SELECT name FROM department WHERE id = ?', (department_id,)):
+        return None
+    return query_all('''
+        SELECT DISTINCT h.id, h.name, h.location, h.distance, CAST(h.rating AS REAL) AS rating
+        FROM hospital h
+        JOIN doctor d ON h.id = d.hospital_id
+        WHERE d.department_id = ? AND d.hospital_id IS NOT NULL
+        ORDER BY CAST(h.rating AS REAL) DESC
+    ''', (department_id,))
+
+
+@timed_query
+def load_all_hospitals():
+    return query_all('SELECT id, name, location, distance, CAST(rating AS REAL) AS rating FROM hospital '
+                     'ORDER BY CAST(rating AS REAL) DESC')
+
+
+@timed_query
+def load_doctors(department_id, hospital_id):
+    return query_all('''
+        SELECT d.id, d.name, d.experience, d.rating
+        FROM doctor d
+        WHERE d.department_id = ? AND d.hospital_id = ?
+        ORDER BY d.rating DESC
+    ''', (department_id, hospital_id))
+
+
+@timed_query
+def load_department_doctors(department_id, limit=5):
+    """Bölümün diğer hastanelerdeki en yüksek puanlı doktorları"""
+    return query_all('''
+        SELECT d.id, d.name, d.experience, d.rating, h.name as hospital_name
+        FROM doctor d
+        JOIN hospital h ON d.hospital_id = h.id
+        WHERE d.department_id = ?
+        ORDER BY d.rating DESC
+        LIMIT ?
+    ''', (department_id, limit))
+
+
+@timed_query
+def load_appointment(appointment_id):
+    return query_one('''
+        SELECT a.*, d.name as department_name, d.icon as department_icon,
+               h.name as hospital_name, h.location as hospital_location,
+               doc.name as doctor_name
+        FROM appointments a
+        JOIN department d ON a.department_id = d.id
+        JOIN hospital h ON a.hospital_id = h.id
+        JOIN doctor doc ON a.doctor_id = doc.id
+        WHERE a.id = ?
+    ''', (appointment_id,))
+
+
 @appointment_page.route('/appointment')  # Route decorator ekleyin
 def appointment():
     return render_template('appointment.html')
 
-def get_db_connection():
-    conn = sqlite3.connect(get_db_path())
-    conn.row_factory = sqlite3.Row  # Dict-like erişim için
-    return conn
-
 # Tüm poliklinikleri getir
 @appointment_page.route('/api/departments')
+@directory_responses.cached
 def get_departments():
-    conn = get_db_connection()
-    departments = conn.execute('SELECT id, name, icon FROM department ORDER BY name').fetchall()
-    conn.close()
+    departments = load_departments()
     
     return jsonify([{
         'id': dept['id'],
@@ -34,28 +102,47 @@ def get_departments():
         'icon': dept['icon']
     } for dept in departments])
 
+# Bölüm / hastane / doktor araması (bellek içi indeks, dizin sürümü değişince yenilenir)
+@appointment_page.route('/api/directory/search')
+def search_directory():
+    text = request.args.get('q', '')
+    types = [t for t in request.args.get('types', '').split(',') if t in TYPE_ORDER] or None
+    limit = min(max(request.args.get('limit', TYPEAHEAD_LIMIT, type=int), 1), 50)
+    snapshot = clinic_directory.snapshot()
+    return jsonify({
+        'query': text,
+        'version': snapshot.version,
+        'results': snapshot.typeahead().search(text, types, limit),
+    })
+
 # Seçilen poliklinikle ilgili hastaneleri getir
 @appointment_page.route('/api/hospitals/<department_id>')  # <int:department_id> yerine <department_id>
+@directory_responses.cached
 def get_hospitals_by_department(department_id):
-    conn = get_db_connection()
+    # Konum verildiyse (?lat=&lon=&limit=) uzamsal indeksten en yakın hastaneler
+    location = parse_location(request.args.get('lat'), request.args.get('lon'))
+    if location:
+        directory = clinic_directory.snapshot()
+        if department_id not in directory.departments:
+            return jsonify({'error': 'Poliklinik bulunamadı'}), 404
+        limit = min(max(request.args.get('limit', NEAREST_LIMIT, type=int), 1), 50)
+        # Bölümde hastane yoksa aşağıdaki geçici çözümdeki gibi tüm hastaneler
+        hospitals = directory.nearest_hospitals(department_id, location, limit) \
+            or directory.nearest_hospitals(None, location, limit)
+        return jsonify([{
+            'id': hospital['id'],
+            'name': hospital['name'],
+            'location': hospital['address'] or 'Merkez',
+            'distance': hospital['distance'] or '1 km',
+            'distance_km': hospital.get('distance_km'),
+            'rating': hospital['rating'],
+        } for hospital in hospitals])
     
     try:
-        # Önce poliklinik var mı kontrol et
-        dept_check = conn.execute('SELECT name FROM department WHERE id = ?', (department_id,)).fetchone()
-        if not dept_check:
-            conn.close()
-            return jsonify({'error': 'Poliklinik bulunamadı'}), 404
-        
         # Doktor tablosundan, seçilen poliklinikteki doktorların bulunduğu hastaneleri getir
-        query = '''
-            SELECT DISTINCT h.id, h.name, h.location, h.distance, h.rating
-            FROM hospital h
-            JOIN doctor d ON h.id = d.hospital_id
-            WHERE d.department_id = ? AND d.hospital_id IS NOT NULL
-            ORDER BY h.rating DESC
-        '''
-        
-        hospitals = conn.execute(query, (department_id,)).fetchall()
+        hospitals = load_department_hospitals(department_id)
+        if hospitals is None:
+            return jsonify({'error': 'Poliklinik bulunamadı'}), 404
         
         # Debug için log ekle
         print(f"Department ID: {department_id}, Found hospitals: {len(hospitals)}")
@@ -63,8 +150,7 @@ def get_hospitals_by_department(department_id):
         # Eğer hiç hastane bulunamazsa, tüm hastaneleri döndür (geçici çözüm)
         if len(hospitals) == 0:
             print("No hospitals found for department, returning all hospitals")
-            all_hospitals = conn.execute('SELECT id, name, location, distance, rating FROM hospital ORDER BY rating DESC').fetchall()
-            conn.close()
+            all_hospitals = load_all_hospitals()
             return jsonify([{
                 'id': hospital['id'],
                 'name': hospital['name'],
@@ -73,8 +159,6 @@ def get_hospitals_by_department(department_id):
                 'rating': hospital['rating'] if hospital['rating'] else 4.5
             } for hospital in all_hospitals])
         
-        conn.close()
-        
         return jsonify([{
             'id': hospital['id'],
             'name': hospital['name'],
@@ -84,23 +168,14 @@ def get_hospitals_by_department(department_id):
         } for hospital in hospitals])
         
     except Exception as e:
-        conn.close()
         print(f"Error in get_hospitals_by_department: {str(e)}")
         return jsonify({'error': 'Hastaneler yüklenirken hata oluştu'}), 500
 
 # Seçilen hastane ve poliklinikle ilgili doktorları getir
 @appointment_page.route('/api/doctors/<department_id>/<int:hospital_id>')  # department_id string
+@directory_responses.cached
 def get_doctors(department_id, hospital_id):
-    conn = get_db_connection()
-    
-    query = '''
-        SELECT d.id, d.name, d.experience, d.rating
-        FROM doctor d
-        WHERE d.department_id = ? AND d.hospital_id = ?
-        ORDER BY d.rating DESC
-    '''
-    
-    doctors = conn.execute(query, (department_id, hospital_id)).fetchall()
+    doctors = load_doctors(department_id, hospital_id)
     
     print(f"Looking for doctors - Department: {department_id}, Hospital: {hospital_id}")
     print(f"Found doctors: {len(doctors)}")
@@ -108,19 +183,10 @@ def get_doctors(department_id, hospital_id):
     # Eğer bu kombinasyonda doktor yoksa, aynı departmandaki diğer doktorları döndür
     if len(doctors) == 0:
         print("No doctors found for this hospital, trying other hospitals...")
-        alternative_query = '''
-            SELECT d.id, d.name, d.experience, d.rating, h.name as hospital_name
-            FROM doctor d
-            JOIN hospital h ON d.hospital_id = h.id
-            WHERE d.department_id = ?
-            ORDER BY d.rating DESC
-            LIMIT 5
-        '''
-        alt_doctors = conn.execute(alternative_query, (department_id,)).fetchall()
+        alt_doctors = load_department_doctors(department_id)
         print(f"Alternative doctors found: {len(alt_doctors)}")
         
         if len(alt_doctors) > 0:
-            conn.close()
             return jsonify([{
                 'id': doctor['id'],
                 'name': f"{doctor['name']} ({doctor['hospital_name']})",
@@ -128,8 +194,6 @@ def get_doctors(department_id, hospital_id):
                 'rating': doctor['rating']
             } for doctor in alt_doctors])
     
-    conn.close()
-    
     return jsonify([{
         'id': doctor['id'],
         'name': doctor['name'],
@@ -140,128 +204,152 @@ def get_doctors(department_id, hospital_id):
 # Müsait randevu saatlerini getir
 @appointment_page.route('/api/available-times/<int:doctor_id>/<date>')
 def get_available_times(doctor_id, date):
-    conn = get_db_connection()
+    try:
+        datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': 'Geçersiz tarih formatı (YYYY-AA-GG bekleniyor)'}), 400
+    
+    # Doktor şablonu + randevu bitmap'i (appointments tablosu taranmaz)
+    return jsonify(schedule_engine.day_slots(doctor_id, date))
+
+# İlk boş slotlar (doktor veya bölüm için, önümüzdeki günlerde)
+@appointment_page.route('/api/first-available')
+def get_first_available():
+    limit = min(request.args.get('limit', 5, type=int), 50)
+    days = min(request.args.get('days', 7, type=int), 31)
+    doctor_id = request.args.get('doctor_id', type=int)
+    department_id = request.args.get('department_id')
     
+    if doctor_id:
+        slots = schedule_engine.first_free_slots([doctor_id], limit, days)
+    elif department_id:
+        slots = first_free_slots_for_department(department_id, limit, days)
+    else:
+        return jsonify({'error': 'doctor_id veya department_id gerekli'}), 400
+    
+    return jsonify([{'date': d, 'time': t, 'doctor_id': doc} for d, t, doc in slots])
+
+# Doktor(lar) x gün müsaitlik ızgarası (takvim ve tarih seçici için tek istek)
+@appointment_page.route('/api/availability')
+def get_availability():
     try:
-        print(f"Getting available times for doctor {doctor_id} on {date}")
-        
-        # Appointments tablosu var mı kontrol et
-        table_check = conn.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name='appointments'"
-        ).fetchone()
-        
-        occupied_time_list = []
-        if table_check:
-            # Appointments tablosu varsa, bu tarih ve doktor için alınmış randevuları getir
-            occupied_times = conn.execute('''
-                SELECT appointment_time FROM appointments 
-                WHERE doctor_id = ? AND appointment_date = ? AND status = 'active'
-            ''', (doctor_id, date)).fetchall()
-            occupied_time_list = [row['appointment_time'] for row in occupied_times]
-        else:
-            print("Appointments table doesn't exist, creating sample data")
-            # Tablo yoksa boş liste kullan
-            occupied_time_list = []
-        
-        conn.close()
-        
-        print(f"Occupied times: {occupied_time_list}")
-        
-        # Tüm muhtemel saatler
-        morning_times = ['09:00', '09:20', '09:40', '10:00', '10:20', '10:40', '11:00', '11:20', '11:40']
-        afternoon_times = ['13:00', '13:20', '13:40', '14:00', '14:20', '14:40', '15:00', '15:20', '15:40', '16:00', '16:20', '16:40']
-        all_times = morning_times + afternoon_times
-        
-        # Müsait saatleri belirle
-        available_times = []
-        for time in all_times:
-            if time not in occupied_time_list:
-                # Rastgele bazı saatleri müsait olmayan olarak işaretle (%20 şans)
-                if random.random() > 0.2:
-                    available_times.append({
-                        'time': time,
-                        'available': True
-                    })
-                else:
-                    available_times.append({
-                        'time': time,
-                        'available': False
-                    })
-            else:
-                available_times.append({
-                    'time': time,
-                    'available': False
-                })
-        
-        print(f"Returning {len(available_times)} time slots")
-        return jsonify(available_times)
-        
-    except Exception as e:
-        if conn:
-            conn.close()
-        print(f"Error in get_available_times: {str(e)}")
-        # Hata durumunda basit bir saat listesi döndür
-        simple_times = [
-            {'time': '09:00', 'available': True},
-            {'time': '09:20', 'available': True},
-            {'time': '10:00', 'available': False},
-            {'time': '10:20', 'available': True},
-            {'time': '11:00', 'available': True},
-            {'time': '14:00', 'available': True},
-            {'time': '14:20', 'available': False},
-            {'time': '15:00', 'available': True},
-            {'time': '15:20', 'available': True},
-            {'time': '16:00', 'available': True}
-        ]
-        return jsonify(simple_times)
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') \
+            else datetime.now().date()
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') \
+            else start + timedelta(days=13)
+    except ValueError:
+        return jsonify({'error': 'Geçersiz tarih formatı (YYYY-AA-GG bekleniyor)'}), 400
+    if end < start or (end - start).days > 31:
+        return jsonify({'error': 'Tarih aralığı en fazla 31 gün olabilir'}), 400
+    
+    department_id = request.args.get('department_id')
+    if request.args.get('doctor_ids'):
+        try:
+            doctor_ids = sorted({int(d) for d in request.args['doctor_ids'].split(',') if d})[:200]
+        except ValueError:
+            return jsonify({'error': 'doctor_ids virgülle ayrılmış sayılar olmalı'}), 400
+    elif department_id:
+        doctor_ids = clinic_directory.snapshot().doctor_ids_by_department.get(department_id, [])
+    else:
+        return jsonify({'error': 'doctor_ids veya department_id gerekli'}), 400
+    
+    # Randevular değişmedikçe aynı ETag; bugün aralıktaysa geçen saatler de ızgarayı değiştirir
+    version = schedule_engine.bookings_version()
+    today = datetime.now()
+    clock = today.strftime('%H:%M') if start <= today.date() <= end else ''
+    etag = hashlib.sha1(
+        f"{version}|{start}|{end}|{','.join(map(str, doctor_ids))}|{clock}".encode()
+    ).hexdigest()[:20]
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        schedule_engine.sync_version(version)
+        response = jsonify(schedule_engine.availability_grid(doctor_ids, start, end))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
-# Randevu oluştur
+def get_patient(data):
+    """Randevu sahibi: giriş yapan kullanıcı, yoksa anonim (user_id NULL) ve istekteki hasta adı.
+
+    user_id yalnızca oturumdan gelir; istemcinin gönderdiği user_id'ye güvenilmez.
+    """
+    user = session.get('user')
+    if user:
+        return user['id'], user['name']
+    return None, data.get('patient_name', 'Hasta')
+
+# Saat seçildiğinde slotu kısa süreliğine tut
+@appointment_page.route('/api/hold-appointment', methods=['POST'])
+def hold_appointment():
+    data = request.json or {}
+    user_id, patient_name = get_patient(data)
+    
+    try:
+        appointment_id, hold_token, expires_at = reservation_service.hold(
+            data['doctor_id'],
+            data['appointment_date'],
+            data['appointment_time'],
+            data['department_id'],
+            data['hospital_id'],
+            patient_name,
+            user_id
+        )
+    except KeyError as e:
+        return jsonify({'success': False, 'message': f'Eksik alan: {e}'}), 400
+    except InvalidBooking as e:
+        return jsonify({'success': False, 'message': f'Geçersiz randevu: {e}'}), 400
+    except SlotInPast:
+        return jsonify({'success': False, 'message': 'Geçmiş bir tarih veya saat için randevu alınamaz.'}), 400
+    except SlotUnavailable:
+        return jsonify({
+            'success': False,
+            'message': 'Bu saat az önce başka bir hasta tarafından seçildi. Lütfen başka bir saat seçin.'
+        }), 409
+    
+    return jsonify({
+        'success': True,
+        'appointment_id': appointment_id,
+        'hold_token': hold_token,
+        'expires_in': int(expires_at - time.time())
+    })
+
+# Tutulan slotu bırak
+@appointment_page.route('/api/release-hold', methods=['POST'])
+def release_hold():
+    data = request.json or {}
+    released = reservation_service.release(data.get('appointment_id'), data.get('hold_token'))
+    return jsonify({'success': released})
+
+# Randevu oluştur (tutma varsa onu onaylar, yoksa slotu doğrudan ve atomik olarak alır)
 @appointment_page.route('/api/create-appointment', methods=['POST'])
 def create_appointment():
-    data = request.json
-    
-    conn = get_db_connection()
+    data = request.json or {}
+    user_id, patient_name = get_patient(data)
     
     try:
-        # Appointments tablosu var mı kontrol et, yoksa oluştur
-        table_check = conn.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name='appointments'"
-        ).fetchone()
-        
-        if not table_check:
-            print("Creating appointments table...")
-            conn.execute('''
-                CREATE TABLE appointments (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    patient_name TEXT NOT NULL,
-                    department_id TEXT NOT NULL,
-                    hospital_id INTEGER NOT NULL,
-                    doctor_id INTEGER NOT NULL,
-                    appointment_date TEXT NOT NULL,
-                    appointment_time TEXT NOT NULL,
-                    status TEXT DEFAULT 'active',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        appointment_id = None
+        if data.get('hold_token') and data.get('appointment_id'):
+            try:
+                appointment_id = reservation_service.confirm(
+                    data['appointment_id'], data['hold_token'], patient_name
                 )
-            ''')
-            conn.commit()
-        
-        # Randevuyu veritabanına ekle
-        cursor = conn.execute('''
-            INSERT INTO appointments (patient_name, department_id, hospital_id, doctor_id, appointment_date, appointment_time)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            data.get('patient_name', 'Hasta'),
-            str(data['department_id']),  # String olarak kaydet
-            data['hospital_id'],
-            data['doctor_id'],
-            data['appointment_date'],
-            data['appointment_time']
-        ))
+            except HoldExpired:
+                print(f"Hold expired for appointment {data['appointment_id']}, booking directly")
         
-        conn.commit()
-        appointment_id = cursor.lastrowid  # cursor'dan al, conn'den değil
+        if appointment_id is None:
+            appointment_id = reservation_service.book(
+                data['doctor_id'],
+                data['appointment_date'],
+                data['appointment_time'],
+                data['department_id'],
+                data['hospital_id'],
+                patient_name,
+                user_id
+            )
         
-        conn.close()
+        if user_id:
+            invalidate_dashboard(user_id)
         
         return jsonify({
             'success': True,
@@ -277,9 +365,16 @@ def create_appointment():
             }
         })
         
+    except InvalidBooking as e:
+        return jsonify({'success': False, 'message': f'Geçersiz randevu: {e}'}), 400
+    except SlotInPast:
+        return jsonify({'success': False, 'message': 'Geçmiş bir tarih veya saat için randevu alınamaz.'}), 400
+    except SlotUnavailable:
+        return jsonify({
+            'success': False,
+            'message': 'Bu saat dolu. Lütfen başka bir saat seçin.'
+        }), 409
     except Exception as e:
-        if conn:
-            conn.close()
         print(f"Create appointment error: {str(e)}")
         return jsonify({
             'success': False,
@@ -289,20 +384,7 @@ def create_appointment():
 # Randevu detaylarını getir
 @appointment_page.route('/api/appointment/<int:appointment_id>')
 def get_appointment(appointment_id):
-    conn = get_db_connection()
-    
-    appointment = conn.execute('''
-        SELECT a.*, d.name as department_name, d.icon as department_icon,
-               h.name as hospital_name, h.location as hospital_location,
-               doc.name as doctor_name
-        FROM appointments a
-        JOIN department d ON a.department_id = d.id
-        JOIN hospital h ON a.hospital_id = h.id
-        JOIN doctor doc ON a.doctor_id = doc.id
-        WHERE a.id = ?
-    ''', (appointment_id,)).fetchone()
-    
-    conn.close()
+    appointment = load_appointment(appointment_id)
     
     if appointment:
         return jsonify({
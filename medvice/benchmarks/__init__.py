@@ -0,0 +1 @@
+# Medvice mikro benchmark'ları; medvice dizininden `python -m benchmarks.run` ile çalıştırılır.
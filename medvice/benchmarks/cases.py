@@ -0,0 +1,341 @@
+# benchmarks/cases.py
+"""Her sohbet mesajının ve randevu/tahlil isteğinin geçtiği sıcak fonksiyonlar.
+
+Bu modül içe aktarılmadan önce MEDVICE_DB_PATH sentetik veri kopyasını
+göstermelidir (benchmarks.run bunu ayarlar). Vakalar gerçek kodu çağırır;
+yalnızca dış bağımlılıklar sabitlenir: Gemini yanıtı loadtest.fake_gemini ile
+üretilir, RAG araması diskteki embedding önbelleği ve ondan türetilen sabit
+sorgu vektörleriyle yapılır (model indirilemeyen ortamda da aynı sonuç).
+"""
+import contextlib
+import io
+import itertools
+import os
+import time
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+from flask import Flask
+
+import chat
+import appointment_page as appointments
+import lab_results_page as lab_results
+from chat import EnhancedRAGSystem, medvice_system
+from data_access import execute, query_all
+from directory import clinic_directory
+from loadtest.fake_gemini import compose_answer
+from reservations import reservation_service
+from schedule import schedule_engine
+from text_utils import turkish_lower
+
+from benchmarks.harness import Skip, case, timed
+
+SESSION_ID = "medvice_benchmark"
+USER_MESSAGES = [
+    "Göğsümde baskı hissi ve çarpıntı var, randevu almak istiyorum",
+    "İki gündür başım çok ağrıyor ve midem bulanıyor",
+    "Kuru öksürüğüm geçmiyor, acil doktora görünmem lazım mı?",
+    "Kollarımda kaşıntılı kızarıklıklar çıktı",
+]
+QUERY_COUNT = 32
+QUERY_NOISE = 0.05
+# Sabitlenmiş encoder (yerel dizin veya HF adı); verilmezse encode vakası atlanır
+BENCH_MODEL = os.getenv("MEDVICE_BENCH_MODEL")
+# Sentetik randevular bugünden 60 gün sonrasına kadar; tutma vakaları bunun ötesindeki boş günleri kullanır
+FREE_DAYS_OFFSET = 120
+
+
+# ==================== ORTAK HAZIRLIK ====================
+
+@lru_cache(maxsize=None)
+def rag_system():
+    """Model yüklemeden, diskteki embedding/FAISS önbelleğinden kurulan RAG sistemi"""
+    rag = EnhancedRAGSystem.__new__(EnhancedRAGSystem)
+    rag.json_file_path = os.path.join(chat.BASE_DIR, "three.json")
+    rag.model_name = BENCH_MODEL
+    rag.sentence_model = None
+    rag.embeddings_cache_file = f"{rag.json_file_path}_embeddings.pkl"
+    rag.index_cache_file = f"{rag.json_file_path}_faiss.index"
+    rag.metadata_cache_file = f"{rag.json_file_path}_metadata.pkl"
+    if not all(os.path.exists(path) for path in (rag.embeddings_cache_file, rag.index_cache_file,
+                                                 rag.metadata_cache_file)):
+        raise Skip("RAG embedding önbelleği yok")
+    rag.load_data()
+    rag.load_from_cache()
+    return rag
+
+
+@lru_cache(maxsize=None)
+def query_embeddings():
+    """Belge vektörlerine sabit tohumlu gürültü eklenerek üretilen, normalize sorgular"""
+    embeddings = rag_system().embeddings
+    rng = np.random.default_rng(42)
+    rows = embeddings[rng.integers(0, len(embeddings), QUERY_COUNT)]
+    queries = (rows + rng.normal(0, QUERY_NOISE, rows.shape)).astype("float32")
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+@lru_cache(maxsize=None)
+def ai_responses():
+    return [compose_answer(message) for message in USER_MESSAGES]
+
+
+@lru_cache(maxsize=None)
+def clinic():
+    """En çok doktoru olan (hastane, bölüm) çifti ve ilgili kayıtlar"""
+    directory = clinic_directory.snapshot()
+    (hospital_id, department_id), doctors = max(directory.doctors_by_hospital_department.items(),
+                                                key=lambda item: (len(item[1]), item[0]))
+    return {
+        "department": directory.departments[department_id],
+        "hospital": directory.hospitals[hospital_id],
+        "hospitals": [dict(h) for h in directory.hospitals_for_department(department_id)][:5],
+        "doctors": [dict(d) for d in doctors],
+        "user_id": query_all("SELECT user_id FROM test_result GROUP BY user_id "
+                             "ORDER BY COUNT(*) DESC LIMIT 1")[0][0],
+    }
+
+
+def free_slots(count):
+    """Randevusuz uzak günlerden `count` farklı (doktor, gün, saat); her örnekte aynı sıra"""
+    directory = clinic_directory.snapshot()
+    doctor_ids = sorted(doctor_id for ids in directory.doctor_ids_by_department.values() for doctor_id in ids)
+    start = date.today() + timedelta(days=FREE_DAYS_OFFSET)
+    days = [start + timedelta(days=i) for i in range(30) if (start + timedelta(days=i)).weekday() < 5]
+    slots = ((doctor_id, day.isoformat(), slot) for doctor_id in doctor_ids for day in days
+             for slot in schedule_engine.day_template(doctor_id, day))
+    return list(itertools.islice(slots, count))
+
+
+def _session(state, **data):
+    return {"state": medvice_system.STATES[state], "data": data, "last_ai_response": ""}
+
+
+# ==================== RAG ====================
+
+@case("rag")
+def extract_text_from_item(loops):
+    """three.json'daki tüm kayıtların aranabilir metne çevrilmesi (döngü başına bir tam geçiş)"""
+    rag = rag_system()
+    items = rag.data
+    started = time.perf_counter()
+    for _ in range(loops):
+        for item in items:
+            rag.extract_text_from_item(item)
+    return time.perf_counter() - started
+
+
+@case("rag")
+def search_similar(loops):
+    """FAISS araması + sonuç listesi; sabit sorgu vektörleri (encode hariç)"""
+    rag = rag_system()
+    queries = [row[np.newaxis, :] for row in query_embeddings()]
+    started = time.perf_counter()
+    for i in range(loops):
+        rag.search_similar("", 5, 0.3, queries[i % len(queries)])
+    return time.perf_counter() - started
+
+
+@case("rag", max_loops=256)
+def encode_queries(loops):
+    """Sorgu gömme; yalnızca MEDVICE_BENCH_MODEL ile sabit bir model verildiyse"""
+    if not BENCH_MODEL:
+        raise Skip("MEDVICE_BENCH_MODEL verilmedi")
+    rag = rag_system()
+    if rag.sentence_model is None:
+        try:
+            rag.load_sentence_model()
+        except Exception as e:
+            raise Skip(f"model yüklenemedi: {rag.model_name} ({type(e).__name__})")
+    return timed(loops, rag.encode_queries, [USER_MESSAGES[0]])
+
+
+# ==================== NİYET / BÖLÜM ====================
+
+@case("intent")
+def detect_appointment_intent(loops):
+    pairs = list(zip(USER_MESSAGES, ai_responses()))
+    started = time.perf_counter()
+    for i in range(loops):
+        message, response = pairs[i % len(pairs)]
+        medvice_system.detect_appointment_intent(message, response)
+    return time.perf_counter() - started
+
+
+@case("intent")
+def extract_department_from_ai_response(loops):
+    responses = ai_responses()
+    started = time.perf_counter()
+    for i in range(loops):
+        medvice_system.extract_department_from_ai_response(responses[i % len(responses)])
+    return time.perf_counter() - started
+
+
+# ==================== SEÇİM ADIMLARI ====================
+# Handler'lar gerçek oturum deposuna yazar; tutma/onay vakaları her döngüde ayrı slot kullanır
+# ve ölçüm dışında geri alır.
+
+@case("handler")
+def department_confirmation(loops):
+    session_data = _session("DEPARTMENT_SUGGESTED", suggested_department=clinic()["department"]["name"])
+    message = turkish_lower("Evet, randevu al")
+    return timed(loops, medvice_system._handle_department_confirmation, SESSION_ID, message, session_data)
+
+
+@case("handler")
+def hospital_selection(loops):
+    info = clinic()
+    hospitals = info["hospitals"] if info["hospital"]["id"] in {h["id"] for h in info["hospitals"]} \
+        else [dict(info["hospital"])] + info["hospitals"][:4]
+    session_data = _session("HOSPITAL_SELECTION", confirmed_department=info["department"]["name"],
+                            available_hospitals=hospitals)
+    # İsimle seçim: kelime indeksinden puanlama yapılan yol
+    message = turkish_lower(f"{info['hospital']['name']} olsun")
+    return timed(loops, medvice_system._handle_hospital_selection, SESSION_ID, message, session_data)
+
+
+@case("handler")
+def doctor_selection(loops):
+    session_data = _session("DOCTOR_SELECTION", available_doctors=clinic()["doctors"])
+    return timed(loops, medvice_system._handle_doctor_selection, SESSION_ID, "2", session_data)
+
+
+@case("handler")
+def date_selection(loops):
+    session_data = _session("DATE_SELECTION", selected_doctor=clinic()["doctors"][0])
+    messages = ["Yarın", "Bu hafta", "15 Ağustos"]
+    started = time.perf_counter()
+    for i in range(loops):
+        medvice_system._handle_date_selection(SESSION_ID, messages[i % len(messages)], session_data)
+    return time.perf_counter() - started
+
+
+@case("handler", max_loops=2048)
+def time_selection(loops):
+    """Saat seçimi: slot tutma (INSERT) dahil; tutmalar ölçüm dışında bırakılır"""
+    info = clinic()
+    sessions = [_session("TIME_SELECTION", selected_doctor={"id": doctor_id, "name": "Dr. Test"}, selected_date=day,
+                         available_times=[slot], confirmed_department=info["department"]["name"],
+                         selected_hospital=info["hospital"])
+                for doctor_id, day, slot in free_slots(loops)]
+    started = time.perf_counter()
+    for session_data in sessions:
+        medvice_system._handle_time_selection(SESSION_ID, "1", session_data)
+    elapsed = time.perf_counter() - started
+    for session_data in sessions:
+        hold = session_data["data"].get("hold")
+        if hold:
+            reservation_service.release(hold["appointment_id"], hold["hold_token"])
+    return elapsed
+
+
+@case("handler", max_loops=2048)
+def final_confirmation(loops):
+    """Son onay: tutmanın kesin randevuya çevrilmesi; randevular ölçüm dışında silinir"""
+    info = clinic()
+    department_id, hospital_id = info["department"]["id"], info["hospital"]["id"]
+    sessions = []
+    for doctor_id, day, slot in free_slots(loops):
+        appointment_id, token, _ = reservation_service.hold(doctor_id, day, slot, department_id, hospital_id)
+        sessions.append((_session("CONFIRMATION", selected_doctor={"id": doctor_id, "name": "Dr. Test"},
+                                  selected_date=day, selected_time=slot, selected_hospital=info["hospital"],
+                                  confirmed_department=info["department"]["name"],
+                                  hold={"appointment_id": appointment_id, "hold_token": token}),
+                         (doctor_id, day, slot, appointment_id)))
+    message = turkish_lower("Evet, oluştur")
+    started = time.perf_counter()
+    for session_data, _ in sessions:
+        medvice_system._handle_final_confirmation(SESSION_ID, message, session_data)
+    elapsed = time.perf_counter() - started
+    for _, (doctor_id, day, slot, appointment_id) in sessions:
+        execute("DELETE FROM appointments WHERE id = ?", (appointment_id,))
+        schedule_engine.mark_free(doctor_id, day, slot)
+    return elapsed
+
+
+# ==================== SQLITE YARDIMCILARI ====================
+# Görünüm fonksiyonları istek bağlamında doğrudan çağrılır. Dizin uç noktalarında
+# ResponseCache atlanır (__wrapped__): ölçülen, önbellek ıskalandığındaki SQL yoludur.
+
+_app = Flask(__name__)
+_app.secret_key = "benchmark"
+
+
+def _view(loops, view, path, *args):
+    started = time.perf_counter()
+    # get_doctors gibi yardımcıların print çıktısı rapora karışmasın
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(loops):
+            with _app.test_request_context(path):
+                view(*args)
+    return time.perf_counter() - started
+
+
+@case("sql")
+def get_departments(loops):
+    return _view(loops, appointments.get_departments.__wrapped__, "/api/departments")
+
+
+@case("sql")
+def get_hospitals_by_department(loops):
+    department_id = clinic()["department"]["id"]
+    return _view(loops, appointments.get_hospitals_by_department.__wrapped__,
+                 f"/api/hospitals/{department_id}", department_id)
+
+
+@case("sql")
+def get_hospitals_nearest(loops):
+    department_id = clinic()["department"]["id"]
+    return _view(loops, appointments.get_hospitals_by_department.__wrapped__,
+                 f"/api/hospitals/{department_id}?lat=39.93&lon=32.86", department_id)
+
+
+@case("sql")
+def get_doctors(loops):
+    info = clinic()
+    return _view(loops, appointments.get_doctors.__wrapped__,
+                 f"/api/doctors/{info['department']['id']}/{info['hospital']['id']}",
+                 info["department"]["id"], info["hospital"]["id"])
+
+
+@case("sql")
+def get_available_times(loops):
+    doctor_id = clinic()["doctors"][0]["id"]
+    day = (date.today() + timedelta(days=1)).isoformat()
+    return _view(loops, appointments.get_available_times, f"/api/available-times/{doctor_id}/{day}",
+                 doctor_id, day)
+
+
+@case("sql")
+def get_availability(loops):
+    doctor_ids = ",".join(str(d["id"]) for d in clinic()["doctors"])
+    start = date.today() + timedelta(days=1)
+    return _view(loops, appointments.get_availability,
+                 f"/api/availability?doctor_ids={doctor_ids}&start={start}&end={start + timedelta(days=13)}")
+
+
+@case("sql")
+def get_first_available(loops):
+    department_id = clinic()["department"]["id"]
+    return _view(loops, appointments.get_first_available, f"/api/first-available?department_id={department_id}")
+
+
+@case("sql")
+def get_test_with_id(loops):
+    return timed(loops, lab_results.get_test_with_id, clinic()["user_id"])
+
+
+@case("sql")
+def lab_summary(loops):
+    user_id = clinic()["user_id"]
+    return _view(loops, lab_results.lab_summary, f"/api/lab-results/{user_id}/summary", user_id)
+
+
+@case("sql")
+def lab_result_series(loops):
+    user_id = clinic()["user_id"]
+    test_name = query_all("SELECT test_name FROM test_result WHERE user_id = ? GROUP BY test_name "
+                          "ORDER BY COUNT(*) DESC LIMIT 1", (user_id,))[0][0]
+    return _view(loops, lab_results.lab_result_series,
+                 f"/api/lab-results/{user_id}/series?test_name={test_name}&max_points=200", user_id)
@@ -0,0 +1,211 @@
+# benchmarks/harness.py
+"""Mikro benchmark altyapısı: ölçüm, commit bazlı sonuç dosyaları ve istatistiksel karşılaştırma.
+
+Her vaka `fn(loops) -> saniye` biçimindedir (pyperf'teki time_func gibi):
+hazırlığı ölçüm dışında yapar, yalnızca sıcak yolu `loops` kez çalıştırıp geçen
+süreyi döner. Döngü sayısı bir örnek en az --min-time sürecek şekilde
+kalibre edilir; örnekler gc kapalıyken alınır ve çağrı başına süre saklanır.
+İki çalıştırma Mann-Whitney U testiyle karşılaştırılır: fark hem anlamlı
+(p < alpha) hem de eşikten büyükse yavaşlama / hızlanma sayılır.
+"""
+import gc
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTS_DIR = os.getenv("MEDVICE_BENCH_DIR", os.path.join(BASE_DIR, "benchmarks", "results"))
+
+MIN_SAMPLE_TIME = 0.02  # saniye; daha kısa örnekler zamanlayıcı gürültüsüne gömülür
+MAX_LOOPS = 1 << 20
+ALPHA = 0.01
+THRESHOLD = 0.05  # medyan değişimi bunun altındaysa anlamlı olsa bile önemsenmez
+
+# Ad -> Case; cases.py modülü yüklenince dolar
+CASES = {}
+
+
+class Case:
+    def __init__(self, name, group, fn, max_loops=MAX_LOOPS):
+        self.name = name
+        self.group = group
+        self.fn = fn
+        self.max_loops = max_loops
+
+
+class Skip(Exception):
+    """Vaka bu ortamda çalıştırılamıyor (ör. model dosyası yok)"""
+
+
+def case(group, name=None, max_loops=MAX_LOOPS):
+    """`fn(loops) -> saniye` fonksiyonunu benchmark vakası olarak kaydeden dekoratör"""
+    def register(fn):
+        key = f"{group}.{name or fn.__name__}"
+        CASES[key] = Case(key, group, fn, max_loops)
+        return fn
+    return register
+
+
+def timed(loops, fn, *args):
+    """Aynı argümanlarla `loops` çağrının süresi"""
+    started = time.perf_counter()
+    for _ in range(loops):
+        fn(*args)
+    return time.perf_counter() - started
+
+
+def _sample(bench, loops):
+    gc.collect()
+    gc.disable()
+    try:
+        return bench.fn(loops)
+    finally:
+        gc.enable()
+
+
+def calibrate(bench, min_time=MIN_SAMPLE_TIME):
+    """Bir örneğin en az min_time sürdüğü döngü sayısı (ısınma da burada olur)"""
+    loops = 1
+    while True:
+        elapsed = _sample(bench, loops)
+        if elapsed >= min_time or loops >= bench.max_loops:
+            return loops
+        # Tahmini gereken kat, aşırı sıçramamak için en fazla 10
+        factor = min(10.0, max(2.0, 1.2 * min_time / max(elapsed, 1e-9)))
+        loops = min(bench.max_loops, int(loops * factor))
+
+
+def measure(bench, samples=20, min_time=MIN_SAMPLE_TIME, warmups=1):
+    """{'group', 'loops', 'samples': [çağrı başına saniye, ...]}"""
+    loops = calibrate(bench, min_time)
+    for _ in range(warmups):  # önbellekler ve CPU frekansı otursun; sonuç atılır
+        _sample(bench, loops)
+    values = [_sample(bench, loops) / loops for _ in range(samples)]
+    return {"group": bench.group, "loops": loops, "samples": values}
+
+
+# ==================== İSTATİSTİK ====================
+
+def mann_whitney(a, b):
+    """İki yönlü Mann-Whitney U testi (normal yaklaşım, eşit değer düzeltmeli); p değeri döner"""
+    n1, n2 = len(a), len(b)
+    if not n1 or not n2:
+        return 1.0
+    ranked = sorted([(value, 0) for value in a] + [(value, 1) for value in b])
+    ranks = [0.0] * len(ranked)
+    tie_term = 0
+    i = 0
+    while i < len(ranked):
+        j = i
+        while j + 1 < len(ranked) and ranked[j + 1][0] == ranked[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        tie_term += (j - i + 1) ** 3 - (j - i + 1)
+        i = j + 1
+    rank_sum = sum(rank for rank, (_, source) in zip(ranks, ranked) if source == 0)
+    u = rank_sum - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+    return min(1.0, math.erfc(max(z, 0.0) / math.sqrt(2)))
+
+
+def compare(old, new, alpha=ALPHA, threshold=THRESHOLD):
+    """Ortak vakalar için [(ad, eski medyan, yeni medyan, değişim, p, karar)]"""
+    rows = []
+    for name in sorted(set(old["results"]) & set(new["results"])):
+        before, after = old["results"][name]["samples"], new["results"][name]["samples"]
+        old_median, new_median = statistics.median(before), statistics.median(after)
+        change = new_median / old_median - 1 if old_median else 0.0
+        p = mann_whitney(before, after)
+        if p < alpha and change > threshold:
+            verdict = "yavaşladı"
+        elif p < alpha and change < -threshold:
+            verdict = "hızlandı"
+        else:
+            verdict = "fark yok"
+        rows.append((name, old_median, new_median, change, p, verdict))
+    return rows
+
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+# ==================== COMMIT BAZLI SONUÇLAR ====================
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=BASE_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def current_commit():
+    """(commit, çalışma ağacı kirli mi); git yoksa ('unknown', True)"""
+    commit = _git("rev-parse", "HEAD")
+    dirty = bool(_git("status", "--porcelain", "--untracked-files=no"))
+    return (commit or "unknown"), (dirty or not commit)
+
+
+def result_path(commit, dirty=False, results_dir=RESULTS_DIR):
+    # Kirli ağaç sonucu commit'in kendi (temiz) sonucunun üzerine yazılmasın
+    return os.path.join(results_dir, f"{commit}{'+dirty' if dirty else ''}.json")
+
+
+def save(run, results_dir=RESULTS_DIR):
+    os.makedirs(results_dir, exist_ok=True)
+    path = result_path(run["commit"], run["dirty"], results_dir)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(run, f, ensure_ascii=False, indent=1)
+    return path
+
+
+def load(ref, results_dir=RESULTS_DIR):
+    """Commit referansı (HEAD~1, kısa SHA, etiket) veya dosya yolu için kayıtlı sonuç"""
+    if os.path.isfile(ref):
+        path = ref
+    else:
+        path = result_path(_git("rev-parse", ref) or ref, results_dir=results_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def find_baseline(commit, dirty, results_dir=RESULTS_DIR, depth=100):
+    """Sonucu kayıtlı en yakın ata commit (kirli ağaçta HEAD'in kendisi de aday)"""
+    ancestors = _git("rev-list", f"--max-count={depth}", "HEAD").split()
+    if not dirty:
+        ancestors = [sha for sha in ancestors if sha != commit]
+    for sha in ancestors:
+        if os.path.exists(result_path(sha, results_dir=results_dir)):
+            return load(sha, results_dir)
+    return None
+
+
+def new_run(config):
+    commit, dirty = current_commit()
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "subject": _git("log", "-1", "--format=%s"),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": config,
+        "results": {},
+    }
@@ -0,0 +1,127 @@
+# benchmarks/run.py
+"""Sıcak fonksiyonlar için tekrarlanabilir, çevrimdışı mikro benchmark.
+
+Sentetik veri (synthetic_data) bir kez üretilip benchmarks/data altında
+saklanır; her çalıştırma geçici bir kopya üzerinde yapılır. Sonuçlar
+commit SHA'sıyla benchmarks/results/<sha>.json dosyasına yazılır (kirli
+ağaçta <sha>+dirty.json) ve sonucu kayıtlı en yakın ata commit'le
+Mann-Whitney U testiyle karşılaştırılır; anlamlı bir yavaşlama varsa çıkış
+kodu 1'dir.
+
+    python -m benchmarks.run                       # tümü, 'small' veri
+    python -m benchmarks.run -k handler -k rag     # ada göre süz
+    python -m benchmarks.run --baseline HEAD~3     # belirli commit'le karşılaştır
+    python -m benchmarks.run --compare HEAD~1 HEAD # yalnızca kayıtlı iki sonucu karşılaştır
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import date
+
+from benchmarks.harness import (ALPHA, BASE_DIR, CASES, MIN_SAMPLE_TIME, RESULTS_DIR, THRESHOLD, Skip,
+                                compare, find_baseline, format_time, load, measure, new_run, save)
+
+DATA_DIR = os.getenv("MEDVICE_BENCH_DATA_DIR", os.path.join(BASE_DIR, "benchmarks", "data"))
+# Bu dosyalar değişince veri kümesi yeniden üretilir
+DATASET_SOURCES = ("synthetic_data.py", "migrations.py", "schedule.py", os.path.join("db", "hospital.py"))
+
+
+def dataset_path(scale, seed, data_dir=DATA_DIR):
+    """Ölçek, tohum, gün ve şema kaynaklarına göre adlandırılmış veri kümesi (yoksa üretilir)"""
+    digest = hashlib.sha1()
+    for name in DATASET_SOURCES:
+        with open(os.path.join(BASE_DIR, name), "rb") as f:
+            digest.update(f.read())
+    # Randevular bugüne göre üretildiğinden veri kümesi günlüktür
+    path = os.path.join(data_dir, f"{scale}-{seed}-{date.today():%Y%m%d}-{digest.hexdigest()[:10]}.db")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"Sentetik veri üretiliyor ({scale}): {path}", file=sys.stderr)
+        # Ayrı process: data_access.DB_PATH içe aktarmada okunduğu için bu process'i kirletmesin
+        subprocess.run([sys.executable, "-m", "synthetic_data", "--db", path, "--scale", scale,
+                        "--seed", str(seed), "--replace"], cwd=BASE_DIR, check=True)
+    return path
+
+
+def print_comparison(old, new, alpha, threshold):
+    rows = compare(old, new, alpha, threshold)
+    print(f"\nKarşılaştırma: {old['commit'][:10]}{' (kirli)' if old.get('dirty') else ''} -> "
+          f"{new['commit'][:10]}{' (kirli)' if new.get('dirty') else ''}")
+    width = max([len(row[0]) for row in rows] + [10])
+    for name, before, after, change, p, verdict in rows:
+        print(f"  {name:<{width}} {format_time(before):>10} -> {format_time(after):>10} "
+              f"{change * 100:+7.1f}%  p={p:.4f}  {verdict}")
+    return [row for row in rows if row[5] == "yavaşladı"]
+
+
+def run(args):
+    if args.compare:
+        old, new = load(args.compare[0], args.results_dir), load(args.compare[1], args.results_dir)
+        if old is None or new is None:
+            missing = args.compare[0] if old is None else args.compare[1]
+            raise SystemExit(f"Kayıtlı sonuç yok: {missing}")
+        return 1 if print_comparison(old, new, args.alpha, args.threshold) else 0
+
+    workdir = tempfile.mkdtemp(prefix="medvice_bench_")
+    db_path = os.path.join(workdir, "bench.db")
+    shutil.copyfile(dataset_path(args.scale, args.seed, args.data_dir), db_path)
+    os.environ["MEDVICE_DB_PATH"] = db_path
+    os.environ["MEDVICE_SESSION_DB"] = os.path.join(workdir, "sessions.db")
+    os.environ.setdefault("MEDVICE_PROFILE_DIR", workdir)
+
+    try:
+        import benchmarks.cases  # noqa: F401  (vakaları CASES'e kaydeder)
+        selected = [bench for name, bench in CASES.items()
+                    if not args.filter or any(pattern in name for pattern in args.filter)]
+        result = new_run({"scale": args.scale, "seed": args.seed, "samples": args.samples,
+                          "min_time": args.min_time})
+        width = max([len(bench.name) for bench in selected] + [10])
+        for bench in selected:
+            try:
+                measured = measure(bench, args.samples, args.min_time)
+            except Skip as e:
+                print(f"{bench.name:<{width}} atlandı: {e}")
+                continue
+            result["results"][bench.name] = measured
+            samples = sorted(measured["samples"])
+            print(f"{bench.name:<{width}} {format_time(statistics.median(samples)):>10}  "
+                  f"[{format_time(samples[0])} .. {format_time(samples[-1])}]  x{measured['loops']}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.save:
+        print(f"Sonuç: {save(result, args.results_dir)}")
+    baseline = load(args.baseline, args.results_dir) if args.baseline \
+        else find_baseline(result["commit"], result["dirty"], args.results_dir)
+    if baseline is None:
+        print("Karşılaştırılacak kayıtlı sonuç yok.")
+        return 0
+    if baseline["config"].get("scale") != args.scale:
+        print(f"Uyarı: taban çizgisi '{baseline['config'].get('scale')}' ölçeğinde ölçülmüş.")
+    return 1 if print_comparison(baseline, result, args.alpha, args.threshold) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Medvice mikro benchmark")
+    parser.add_argument("-k", "--filter", action="append", help="adında bu metni içeren vakalar (tekrarlanabilir)")
+    parser.add_argument("--scale", default="small", help="synthetic_data ölçeği")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--samples", type=int, default=20, help="vaka başına örnek sayısı")
+    parser.add_argument("--min-time", type=float, default=MIN_SAMPLE_TIME, help="bir örneğin asgari süresi (sn)")
+    parser.add_argument("--baseline", help="karşılaştırılacak commit veya sonuç dosyası (varsayılan en yakın ata)")
+    parser.add_argument("--compare", nargs=2, metavar=("ESKİ", "YENİ"), help="ölçmeden iki kayıtlı sonucu karşılaştır")
+    parser.add_argument("--alpha", type=float, default=ALPHA, help="anlamlılık düzeyi")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="önemsenecek asgari medyan değişimi")
+    parser.add_argument("--no-save", dest="save", action="store_false", help="sonucu kaydetme")
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    raise SystemExit(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
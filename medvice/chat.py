@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, Blueprint,abort,session
+from flask import Flask, request, jsonify, Blueprint,abort,session,has_request_context
 from flask_cors import CORS
 from pydantic import BaseModel
 from typing import List, Dict, Optional
@@ -13,7 +13,19 @@ import logging
 import os
 import re
 import random
+import threading
 from dotenv import load_dotenv
+from metrics import stage_timer, record_cache
+from tracing import span
+from session_store import create_session_store
+from directory import clinic_directory
+from geo import remember_location, user_location
+from intent_matcher import intent_matcher, classify_reply, select_candidate
+from text_utils import turkish_lower, parse_turkish_date
+from schedule import schedule_engine
+from reservations import reservation_service, SlotUnavailable, HoldExpired
+from dashboard_page import invalidate_dashboard
+from medicine_index import MedicineVectorIndex
 
 # .env dosyasını yükle
 load_dotenv()
@@ -31,7 +43,13 @@ chat = Blueprint('chat', __name__)
 CORS(chat)
 
 # Gemini API config
-genai.configure(api_key=gemini_api_key)
+# Yük testlerinde gerçek kota yerine yerel taklit sunucu: MEDVICE_GEMINI_ENDPOINT=http://127.0.0.1:8765
+gemini_endpoint = os.getenv("MEDVICE_GEMINI_ENDPOINT")
+if gemini_endpoint:
+    genai.configure(api_key=gemini_api_key or "fake", transport="rest",
+                    client_options={"api_endpoint": gemini_endpoint})
+else:
+    genai.configure(api_key=gemini_api_key)
 model = genai.GenerativeModel('gemini-2.0-flash')
 
 # Pydantic modelleri
@@ -52,12 +70,19 @@ class QuestionResponse(BaseModel):
 # ==================== MEDVİCE RANDEVU SİSTEMİ ====================
 # Bu kodu chat.py dosyanıza, import'lardan sonra, class EnhancedRAGSystem'den önce ekleyin
 
+# AI yanıtındaki bölüm önerisini yakalayan kalıplar (öncelik sırasıyla)
+DEPARTMENT_PATTERNS = [
+    re.compile(r'başvuru birimi:\s*([^\n]+)'),
+    re.compile(r'bölüm:\s*([^\n]+)'),
+    re.compile(r'önerilen bölüm[:\s]*([^\n]+)'),
+]
+
 class MedviceAppointmentSystem:
     """Medvice randevu sistemi - AI model ve hospital.py entegreli"""
     
     def __init__(self):
-        # Session bazlı randevu takibi
-        self.appointment_sessions = {}
+        # Session bazlı randevu takibi (TTL + LRU sınırlı, worker'lar arası paylaşımlı)
+        self.appointment_sessions = create_session_store()
         
         # Randevu akış durumları
         self.STATES = {
@@ -78,50 +103,40 @@ class MedviceAppointmentSystem:
     
     def get_session_data(self, session_id):
         """Session verilerini al"""
-        return self.appointment_sessions.get(session_id, {
-            'state': self.STATES['IDLE'],
-            'data': {},
-            'last_ai_response': ''
-        })
+        session_data = self.appointment_sessions.get(session_id)
+        if session_data is None:
+            return {
+                'state': self.STATES['IDLE'],
+                'data': {},
+                'last_ai_response': ''
+            }
+        return session_data
     
     def update_session_data(self, session_id, data):
         """Session verilerini güncelle"""
-        self.appointment_sessions[session_id] = data
+        self.appointment_sessions.set(session_id, data)
     
     def detect_appointment_intent(self, user_message, ai_response):
         """Randevu niyeti tespit et"""
-        message_lower = user_message.lower()
-        ai_lower = (ai_response or "").lower()
-        
-        # Randevu keywords
-        appointment_keywords = [
-            'randevu', 'randevu al', 'randevu istiyorum',
-            'doktora git', 'muayene ol', 'hastaneye git',
-            'doktor bul', 'randevu ayarla'
-        ]
-        
-        # Aciliyet keywords
-        urgency_keywords = ['acil', 'derhal', 'hemen', 'acele']
+        # Derlenmiş niyet regex'i: her metin için tek geçiş, Türkçe katlamalı
+        message_intents = intent_matcher.find(user_message)
+        ai_intents = intent_matcher.find(ai_response or "")
         
         intent_score = 0
         urgency_level = 'normal'
         
         # Randevu niyeti kontrolü
-        for keyword in appointment_keywords:
-            if keyword in message_lower:
-                intent_score += 3
-                break
+        if 'appointment' in message_intents:
+            intent_score += 3
         
         # AI yanıtında bölüm önerisi var mı?
-        if any(word in ai_lower for word in ['başvuru birimi:', 'bölüm:', 'önerilen']):
+        if 'department_suggestion' in ai_intents:
             intent_score += 2
         
         # Aciliyet kontrolü
-        for keyword in urgency_keywords:
-            if keyword in message_lower or keyword in ai_lower:
-                urgency_level = 'urgent'
-                intent_score += 2
-                break
+        if 'urgency' in message_intents or 'urgency' in ai_intents:
+            urgency_level = 'urgent'
+            intent_score += 2
         
         return {
             'has_intent': intent_score >= 2,
@@ -135,17 +150,11 @@ class MedviceAppointmentSystem:
         if not ai_response:
             return None
         
-        ai_lower = ai_response.lower()
+        ai_lower = turkish_lower(ai_response)
         
         # Pattern'lerle ara
-        patterns = [
-            r'başvuru birimi:\s*([^\n]+)',
-            r'bölüm:\s*([^\n]+)', 
-            r'önerilen bölüm[:\s]*([^\n]+)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, ai_lower)
+        for pattern in DEPARTMENT_PATTERNS:
+            match = pattern.search(ai_lower)
             if match:
                 suggested = match.group(1).strip()
                 # AI'nin önerdiği bölümü temizle
@@ -154,45 +163,21 @@ class MedviceAppointmentSystem:
         
         return None
     
-    def get_hospitals_for_department(self, department):
-        """Hospital.py'den bölüm için hastaneleri getir"""
+    def get_hospitals_for_department(self, department, location=None):
+        """Dizin anlık görüntüsünden bölüm için hastaneleri getir (konum varsa en yakınlar)"""
         try:
-            # Hospital.py modellerini import et
-            from hospital import Hospital, Doctor, Department, db
-            
-            # Department'ı bul
-            dept_obj = Department.query.filter_by(name=department).first()
-            if not dept_obj:
-                # Eğer tam eşleşme yoksa, benzer aramaya geç
-                dept_obj = Department.query.filter(Department.name.contains(department)).first()
+            directory = clinic_directory.snapshot()
+            department_id = directory.resolve_department(department)
             
-            if not dept_obj:
+            if not department_id:
                 logger.warning(f"Bölüm bulunamadı: {department}")
                 return []
             
-            # Bu bölümde doktoru olan hastaneleri bul
-            hospital_ids = db.session.query(Doctor.hospital_id).filter_by(
-                department_id=dept_obj.id
-            ).distinct().all()
-            
-            if not hospital_ids:
-                return []
-            
-            hospital_ids = [hid[0] for hid in hospital_ids]
-            hospitals = Hospital.query.filter(Hospital.id.in_(hospital_ids)).all()
-            
-            # Hastane verilerini dönüştür
-            result = []
-            for hospital in hospitals:
-                result.append({
-                    'id': hospital.id,
-                    'name': hospital.name,
-                    'address': hospital.location,
-                    'distance': hospital.distance,
-                    'rating': float(hospital.rating) if hospital.rating else 4.0
-                })
+            if location:
+                return directory.nearest_hospitals(department_id, location)
             
-            return result
+            # Bu bölümde doktoru olan hastaneler (puana göre sıralı)
+            return [dict(hospital) for hospital in directory.hospitals_for_department(department_id)]
             
         except Exception as e:
             logger.error(f"Hastane listesi alınamadı: {e}")
@@ -206,41 +191,16 @@ class MedviceAppointmentSystem:
             }]
     
     def get_doctors_for_hospital_department(self, hospital_id, department):
-        """Hospital.py'den doktorları getir"""
+        """Dizin anlık görüntüsünden doktorları getir"""
         try:
-            from hospital import Doctor, Department, db
-            
-            # Department ID'sini bul
-            dept_obj = Department.query.filter_by(name=department).first()
-            if not dept_obj:
-                dept_obj = Department.query.filter(Department.name.contains(department)).first()
+            directory = clinic_directory.snapshot()
+            department_id = directory.resolve_department(department)
             
-            if not dept_obj:
+            if not department_id:
                 return []
             
-            # Doktorları al
-            doctors = Doctor.query.filter_by(
-                hospital_id=hospital_id,
-                department_id=dept_obj.id
-            ).all()
-            
-            result = []
-            for doctor in doctors:
-                # Experience'dan yıl sayısını çıkar
-                experience_years = 5  # varsayılan
-                if doctor.experience:
-                    exp_match = re.search(r'(\d+)', doctor.experience)
-                    if exp_match:
-                        experience_years = int(exp_match.group(1))
-                
-                result.append({
-                    'id': doctor.id,
-                    'name': doctor.name,
-                    'experience': experience_years,
-                    'rating': float(doctor.rating) if doctor.rating else 4.5
-                })
-            
-            return result
+            # Deneyim yılı ve puan anlık görüntü yüklenirken ayrıştırıldı
+            return [dict(doctor) for doctor in directory.doctors_for(hospital_id, department_id)]
             
         except Exception as e:
             logger.error(f"Doktor listesi alınamadı: {e}")
@@ -248,21 +208,15 @@ class MedviceAppointmentSystem:
             return [{'id': 1, 'name': 'Dr. Mehmet Yılmaz', 'experience': 12, 'rating': 4.7}]
     
     def get_available_times(self, doctor_id, date):
-        """Müsait saatleri getir"""
-        all_times = ["09:00", "09:30", "10:00", "10:30", "11:00", "11:30", 
-                    "13:00", "13:30", "14:00", "14:30", "15:00", "15:30"]
-        
-        # Rastgele bazılarını çıkar (gerçek sistemde veritabanından gelecek)
-        available = all_times.copy()
-        remove_count = random.randint(2, 5)
-        for _ in range(remove_count):
-            if available:
-                available.pop(random.randint(0, len(available)-1))
-        
-        return available
+        """Müsait saatleri getir (doktor şablonu + randevu bitmap'i)"""
+        return schedule_engine.available_times(doctor_id, date)
     
     def enhance_ai_response_with_appointment(self, session_id, user_message, ai_response):
         """AI yanıtını randevu sistemiyle geliştir"""
+        with stage_timer('appointment_enhancement'):
+            return self._enhance_ai_response(session_id, user_message, ai_response)
+
+    def _enhance_ai_response(self, session_id, user_message, ai_response):
         session_data = self.get_session_data(session_id)
         current_state = session_data['state']
         
@@ -314,7 +268,11 @@ Randevu almak için yukarıdaki seçeneklerden birini yazın."""
         session_data = self.get_session_data(session_id)
         current_state = session_data['state']
         
-        message_lower = user_message.lower()
+        with span('appointment.handle_flow', **{'appointment.state': current_state}):
+            return self._dispatch_appointment_state(session_id, user_message, session_data, current_state)
+    
+    def _dispatch_appointment_state(self, session_id, user_message, session_data, current_state):
+        message_lower = turkish_lower(user_message)
         
         try:
             if current_state == self.STATES['DEPARTMENT_SUGGESTED']:
@@ -347,9 +305,13 @@ Randevu almak için yukarıdaki seçeneklerden birini yazın."""
         """Bölüm onayını işle"""
         appointment_data = session_data['data']
         
-        if any(word in message_lower for word in ['evet', 'tamam', 'randevu al', 'istiyorum']):
+        # Tek geçişte niyet: "randevu almak istemiyorum" gibi olumsuzlar önce gelir
+        reply = classify_reply(message_lower, ('alternative', 'decline', 'confirm'))
+        
+        if reply == 'confirm':
             department = appointment_data['suggested_department']
-            hospitals = self.get_hospitals_for_department(department)
+            location = user_location() if has_request_context() else None
+            hospitals = self.get_hospitals_for_department(department, location)
             
             if not hospitals:
                 self._reset_session(session_id)
@@ -360,7 +322,7 @@ Randevu almak için yukarıdaki seçeneklerden birini yazın."""
             session_data['state'] = self.STATES['HOSPITAL_SELECTION']
             
             response = f"✅ **{department}** bölümü seçildi.\n\n"
-            response += "**En yakın hastaneler:**\n\n"
+            response += "**En yakın hastaneler:**\n\n" if location else "**Önerilen hastaneler:**\n\n"
             
             for i, hospital in enumerate(hospitals, 1):
                 response += f"**{i}. {hospital['name']}**\n"
@@ -372,11 +334,11 @@ Randevu almak için yukarıdaki seçeneklerden birini yazın."""
             self.update_session_data(session_id, session_data)
             return response
         
-        elif any(word in message_lower for word in ['başka', 'farklı', 'değiştir']):
+        elif reply == 'alternative':
             self._reset_session(session_id)
             return "Hangi bölümden randevu almak istiyorsunuz? Semptomlarınızı tekrar belirtin."
         
-        elif any(word in message_lower for word in ['hayır', 'istemiyorum', 'iptal']):
+        elif reply == 'decline':
             self._reset_session(session_id)
             return "Anladım. Başka bir konuda yardımcı olabilir miyim?"
         
@@ -388,20 +350,14 @@ Randevu almak için yukarıdaki seçeneklerden birini yazın."""
         appointment_data = session_data['data']
         hospitals = appointment_data['available_hospitals']
         
-        selected_hospital = None
+        # Numara veya isim kelimeleriyle seçim (kelime indeksi üzerinden puanlama)
+        match = select_candidate(message_lower, [h['name'] for h in hospitals])
         
-        # Numara ile seçim
-        if message_lower.isdigit():
-            idx = int(message_lower) - 1
-            if 0 <= idx < len(hospitals):
-                selected_hospital = hospitals[idx]
+        if match.ambiguous:
+            options = "\n".join([f"{i+1}. {hospitals[i]['name']}" for i in match.ambiguous])
+            return f"Birden fazla hastane eşleşti, lütfen numarasını yazın:\n{options}"
         
-        # İsimle seçim
-        if not selected_hospital:
-            for hospital in hospitals:
-                if any(word in hospital['name'].lower() for word in message_lower.split()):
-                    selected_hospital = hospital
-                    break
+        selected_hospital = hospitals[match.index] if match.index is not None else None
         
         if not selected_hospital:
             hospital_list = "\n".join([f"{i+1}. {h['name']}" for i, h in enumerate(hospitals)])
@@ -435,20 +391,14 @@ Randevu almak için yukarıdaki seçeneklerden birini yazın."""
         appointment_data = session_data['data']
         doctors = appointment_data['available_doctors']
         
-        selected_doctor = None
+        # Numara veya isim kelimeleriyle seçim (unvanlar puanlamaya katılmaz)
+        match = select_candidate(message_lower, [d['name'] for d in doctors])
         
-        # Numara ile seçim
-        if message_lower.isdigit():
-            idx = int(message_lower) - 1
-            if 0 <= idx < len(doctors):
-                selected_doctor = doctors[idx]
+        if match.ambiguous:
+            options = "\n".join([f"{i+1}. {doctors[i]['name']}" for i in match.ambiguous])
+            return f"Birden fazla doktor eşleşti, lütfen numarasını yazın:\n{options}"
         
-        # İsimle seçim
-        if not selected_doctor:
-            for doctor in doctors:
-                if any(word in doctor['name'].lower() for word in message_lower.split()):
-                    selected_doctor = doctor
-                    break
+        selected_doctor = doctors[match.index] if match.index is not None else None
         
         if not selected_doctor:
             doctor_list = "\n".join([f"{i+1}. {d['name']}" for i, d in enumerate(doctors)])
@@ -471,27 +421,37 @@ Randevu almak için yukarıdaki seçeneklerden birini yazın."""
     def _handle_date_selection(self, session_id, user_message, session_data):
         """Tarih seçimi"""
         appointment_data = session_data['data']
-        message_lower = user_message.lower()
+        message_lower = turkish_lower(user_message)
         
         today = datetime.now()
         selected_date = None
         
+        doctor_id = appointment_data['selected_doctor']['id']
+        
         if 'bugün' in message_lower:
             selected_date = today
         elif 'yarın' in message_lower:
             selected_date = today + timedelta(days=1)
         elif 'bu hafta' in message_lower:
-            selected_date = today + timedelta(days=1)
+            # Önümüzdeki 7 gün içindeki ilk boş slotun günü
+            first_slots = schedule_engine.first_free_slots([doctor_id], limit=1, days=7, start=today.date())
+            if not first_slots:
+                return "Önümüzdeki 7 gün içinde müsait saat yok. Belirli bir tarih yazabilirsiniz."
+            selected_date = datetime.strptime(first_slots[0][0], '%Y-%m-%d')
         else:
-            # Basit tarih parsing
-            selected_date = today + timedelta(days=1)  # Varsayılan yarın
+            # "15 Ağustos", "15.08" gibi tarihler; anlaşılamazsa varsayılan yarın
+            selected_date = parse_turkish_date(user_message, today) or today + timedelta(days=1)
         
         date_str = selected_date.strftime('%Y-%m-%d')
-        doctor_id = appointment_data['selected_doctor']['id']
         available_times = self.get_available_times(doctor_id, date_str)
         
         if not available_times:
-            return f"{selected_date.strftime('%d.%m.%Y')} tarihinde müsait saat yok. Başka bir tarih seçin."
+            response = f"{selected_date.strftime('%d.%m.%Y')} tarihinde müsait saat yok."
+            next_slots = schedule_engine.first_free_slots([doctor_id], limit=1, days=14, start=selected_date.date())
+            if next_slots:
+                next_day = datetime.strptime(next_slots[0][0], '%Y-%m-%d')
+                response += f" En yakın müsait gün: **{next_day.strftime('%d.%m.%Y')}**."
+            return response + " Başka bir tarih seçin."
         
         appointment_data['selected_date'] = date_str
         appointment_data['available_times'] = available_times
@@ -532,7 +492,26 @@ Randevu almak için yukarıdaki seçeneklerden birini yazın."""
             time_list = "\n".join([f"{i+1}. {t}" for i, t in enumerate(times)])
             return f"Lütfen geçerli bir saat seçin:\n{time_list}"
         
+        # Onay beklenirken slotu başka hastaya kaptırmamak için kısa süreli tut
+        try:
+            hold_id, hold_token, _ = reservation_service.hold(
+                appointment_data['selected_doctor']['id'],
+                appointment_data['selected_date'],
+                selected_time,
+                self._department_id(appointment_data['confirmed_department']),
+                appointment_data['selected_hospital']['id'],
+                *self._patient()
+            )
+        except SlotUnavailable:
+            times.remove(selected_time)
+            self.update_session_data(session_id, session_data)
+            if not times:
+                return "Üzgünüm, bu saat az önce doldu ve bu gün için başka müsait saat kalmadı."
+            time_list = "\n".join([f"{i+1}. {t}" for i, t in enumerate(times)])
+            return f"Üzgünüm, {selected_time} az önce doldu. Müsait saatler:\n{time_list}"
+        
         appointment_data['selected_time'] = selected_time
+        appointment_data['hold'] = {'appointment_id': hold_id, 'hold_token': hold_token}
         session_data['state'] = self.STATES['CONFIRMATION']
         
         # Özet
@@ -553,9 +532,14 @@ Randevu almak için yukarıdaki seçeneklerden birini yazın."""
         """Final onay"""
         appointment_data = session_data['data']
         
-        if any(word in message_lower for word in ['evet', 'onay', 'oluştur', 'tamam']):
-            # Randevu oluştur
-            appointment_id = f"RDV{datetime.now().strftime('%Y%m%d')}{random.randint(1000,9999)}"
+        reply = classify_reply(message_lower, ('decline', 'final_confirm'))
+        
+        if reply == 'final_confirm':
+            # Tutmayı kesin randevuya çevir; süresi dolduysa slotu doğrudan almayı dene
+            try:
+                appointment_id = self._confirm_hold(appointment_data)
+            except SlotUnavailable:
+                return self._offer_other_times(session_id, session_data)
             
             success_msg = "🎉 **Randevunuz oluşturuldu!**\n\n"
             success_msg += f"📋 **Randevu No:** {appointment_id}\n"
@@ -570,20 +554,72 @@ Randevu almak için yukarıdaki seçeneklerden birini yazın."""
             self._reset_session(session_id)
             return success_msg
         
-        elif any(word in message_lower for word in ['hayır', 'iptal']):
+        elif reply == 'decline':
+            hold = appointment_data.get('hold')
+            if hold:
+                reservation_service.release(hold['appointment_id'], hold['hold_token'])
             self._reset_session(session_id)
             return "Randevu iptal edildi. Başka nasıl yardımcı olabilirim?"
         
         else:
             return "Lütfen 'Evet' veya 'Hayır' olarak yanıtlayın."
     
+    def _patient(self):
+        """(hasta adı, user_id): giriş yapan kullanıcı varsa oturumdan"""
+        user = session.get('user') if has_request_context() else None
+        if user:
+            return user['name'], user['id']
+        return 'Hasta', None
+    
+    def _department_id(self, department):
+        return clinic_directory.snapshot().resolve_department(department) or department
+    
+    def _confirm_hold(self, appointment_data):
+        """Tutmayı onayla; tutma düşmüşse slotu atomik olarak yeniden almayı dene"""
+        patient_name, user_id = self._patient()
+        appointment_id = None
+        hold = appointment_data.get('hold')
+        if hold:
+            try:
+                appointment_id = reservation_service.confirm(hold['appointment_id'], hold['hold_token'])
+            except HoldExpired:
+                logger.info(f"Randevu tutmasının süresi doldu: {hold['appointment_id']}")
+        if appointment_id is None:
+            appointment_id = reservation_service.book(
+                appointment_data['selected_doctor']['id'],
+                appointment_data['selected_date'],
+                appointment_data['selected_time'],
+                self._department_id(appointment_data['confirmed_department']),
+                appointment_data['selected_hospital']['id'],
+                patient_name,
+                user_id
+            )
+        if user_id:
+            invalidate_dashboard(user_id)
+        return appointment_id
+    
+    def _offer_other_times(self, session_id, session_data):
+        """Seçilen saat kaybedildiyse aynı gün için güncel saatleri sun"""
+        appointment_data = session_data['data']
+        appointment_data.pop('hold', None)
+        available_times = self.get_available_times(
+            appointment_data['selected_doctor']['id'], appointment_data['selected_date']
+        )
+        if not available_times:
+            session_data['state'] = self.STATES['DATE_SELECTION']
+            self.update_session_data(session_id, session_data)
+            return "Üzgünüm, seçtiğiniz saat onay süresi içinde doldu ve bu gün için başka saat kalmadı. Başka bir tarih yazın."
+        
+        appointment_data['available_times'] = available_times
+        session_data['state'] = self.STATES['TIME_SELECTION']
+        self.update_session_data(session_id, session_data)
+        time_list = "\n".join([f"{i+1}. {t}" for i, t in enumerate(available_times)])
+        return f"Üzgünüm, seçtiğiniz saat onay süresi içinde doldu. Müsait saatler:\n{time_list}"
+    
     def _reset_session(self, session_id):
         """Session'ı sıfırla"""
-        self.appointment_sessions[session_id] = {
-            'state': self.STATES['IDLE'],
-            'data': {},
-            'last_ai_response': ''
-        }
+        # IDLE kaydı tutmak yerine sil; get_session_data zaten IDLE döndürür
+        self.appointment_sessions.delete(session_id)
     
     def is_in_appointment_flow(self, session_id):
         """Randevu akışında mı kontrol et"""
@@ -618,6 +654,13 @@ class EnhancedRAGSystem:
         # Veri yükleme ve işleme
         self.load_data()
         self.load_or_create_embeddings()
+
+        # İlaç endikasyonları için ikinci indeks; aynı encoder kullanılır
+        self.medicine_index = MedicineVectorIndex(self.sentence_model, self.model_name)
+        try:
+            self.medicine_index.refresh(force=True)
+        except Exception as e:
+            logger.warning(f"İlaç indeksi yüklenemedi: {e}")
         
     def load_data(self):
         """JSON verilerini yükle"""
@@ -680,6 +723,7 @@ class EnhancedRAGSystem:
             os.path.exists(self.metadata_cache_file)
         )
         
+        record_cache('rag_embeddings', cache_exists)
         if cache_exists:
             self.load_from_cache()
         else:
@@ -777,57 +821,90 @@ class EnhancedRAGSystem:
             self.create_embeddings()
             self.save_to_cache()
     
-    def search_similar(self, query: str, top_k: int = 5, similarity_threshold: float = 0.3) -> tuple[List[Dict], List[float]]:
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Sorguları tek batch'te göm ve normalize et (hastalık ve ilaç aramaları ortak kullanır)"""
+        with stage_timer('embedding'):
+            query_embeddings = self.sentence_model.encode(queries, convert_to_numpy=True).astype('float32')
+            faiss.normalize_L2(query_embeddings)
+        return query_embeddings
+
+    def search_similar(self, query: str, top_k: int = 5, similarity_threshold: float = 0.3, query_embedding=None) -> tuple[List[Dict], List[float]]:
         """Sorguya en benzer belgeleri bul"""
-        start_time = datetime.now()
-        
-        # Query embedding'i oluştur
-        query_embedding = self.sentence_model.encode([query], convert_to_numpy=True).astype('float32')
-        faiss.normalize_L2(query_embedding)
-        
-        # FAISS ile arama yap
-        similarities, indices = self.faiss_index.search(query_embedding, top_k)
-        
-        results = []
-        similarity_scores = []
-        
-        for score, idx in zip(similarities[0], indices[0]):
-            if idx != -1 and score >= similarity_threshold:  # -1 = not found
-                results.append({
-                    'content': self.metadata[idx],
-                    'text': self.texts[idx],
-                    'index': int(idx)
-                })
-                similarity_scores.append(float(score))
-        
-        processing_time = (datetime.now() - start_time).total_seconds()
+        with stage_timer('search_similar'), span('rag.search_similar', **{'rag.top_k': top_k}) as search_span:
+            # Query embedding'i oluştur (verilmemişse)
+            if query_embedding is None:
+                query_embedding = self.encode_queries([query])
+            
+            # FAISS ile arama yap
+            with stage_timer('faiss_search'):
+                similarities, indices = self.faiss_index.search(query_embedding, top_k)
+            
+            results = []
+            similarity_scores = []
+            
+            for score, idx in zip(similarities[0], indices[0]):
+                if idx != -1 and score >= similarity_threshold:  # -1 = not found
+                    results.append({
+                        'content': self.metadata[idx],
+                        'text': self.texts[idx],
+                        'index': int(idx)
+                    })
+                    similarity_scores.append(float(score))
+            search_span.set_attribute('rag.result_count', len(results))
         
         return results, similarity_scores
+
+    def suggest_medicines(self, query_embedding) -> List[Dict]:
+        """Aynı sorgu vektörüyle reçetesiz ilaç önerileri (ikinci encode yapılmaz)"""
+        try:
+            return self.medicine_index.search(query_embedding)
+        except Exception as e:
+            logger.warning(f"İlaç önerisi hatası: {e}")
+            return []
+    
+    def normalize_query(self, question: str) -> str:
+        """Sorgudaki fazla boşlukları temizle"""
+        with stage_timer('query_normalization'):
+            return " ".join((question or "").split())
     
-    def ask_question(self, question: str, top_k: int = 5, similarity_threshold: float = 0.3) -> tuple[str, List[Dict], List[float], float]:
+    def ask_question(self, question: str, top_k: int = 5, similarity_threshold: float = 0.3) -> tuple[str, List[Dict], List[float], float, List[Dict]]:
         """RAG ile soru cevapla"""
+        with stage_timer('ask_question'), span('rag.ask_question', **{
+            'rag.top_k': top_k,
+            'rag.question_length': len(question or ''),
+        }):
+            return self._ask_question(question, top_k, similarity_threshold)
+
+    def _ask_question(self, question, top_k, similarity_threshold):
         start_time = datetime.now()
         
         session_id = medvice_system.get_session_id()
 
         if medvice_system.is_in_appointment_flow(session_id):
-            medvice_response = medvice_system.handle_appointment_flow(session_id, question)
+            with stage_timer('appointment_enhancement'):
+                medvice_response = medvice_system.handle_appointment_flow(session_id, question)
             processing_time = (datetime.now() - start_time).total_seconds()
-            return medvice_response, [], [], processing_time
+            return medvice_response, [], [], processing_time, []
+        question = self.normalize_query(question)
+        # Tek encode: aynı sorgu vektörü hastalık ve ilaç indekslerinde aranır
+        query_embedding = self.encode_queries([question])
         # İlgili belgeleri bul
-        relevant_docs, similarity_scores = self.search_similar(question, top_k, similarity_threshold)
+        relevant_docs, similarity_scores = self.search_similar(question, top_k, similarity_threshold, query_embedding)
         
         if not relevant_docs:
             processing_time = (datetime.now() - start_time).total_seconds()
-            return "Üzgünüm, sorunuzla ilgili yeterli bilgi bulamadım. Lütfen daha detaylı belirtiler yazın.\n Örneğin 24 yaşındayım, baş ağrım ve mide bulantım var", [], [], processing_time
+            return "Üzgünüm, sorunuzla ilgili yeterli bilgi bulamadım. Lütfen daha detaylı belirtiler yazın.\n Örneğin 24 yaşındayım, baş ağrım ve mide bulantım var", [], [], processing_time, []
         
-        # Kontekst oluştur - en benzer belgeleri öncelikle
-        context_parts = []
-        for i, doc in enumerate(relevant_docs):
-            score = similarity_scores[i]
-            context_parts.append(f"[Benzerlik: {score:.2f}] {doc['text'][:500]}...")
+        otc_suggestions = self.suggest_medicines(query_embedding)
         
-        context = "\n\n".join(context_parts)
+        # Kontekst oluştur - en benzer belgeleri öncelikle
+        with stage_timer('context_build'):
+            context_parts = []
+            for i, doc in enumerate(relevant_docs):
+                score = similarity_scores[i]
+                context_parts.append(f"[Benzerlik: {score:.2f}] {doc['text'][:500]}...")
+            
+            context = "\n\n".join(context_parts)
         
         # Gelişmiş prompt
         prompt = f"""
@@ -861,8 +938,13 @@ class EnhancedRAGSystem:
         """
         
         try:
-            response = model.generate_content(prompt)
-            answer = response.text
+            with stage_timer('llm_call'), span('gemini.generate_content', **{
+                'llm.model': 'gemini-2.0-flash',
+                'llm.prompt_chars': len(prompt),
+            }) as llm_span:
+                response = model.generate_content(prompt)
+                answer = response.text
+                llm_span.set_attribute('llm.answer_chars', len(answer))
         except Exception as e:
             answer = f"AI yanıt oluşturma hatası: {str(e)}"
         
@@ -872,19 +954,27 @@ class EnhancedRAGSystem:
         )
 
         processing_time = (datetime.now() - start_time).total_seconds()
-        return enhanced_answer, relevant_docs, similarity_scores, processing_time
+        return enhanced_answer, relevant_docs, similarity_scores, processing_time, otc_suggestions
+
+rag_system = None
+_rag_lock = threading.Lock()
 
-@chat.before_app_request
+@chat.before_request
 def load_rag():
+    # Model ve indeksler process başına bir kez, ilk chat isteğinde yüklenir
     global rag_system
-    data_path = os.path.join(BASE_DIR, 'three.json')
-    try:
-        if os.path.exists(data_path):
-            rag_system = EnhancedRAGSystem(data_path)
-        else:
+    if rag_system is not None:
+        return
+    with _rag_lock:
+        if rag_system is not None:
+            return
+        data_path = os.path.join(BASE_DIR, 'three.json')
+        if not os.path.exists(data_path):
             abort(500, description="Veri dosyası eksik.")
-    except Exception as e:
-        abort(500, description=f"RAG sistemi yüklenemedi: {str(e)}")
+        try:
+            rag_system = EnhancedRAGSystem(data_path)
+        except Exception as e:
+            abort(500, description=f"RAG sistemi yüklenemedi: {str(e)}")
 
 
 @chat.route("/ask", methods=["POST"])
@@ -894,11 +984,12 @@ def ask_question():
 
     data = request.get_json()
     question = data.get("question")
+    remember_location(data.get("location"))
     top_k = data.get("top_k", 5)
     similarity_threshold = data.get("similarity_threshold", 0.3)
 
     try:
-        answer, relevant_docs, similarity_scores, processing_time = rag_system.ask_question(
+        answer, relevant_docs, similarity_scores, processing_time, otc_suggestions = rag_system.ask_question(
             question, top_k, similarity_threshold
         )
         return jsonify({
@@ -906,6 +997,7 @@ def ask_question():
             "answer": answer,
             "relevant_docs": relevant_docs,
             "similarity_scores": similarity_scores,
+            "otc_suggestions": otc_suggestions,
             "processing_time": processing_time,
             "success": True
         })
@@ -916,6 +1008,7 @@ def ask_question():
             "answer": "",
             "relevant_docs": [],
             "similarity_scores": [],
+            "otc_suggestions": [],
             "processing_time": 0.0,
             "success": False,
             "message": str(e)
@@ -936,6 +1029,7 @@ def health_check():
         "model_name": rag_system.model_name,
         "embedding_dimension": rag_system.embedding_dim,
         "faiss_total_vectors": rag_system.faiss_index.ntotal if rag_system.faiss_index else 0,
+        "medicine_vectors": rag_system.medicine_index.faiss_index.ntotal if rag_system.medicine_index.faiss_index else 0,
         "cache_files_exist": {
             "embeddings": os.path.exists(rag_system.embeddings_cache_file),
             "index": os.path.exists(rag_system.index_cache_file),
@@ -975,13 +1069,14 @@ def clear_cache():
         cache_files = [
             rag_system.embeddings_cache_file,
             rag_system.index_cache_file,
-            rag_system.metadata_cache_file
+            rag_system.metadata_cache_file,
+            *rag_system.medicine_index.cache_files()
         ]
         deleted_files = []
         for file_path in cache_files:
             if os.path.exists(file_path):
                 os.remove(file_path)
-                deleted_files.chatend(file_path)
+                deleted_files.append(file_path)
         return jsonify({
             "message": "Cache temizlendi",
             "deleted_files": deleted_files,
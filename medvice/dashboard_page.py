@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import Blueprint, jsonify
+
+from data_access import query_all
+from lab_series import user_summary
+from medicine_page import get_user_medicines
+from metrics import record_cache, timed_query
+from user_repository import session_user
+
+dashboard_page = Blueprint('dashboard_page', __name__)
+
+# Ana ekran özeti kullanıcı başına kısa süre önbellekte tutulur
+DASHBOARD_TTL = float(os.getenv("MEDVICE_DASHBOARD_TTL", "15"))  # saniye
+DASHBOARD_CACHE_SIZE = int(os.getenv("MEDVICE_DASHBOARD_CACHE_SIZE", "2048"))
+UPCOMING_LIMIT = 5
+
+_cache = OrderedDict()  # user_id -> (oluşturulma zamanı, özet)
+_cache_lock = threading.Lock()
+
+
+def invalidate_dashboard(user_id):
+    """Kullanıcının verisi değişince (ör. yeni randevu) özeti düşür"""
+    with _cache_lock:
+        _cache.pop(user_id, None)
+
+
+def get_latest_lab_results(user_id):
+    # Her tahlilin en son sonucu ve eğilimi; aralık dışı işaretleri lab_series ile toplu hesaplanır
+    rows, summary = user_summary(user_id)
+
+    results = []
+    for test in sorted(summary.values(), key=lambda test: (test["latest"]["test_type"] or "", test["latest"]["test_name"] or "")):
+        row = test["latest"]
+        results.append({
+            "id": row["id"],
+            "test_type": row["test_type"],
+            "test_name": row["test_name"],
+            "value": row["value"],
+            "unit": row["unit"],
+            "status": row["status"],
+            "range_info": row["range_info"],
+            "test_date": str(row["test_date"]),
+            "flag": row["flag"],
+            "level": row["level"],
+            "delta": row["delta"],
+            "trend": test["trend"],
+            "abnormal": row["abnormal"],
+        })
+    return results
+
+
+@timed_query
+def get_upcoming_appointments(user_id, limit=UPCOMING_LIMIT):
+    # appointments(user_id, appointment_date) indeksi ile
+    query = """
+    SELECT a.id, a.appointment_date, a.appointment_time,
+           d.name, h.name, doc.name
+    FROM appointments a
+    LEFT JOIN department d ON a.department_id = d.id
+    LEFT JOIN hospital h ON a.hospital_id = h.id
+    LEFT JOIN doctor doc ON a.doctor_id = doc.id
+    WHERE a.user_id = ? AND a.status = 'active' AND a.appointment_date >= ?
+    ORDER BY a.appointment_date, a.appointment_time
+    LIMIT ?
+    """
+    rows = query_all(query, (user_id, datetime.now().strftime('%Y-%m-%d'), limit))
+
+    return [{
+        "id": row[0],
+        "date": row[1],
+        "time": row[2],
+        "department": row[3],
+        "hospital": row[4],
+        "doctor": row[5],
+    } for row in rows]
+
+
+def build_dashboard(user):
+    user_id = user["id"]
+    lab_results = get_latest_lab_results(user_id)
+    return {
+        "user": {"id": user_id, "name": user["name"]},
+        "medicines": get_user_medicines(user_id),
+        "lab_results": {
+            "latest": lab_results,
+            "abnormal_count": sum(1 for result in lab_results if result["abnormal"]),
+        },
+        "appointments": get_upcoming_appointments(user_id),
+        "generated_at": datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+@dashboard_page.route('/api/dashboard/<int:user_id>')
+def dashboard(user_id):
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(user_id)
+        if entry and now - entry[0] <= DASHBOARD_TTL:
+            _cache.move_to_end(user_id)
+            record_cache('dashboard', True)
+            return jsonify(entry[1])
+    record_cache('dashboard', False)
+
+    user = session_user(user_id)
+    if not user:
+        return jsonify({'error': 'Kullanıcı bulunamadı'}), 404
+
+    data = build_dashboard(user)
+    with _cache_lock:
+        _cache[user_id] = (now, data)
+        _cache.move_to_end(user_id)
+        while len(_cache) > DASHBOARD_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return jsonify(data)
@@ -0,0 +1,222 @@
+# data_access.py
+"""Ortak SQLite erişim katmanı.
+
+Her sorguda sqlite3.connect / close yapmak yerine thread'ler arası paylaşılan,
+boyutu sınırlı iki bağlantı havuzu kullanılır: salt okunur okuyucular
+(mode=ro) ve işlemleri BEGIN IMMEDIATE ile açan yazıcılar. WAL modunda
+okuyucular yazıcıyı beklemez. Bağlantılar bir kez açılıp pragma'larla
+ayarlanır ve sqlite3'ün hazırlanmış ifade önbelleği (cached_statements)
+bağlantı ömrü boyunca korunur.
+
+Bir thread ilk sorgusunda havuzdan bağlantı ödünç alır ve release() çağrılana
+kadar (Flask'ta teardown_appcontext, bkz. release_connections) ya da thread
+bitene kadar aynı bağlantıyı kullanır. Werkzeug her istek için yeni thread
+açtığından bağlantılar böylece istekler arasında yeniden kullanılır.
+
+    from data_access import query_one, query_all, execute, transaction
+
+    row = query_one("SELECT name FROM user WHERE id = ?", (user_id,))
+    with transaction() as conn:
+        conn.execute("INSERT INTO ...", params)
+"""
+import os
+import queue
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+DB_PATH = os.getenv("MEDVICE_DB_PATH", os.path.join(BASE_DIR, "db", "db.db"))
+
+BUSY_TIMEOUT_MS = int(os.getenv("MEDVICE_DB_BUSY_TIMEOUT_MS", "10000"))
+MMAP_SIZE = int(os.getenv("MEDVICE_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+CACHE_SIZE_KB = int(os.getenv("MEDVICE_DB_CACHE_SIZE_KB", "65536"))
+CACHED_STATEMENTS = int(os.getenv("MEDVICE_DB_CACHED_STATEMENTS", "256"))
+# Havuz başına (okuyucu / yazıcı) azami bağlantı; hepsi ödünçteyse BUSY_TIMEOUT_MS kadar beklenir
+POOL_SIZE = int(os.getenv("MEDVICE_DB_POOL_SIZE", "32"))
+
+
+class ConnectionPool:
+    """Thread'ler arası paylaşılan, boyutu sınırlı bağlantı havuzu"""
+
+    def __init__(self, factory, size=POOL_SIZE, timeout=BUSY_TIMEOUT_MS / 1000):
+        self._factory = factory
+        self._timeout = timeout
+        self._idle = queue.LifoQueue()  # en son kullanılan bağlantı (sıcak önbellek) önce verilir
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self._timeout):
+            raise sqlite3.OperationalError("veritabanı bağlantı havuzu dolu")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self._factory()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+        except sqlite3.Error:
+            conn.close()  # bozuk bağlantı havuza dönmez; yeri boşalır
+        else:
+            self._idle.put(conn)
+        self._slots.release()
+
+    def close(self):
+        """Boştaki bağlantıları kapat (ödünçtekiler iade edilince havuza döner)"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class _Lease:
+    """Bir thread'in ödünç aldığı bağlantılar; release() ile ya da thread bitince havuza döner"""
+
+    def __init__(self, db):
+        self.db = db
+        self.reader = None
+        self.writer = None
+
+    def release(self):
+        if self.reader is not None:
+            self.db._readers.release(self.reader)
+            self.reader = None
+        if self.writer is not None:
+            self.db._writers.release(self.writer)
+            self.writer = None
+
+    def __del__(self):
+        try:
+            self.release()
+        except Exception:
+            pass  # yorumlayıcı kapanırken
+
+
+class Database:
+    """Bir SQLite dosyası için paylaşılan okuyucu/yazıcı bağlantı havuzları"""
+
+    _instances = weakref.WeakSet()
+
+    def __init__(self, db_path=DB_PATH, pool_size=POOL_SIZE):
+        self.db_path = db_path
+        self._readers = ConnectionPool(self._connect_reader, pool_size)
+        self._writers = ConnectionPool(self.connect, pool_size)
+        self._local = threading.local()
+        Database._instances.add(self)
+
+    def connect(self, readonly=False):
+        """Pragma'ları ayarlanmış yeni bir bağlantı (havuz dışı; migration ve betikler için)"""
+        if readonly:
+            target, uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro", True
+        else:
+            target, uri = self.db_path, False
+        conn = sqlite3.connect(
+            target,
+            uri=uri,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,  # işlemleri transaction() ile açıkça yönetiyoruz
+            cached_statements=CACHED_STATEMENTS,
+            check_same_thread=False,  # havuzdaki bağlantı farklı thread'lere ödünç verilir
+        )
+        conn.row_factory = sqlite3.Row
+        if not readonly:
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _connect_reader(self):
+        try:
+            return self.connect(readonly=True)
+        except sqlite3.OperationalError:
+            # Dosya henüz yoksa yazıcı oluşturur; okuyucu sonra ro açılır
+            self.connect().close()
+            return self.connect(readonly=True)
+
+    def _lease(self):
+        lease = getattr(self._local, "lease", None)
+        if lease is None:
+            lease = self._local.lease = _Lease(self)
+        return lease
+
+    def reader(self):
+        """Bu thread'in ödünç aldığı salt okunur bağlantı"""
+        lease = self._lease()
+        if lease.reader is None:
+            lease.reader = self._readers.acquire()
+        return lease.reader
+
+    def writer(self):
+        """Bu thread'in ödünç aldığı yazma bağlantısı"""
+        lease = self._lease()
+        if lease.writer is None:
+            lease.writer = self._writers.acquire()
+        return lease.writer
+
+    def release(self):
+        """Bu thread'in bağlantılarını havuza iade et (istek sonunda)"""
+        lease = getattr(self._local, "lease", None)
+        if lease is not None:
+            lease.release()
+
+    def query_all(self, sql, params=()):
+        return self.reader().execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        return self.reader().execute(sql, params).fetchone()
+
+    def execute(self, sql, params=()):
+        """Tek ifadelik yazma (autocommit); cursor döner (lastrowid, rowcount)"""
+        return self.writer().execute(sql, params)
+
+    def executemany(self, sql, rows):
+        with self.transaction() as conn:
+            return conn.executemany(sql, rows)
+
+    @contextmanager
+    def transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT; hata olursa ROLLBACK"""
+        conn = self.writer()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self):
+        """Bu thread'in bağlantılarını iade et ve havuzdaki boş bağlantıları kapat"""
+        self.release()
+        self._readers.close()
+        self._writers.close()
+
+
+def release_connections(exc=None):
+    """Geçerli thread'in tüm Database havuzlarından ödünç aldığı bağlantıları iade et.
+
+    Flask'ta `app.teardown_appcontext(release_connections)` olarak kaydedilir.
+    """
+    for db in list(Database._instances):
+        db.release()
+
+
+database = Database()
+
+query_all = database.query_all
+query_one = database.query_one
+execute = database.execute
+executemany = database.executemany
+transaction = database.transaction
@@ -1,14 +1,15 @@
 # app.py
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import insert, text
 from datetime import datetime
 import random
+from data_access import DB_PATH
 
 db_page = Flask(__name__)
 
-# SQLite veritabanı dosyası
-db_path = r"C:\\Users\\melis\\YZTA_m\\medvica\\yzta_team_forty\\medvice\\db\\db.db"
-db_page.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+# SQLite veritabanı dosyası (data_access ile aynı; MEDVICE_DB_PATH ile değiştirilebilir)
+db_page.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DB_PATH}'
 db_page.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db = SQLAlchemy(db_page)
@@ -29,13 +30,18 @@ class Hospital(db.Model):
     location = db.Column(db.String(150), nullable=False)
     distance = db.Column(db.String(50), nullable=True)
     rating = db.Column(db.String(10), nullable=True)
+    # En yakın hastane sıralaması için (geo.HospitalLocator)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
 
     doctors = db.relationship('Doctor', backref='hospital', lazy=True)
-    appointments = db.relationship('Appointment', backref='hospital_ref', lazy=True)
 
 
 # Doktor Modeli
 class Doctor(db.Model):
+    # Sıcak sorguların indeksleri migrations.HOT_PATH_INDEXES ile aynı adları taşır
+    __table_args__ = (db.Index('idx_doctor_department_hospital', 'department_id', 'hospital_id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(150), nullable=False)
     experience = db.Column(db.String(50), nullable=False)
@@ -43,18 +49,6 @@ class Doctor(db.Model):
 
     department_id = db.Column(db.String, db.ForeignKey('department.id'), nullable=False)
     hospital_id = db.Column(db.Integer, db.ForeignKey('hospital.id'), nullable=False)
-    appointments = db.relationship('Appointment', backref='doctor_ref', lazy=True)
-
-class Appointment(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    patient_name = db.Column(db.String(200), nullable=False)
-    department_id = db.Column(db.String(50), db.ForeignKey('department.id'), nullable=False)
-    hospital_id = db.Column(db.Integer, db.ForeignKey('hospital.id'), nullable=False)
-    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False)
-    appointment_date = db.Column(db.Date, nullable=False)
-    appointment_time = db.Column(db.Time, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    status = db.Column(db.String(20), default='active')  # active, cancelled, completed
 
 # 📌 User tablosu
 class User(db.Model):
@@ -69,15 +63,23 @@ class User(db.Model):
 
 
 class TestResult(db.Model):
+    __table_args__ = (
+        db.Index('idx_test_result_user_id', 'user_id'),
+        db.Index('idx_test_result_user_test_date', 'user_id', 'test_name', 'test_date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
     test_type = db.Column(db.String(50))  # örn: hemogram, biochemistry
     test_name = db.Column(db.String(100))  # örn: Hemoglobin
     value = db.Column(db.String(20))  # örn: "14.2"
+    value_num = db.Column(db.Float)  # örn: 14.2 (value'nun sayısal hali)
     unit = db.Column(db.String(20))   # örn: "g/dL"
     status = db.Column(db.String(20)) # örn: normal, warning, critical
     range_info = db.Column(db.String(50))  # örn: "Normal: 12-16"
+    ref_low = db.Column(db.Float)  # örn: 12
+    ref_high = db.Column(db.Float)  # örn: 16
     test_date = db.Column(db.Date, default=datetime.utcnow)
 
 # İlaç tablosu
@@ -97,6 +99,8 @@ class Medicine(db.Model):
 
 # Kullanıcı - İlaç ilişkisi tablosu
 class UserMedicine(db.Model):
+    __table_args__ = (db.Index('idx_user_medicine_user_id', 'user_id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     medicine_id = db.Column(db.Integer, db.ForeignKey('medicine.id'))
@@ -109,151 +113,160 @@ class UserMedicine(db.Model):
 
 
 
-with db_page.app_context():
-    db.drop_all()  # varsa eski tabloları siler
-    db.create_all()  # yeni tabloları oluşturur
-
-    # 20 Departman ekleyelim
-    departman_isimleri = [
-        "Kardiyoloji", "Nöroloji", "Ortopedi", "Dahiliye", "Çocuk Sağlığı",
-        "Göz Hastalıkları", "Dermatoloji", "Psikiyatri", "KBB", "Genel Cerrahi",
-        "Üroloji", "Göğüs Hastalıkları", "Radyoloji", "Fizik Tedavi", "Enfeksiyon",
-        "Kadın Hastalıkları", "Nefroloji", "Endokrinoloji", "Beslenme ve Diyet", "Acil Servis"
-    ]
-    departmanlar = []
-    for i, isim in enumerate(departman_isimleri, start=1):
-        d = Department(id=str(i).zfill(3), name=isim, icon="🏥")
-        db.session.add(d)
-        departmanlar.append(d)
-
-    # 5 Hastane ekleyelim
-    hastane_isimleri = [
-        "Şehir Hastanesi", 'Ankara Şehir Hastanesi', 'Hacettepe Üniversitesi Hastanesi', 'Gazi Üniversitesi Hastanesi', "Özel Medica", "Klinik Plus", "Sağlık Merkezi", "Devlet Hastanesi"
-    ]
-    hastaneler = []
-    for i, isim in enumerate(hastane_isimleri, start=1):
-        h = Hospital(
-            id=i,
-            name=isim,
-            location=f"{i}. Cadde, Şehir Merkezi",
-            distance=f"{random.randint(1,20)} km",
-            rating=f"{random.uniform(3.5,5):.1f}"
-        )
-        db.session.add(h)
-        hastaneler.append(h)
-
-    # Her departman ve hastaneye 3'er doktor ekleyelim
-    doktor_adlari = [ 'Prof. Dr. Ahmet Omurga', 'Prof. Dr. Selim Beyin', 'Doç. Dr. Elif Sinir', 'Uz. Dr. Can Refleks', 'Prof. Dr. Hasan İç', 'Doç. Dr. Merve Genel', 'Uz. Dr. Kemal Sistem', 
-        "Dr. Ahmet Yılmaz", 'Prof. Dr. Mehmet Kardiyak', 'Uz. Dr. Ali Damar', 'Doç. Dr. Ayşe Kalp', "Dr. Ayşe Demir", "Dr. Mehmet Kaya", "Dr. Fatma Çelik",
-        "Dr. Hasan Şahin", 'Prof. Dr. Fatma Ritim', "Dr. Elif Aydın", "Dr. Can Özkan", "Dr. Zeynep Korkmaz",
-        "Dr. Ali Yıldız", "Dr. Selin Kurt", 'Prof. Dr. Fatma Kemik', "Dr. Emre Aksoy", "Dr. Derya Taş",
-        "Dr. Murat Deniz", 'Doç. Dr. Emre Eklem', "Dr. Yasemin Öztürk", "Dr. Kerem Uysal", "Dr. Seda Polat",
-        "Dr. Cem Sarı", 'Uz. Dr. Zeynep Kas', "Dr. Melis Kılıç", "Dr. Okan Acar", "Dr. Ebru Doğan"
-    ]
-
-    # Doktorları departmanlara ve hastanelere dağıt
-    doktorlar = []
-    idx = 0
-    for d in departmanlar:
-        for h in hastaneler:
-            for _ in range(3):
-                if idx >= len(doktor_adlari):
-                    # Doktor isimleri biterse döngüyü kır
-                    break
-                doktor = Doctor(
-                    name=doktor_adlari[idx],
-                    experience=f"{random.randint(1,30)} yıl",
-                    rating=f"{random.uniform(3.0,5.0):.1f}",
-                    department=d,
-                    hospital=h
-                )
-                db.session.add(doktor)
-                doktorlar.append(doktor)
-                idx += 1
-            if idx >= len(doktor_adlari):
-                break
-        if idx >= len(doktor_adlari):
-            break
-
-    # 5 Kullanıcı ekleyelim
-    kullanicilar = []
-    for i in range(1, 6):
-        kullanici = User(
-            tc_no=f"1234567890{i}",
-            name=f"Kullanıcı {i}",
-            email=f"kullanici{i}@ornek.com",
-            password="sifre123"  # örnek şifre
-        )
-        db.session.add(kullanici)
-        kullanicilar.append(kullanici)
-
-    # Kullanıcıların bazı test sonuçları
-    test_tipleri = ["Hemogram", "Biyokimya"]
-    test_ismi_ve_degerleri = [
-        ("Hemoglobin", "14.2", "g/dL", "Normal", "12-16"),
-        ("Glukoz", "110", "mg/dL", "Uyarı", "70-99"),
-        ("Kolesterol", "190", "mg/dL", "Normal", "125-200"),
-        ("Trombosit", "250", "10^3/uL", "Normal", "150-400"),
-        ("Üre", "35", "mg/dL", "Normal", "10-50")
-    ]
-    for kullanici in kullanicilar:
-        for _ in range(random.randint(1,3)):  # Her kullanıcıya 1-3 test sonucu
-            test_ismi, deger, birim, durum, aralik = random.choice(test_ismi_ve_degerleri)
-            test_sonucu = TestResult(
-                user=kullanici,
-                test_type=random.choice(test_tipleri),
-                test_name=test_ismi,
-                value=deger,
-                unit=birim,
-                status=durum,
-                range_info=aralik,
-                test_date=datetime.utcnow()
-            )
-            db.session.add(test_sonucu)
-
-    # 2 İlaç ekleyelim
-    ilaclar = [
-        Medicine(
-            name="Parol",
-            active_ingredient="Parasetamol",
-            manufacturer="ABC İlaç",
-            price="15 TL",
-            prescription=False,
-            stock="Yeterli",
-            usage="Ağrı kesici ve ateş düşürücü olarak kullanılır.",
-            warning="Hamilelikte dikkatli kullanılmalı.",
-            indication="Baş ağrısı, ateş, kas ağrıları"
-        ),
-        Medicine(
-            name="Amoksilin",
-            active_ingredient="Amoksisilin",
-            manufacturer="XYZ İlaç",
-            price="25 TL",
-            prescription=True,
-            stock="Orta",
-            usage="Bakteriyel enfeksiyonlarda kullanılır.",
-            warning="Alerjik reaksiyon riski vardır.",
-            indication="Üst solunum yolu enfeksiyonları, idrar yolu enfeksiyonları"
-        )
-    ]
-    for ilac in ilaclar:
-        db.session.add(ilac)
-
-    # Bazı kullanıcıların favori/aldığı ilaçları
-    favori_ve_alanlar = [
-        (kullanicilar[0], ilaclar[0], True, False),
-        (kullanicilar[0], ilaclar[1], False, True),
-        (kullanicilar[1], ilaclar[1], True, True),
-        (kullanicilar[2], ilaclar[0], False, False)
-    ]
-    for kullanici, ilac, favori, aldi in favori_ve_alanlar:
-        um = UserMedicine(
-            user=kullanici,
-            medicine=ilac,
-            favorited=favori,
-            ordered=aldi
-        )
-        db.session.add(um)
-
-    db.session.commit()
+SEED_TABLES = ("department", "hospital", "doctor", "user", "test_result", "medicine", "user_medicine")
+
+
+def ensure_schema():
+    """Eksik ORM tablolarını oluştur (idempotent); oluşturulan tablo adlarını döner.
+
+    Tablolar zaten varsa maliyeti tek bir sqlite_master sorgusudur; veri silinmez.
+    """
+    with db_page.app_context():
+        existing = {row[0] for row in db.session.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+        missing = [table for name, table in db.metadata.tables.items() if name not in existing]
+        if missing:
+            db.metadata.create_all(db.engine, tables=missing)
+        return [table.name for table in missing]
+
+
+def is_empty():
+    with db_page.app_context():
+        return all(db.session.execute(text(f'SELECT 1 FROM "{table}" LIMIT 1')).first() is None
+                   for table in SEED_TABLES)
+
+
+def seed_database(reset=False, rng=None):
+    """Örnek verileri toplu INSERT'lerle yükle; reset=True ise ORM tabloları önce silinir.
+
+    Tablolarda veri varsa ve reset istenmediyse hiçbir şey yapmadan False döner.
+    """
+    rng = rng or random.Random()
+    with db_page.app_context():
+        if reset:
+            db.drop_all()  # varsa eski tabloları siler
+            db.create_all()  # yeni tabloları oluşturur
+        elif not is_empty():
+            return False
+
+        # 20 Departman ekleyelim
+        departman_isimleri = [
+            "Kardiyoloji", "Nöroloji", "Ortopedi", "Dahiliye", "Çocuk Sağlığı",
+            "Göz Hastalıkları", "Dermatoloji", "Psikiyatri", "KBB", "Genel Cerrahi",
+            "Üroloji", "Göğüs Hastalıkları", "Radyoloji", "Fizik Tedavi", "Enfeksiyon",
+            "Kadın Hastalıkları", "Nefroloji", "Endokrinoloji", "Beslenme ve Diyet", "Acil Servis"
+        ]
+        departmanlar = [{'id': str(i).zfill(3), 'name': isim, 'icon': "🏥"}
+                        for i, isim in enumerate(departman_isimleri, start=1)]
+
+        # 8 Hastane ekleyelim
+        hastane_isimleri = [
+            "Şehir Hastanesi", 'Ankara Şehir Hastanesi', 'Hacettepe Üniversitesi Hastanesi', 'Gazi Üniversitesi Hastanesi', "Özel Medica", "Klinik Plus", "Sağlık Merkezi", "Devlet Hastanesi"
+        ]
+        hastaneler = [{
+            'id': i,
+            'name': isim,
+            'location': f"{i}. Cadde, Şehir Merkezi",
+            'distance': f"{rng.randint(1,20)} km",
+            'rating': f"{rng.uniform(3.5,5):.1f}",
+            # Ankara merkezi çevresinde ~15 km
+            'latitude': round(39.925 + rng.uniform(-0.13, 0.13), 6),
+            'longitude': round(32.855 + rng.uniform(-0.17, 0.17), 6),
+        } for i, isim in enumerate(hastane_isimleri, start=1)]
+
+        # Her departman ve hastaneye 3'er doktor ekleyelim
+        doktor_adlari = [ 'Prof. Dr. Ahmet Omurga', 'Prof. Dr. Selim Beyin', 'Doç. Dr. Elif Sinir', 'Uz. Dr. Can Refleks', 'Prof. Dr. Hasan İç', 'Doç. Dr. Merve Genel', 'Uz. Dr. Kemal Sistem', 
+            "Dr. Ahmet Yılmaz", 'Prof. Dr. Mehmet Kardiyak', 'Uz. Dr. Ali Damar', 'Doç. Dr. Ayşe Kalp', "Dr. Ayşe Demir", "Dr. Mehmet Kaya", "Dr. Fatma Çelik",
+            "Dr. Hasan Şahin", 'Prof. Dr. Fatma Ritim', "Dr. Elif Aydın", "Dr. Can Özkan", "Dr. Zeynep Korkmaz",
+            "Dr. Ali Yıldız", "Dr. Selin Kurt", 'Prof. Dr. Fatma Kemik', "Dr. Emre Aksoy", "Dr. Derya Taş",
+            "Dr. Murat Deniz", 'Doç. Dr. Emre Eklem', "Dr. Yasemin Öztürk", "Dr. Kerem Uysal", "Dr. Seda Polat",
+            "Dr. Cem Sarı", 'Uz. Dr. Zeynep Kas', "Dr. Melis Kılıç", "Dr. Okan Acar", "Dr. Ebru Doğan"
+        ]
+
+        # Doktorları departmanlara ve hastanelere dağıt (isimler bitince durur)
+        yerlesim = [(d, h) for d in departmanlar for h in hastaneler for _ in range(3)]
+        doktorlar = [{
+            'name': isim,
+            'experience': f"{rng.randint(1,30)} yıl",
+            'rating': f"{rng.uniform(3.0,5.0):.1f}",
+            'department_id': d['id'],
+            'hospital_id': h['id'],
+        } for isim, (d, h) in zip(doktor_adlari, yerlesim)]
+
+        # 5 Kullanıcı ekleyelim
+        kullanicilar = [{
+            'id': i,
+            'tc_no': f"1234567890{i}",
+            'name': f"Kullanıcı {i}",
+            'email': f"kullanici{i}@ornek.com",
+            'password': "sifre123"  # örnek şifre
+        } for i in range(1, 6)]
+
+        # Kullanıcıların bazı test sonuçları
+        test_tipleri = ["Hemogram", "Biyokimya"]
+        test_ismi_ve_degerleri = [
+            ("Hemoglobin", "14.2", "g/dL", "Normal", "12-16"),
+            ("Glukoz", "110", "mg/dL", "Uyarı", "70-99"),
+            ("Kolesterol", "190", "mg/dL", "Normal", "125-200"),
+            ("Trombosit", "250", "10^3/uL", "Normal", "150-400"),
+            ("Üre", "35", "mg/dL", "Normal", "10-50")
+        ]
+        test_sonuclari = []
+        for kullanici in kullanicilar:
+            for _ in range(rng.randint(1,3)):  # Her kullanıcıya 1-3 test sonucu
+                test_ismi, deger, birim, durum, aralik = rng.choice(test_ismi_ve_degerleri)
+                test_sonuclari.append({
+                    'user_id': kullanici['id'],
+                    'test_type': rng.choice(test_tipleri),
+                    'test_name': test_ismi,
+                    'value': deger,
+                    'unit': birim,
+                    'status': durum,
+                    'range_info': aralik,
+                    'test_date': datetime.utcnow().date()
+                })
+
+        # 2 İlaç ekleyelim
+        ilaclar = [
+            {
+                'id': 1,
+                'name': "Parol",
+                'active_ingredient': "Parasetamol",
+                'manufacturer': "ABC İlaç",
+                'price': "15 TL",
+                'prescription': False,
+                'stock': "Yeterli",
+                'usage': "Ağrı kesici ve ateş düşürücü olarak kullanılır.",
+                'warning': "Hamilelikte dikkatli kullanılmalı.",
+                'indication': "Baş ağrısı, ateş, kas ağrıları"
+            },
+            {
+                'id': 2,
+                'name': "Amoksilin",
+                'active_ingredient': "Amoksisilin",
+                'manufacturer': "XYZ İlaç",
+                'price': "25 TL",
+                'prescription': True,
+                'stock': "Orta",
+                'usage': "Bakteriyel enfeksiyonlarda kullanılır.",
+                'warning': "Alerjik reaksiyon riski vardır.",
+                'indication': "Üst solunum yolu enfeksiyonları, idrar yolu enfeksiyonları"
+            }
+        ]
+
+        # Bazı kullanıcıların favori/aldığı ilaçları (kullanıcı, ilaç, favori, aldı)
+        favori_ve_alanlar = [
+            {'user_id': 1, 'medicine_id': 1, 'favorited': True, 'ordered': False},
+            {'user_id': 1, 'medicine_id': 2, 'favorited': False, 'ordered': True},
+            {'user_id': 2, 'medicine_id': 2, 'favorited': True, 'ordered': True},
+            {'user_id': 3, 'medicine_id': 1, 'favorited': False, 'ordered': False},
+        ]
+
+        # Tablo başına tek executemany
+        for model, rows in ((Department, departmanlar), (Hospital, hastaneler), (Doctor, doktorlar),
+                            (User, kullanicilar), (TestResult, test_sonuclari), (Medicine, ilaclar),
+                            (UserMedicine, favori_ve_alanlar)):
+            db.session.execute(insert(model), rows)
+        db.session.commit()
     print("Veritabanı örnek verilerle dolduruldu.")
+    return True
@@ -0,0 +1,386 @@
+# directory.py
+"""Bölüm / hastane / doktor dizininin bellek içi anlık görüntüsü.
+
+Sohbet randevu akışının her adımı ORM sorgusu yerine bu anlık görüntü
+üzerinde sözlük araması yapar. department, hospital ve doctor tablolarındaki
+her değişiklik trigger'larla `data_version` tablosundaki 'directory'
+sürümünü artırır; anlık görüntü sürüm değişince yeniden yüklenir.
+"""
+import heapq
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from data_access import database
+from geo import HospitalLocator, NEAREST_LIMIT, format_distance
+from metrics import record_cache, timed_query
+from text_utils import fold_tokens, turkish_fold
+
+# Sürüm kontrolü en fazla bu sıklıkta veritabanına gider (saniye)
+VERSION_CHECK_INTERVAL = float(os.getenv("MEDVICE_DIRECTORY_CHECK_INTERVAL", "5"))
+
+DIRECTORY_TABLES = ("department", "hospital", "doctor")
+
+# AI yanıtlarında sık geçen alternatif bölüm adları
+DEPARTMENT_SYNONYMS = {
+    "Dahiliye": ["İç Hastalıkları"],
+    "KBB": ["Kulak Burun Boğaz"],
+    "Kardiyoloji": ["Kalp ve Damar Hastalıkları", "Kalp Damar"],
+    "Çocuk Sağlığı": ["Pediatri", "Çocuk Hastalıkları", "Çocuk Sağlığı ve Hastalıkları"],
+    "Kadın Hastalıkları": ["Kadın Doğum", "Kadın Hastalıkları ve Doğum", "Jinekoloji"],
+    "Göz Hastalıkları": ["Göz", "Oftalmoloji"],
+    "Fizik Tedavi": ["Fiziksel Tıp ve Rehabilitasyon", "Fizik Tedavi ve Rehabilitasyon"],
+    "Enfeksiyon": ["Enfeksiyon Hastalıkları"],
+    "Psikiyatri": ["Ruh Sağlığı"],
+    "Acil Servis": ["Acil"],
+    "Göğüs Hastalıkları": ["Göğüs", "Solunum"],
+    "Beslenme ve Diyet": ["Diyetisyen", "Beslenme"],
+    "Dermatoloji": ["Cildiye", "Deri Hastalıkları"],
+}
+
+_EXPERIENCE_RE = re.compile(r"(\d+)")
+
+# Doktor adlarındaki unvanlar aramada yok sayılır ("Prof. Dr.", "Uz. Dr.", "Op. Dr.")
+TITLE_TOKENS = frozenset({"prof", "doc", "dr", "uz", "op", "yrd", "asist", "asst", "dt", "psk", "ecz", "dyt"})
+TYPEAHEAD_MAX_PREFIX = 8
+TYPEAHEAD_LIMIT = 10
+FUZZY_THRESHOLD = 0.45
+TYPE_ORDER = {"department": 0, "hospital": 1, "doctor": 2}
+
+
+def _to_float(value, default):
+    try:
+        return float(value) if value not in (None, "") else default
+    except (TypeError, ValueError):
+        return default
+
+
+def _parse_experience(value, default=5):
+    match = _EXPERIENCE_RE.search(value or "")
+    return int(match.group(1)) if match else default
+
+
+def install_version_triggers(conn):
+    """Dizin tablolarına sürüm artıran trigger'ları kur (idempotent)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO data_version (name, version) VALUES ('directory', 0)")
+    for table in DIRECTORY_TABLES:
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_directory_version
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE data_version SET version = version + 1 WHERE name = 'directory';
+                END
+            """)
+    conn.commit()
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def strip_titles(tokens):
+    return [token for token in tokens if token not in TITLE_TOKENS]
+
+
+class DirectoryTypeahead:
+    """Bölüm / hastane / doktor adları üzerinde önek ve trigram indeksi.
+
+    Her kelimenin ilk TYPEAHEAD_MAX_PREFIX harfinin tüm önekleri sözlükte
+    tutulur; çok kelimeli sorguda her kelimenin aday kümesi kesiştirilir.
+    Önek eşleşmesi limitten az sonuç verirse yazım hatalarına karşı trigram
+    benzerliğine düşülür.
+    """
+
+    def __init__(self, entries, aliases=None):
+        self.entries = entries  # [{'type', 'id', 'name', ...}]
+        self.tokens = []        # giriş -> unvanları atılmış katlanmış kelimeler
+        self.prefixes = {}      # önek -> {giriş, ...}
+        self.trigrams = {}      # trigram -> {giriş, ...}
+        self.gram_counts = []   # giriş -> ad trigram sayısı
+        aliases = aliases or {}  # giriş -> ek adlar (bölüm eş anlamlıları)
+        for position, entry in enumerate(entries):
+            tokens = strip_titles(fold_tokens(entry["name"]))
+            self.tokens.append(tokens)
+            for alias in aliases.get(position, ()):
+                tokens = tokens + fold_tokens(alias)
+            for token in tokens:
+                for length in range(1, min(len(token), TYPEAHEAD_MAX_PREFIX) + 1):
+                    self.prefixes.setdefault(token[:length], set()).add(position)
+            grams = _trigrams(" ".join(self.tokens[position]))
+            self.gram_counts.append(len(grams))
+            for trigram in grams:
+                self.trigrams.setdefault(trigram, set()).add(position)
+        # Eşitlikte sabit sıra: tür, sonra puan
+        self.base_rank = [(TYPE_ORDER[entry["type"]], -(entry.get("rating") or 0), entry["name"])
+                          for entry in entries]
+
+    def _prefix_matches(self, tokens, allowed):
+        candidates = None
+        for token in tokens:
+            found = self.prefixes.get(token[:TYPEAHEAD_MAX_PREFIX], set())
+            if len(token) > TYPEAHEAD_MAX_PREFIX:
+                found = {p for p in found if any(t.startswith(token) for t in self.tokens[p])}
+            candidates = found if candidates is None else candidates & found
+            if not candidates:
+                return set()
+        return {p for p in candidates if self.entries[p]["type"] in allowed}
+
+    def _fuzzy_matches(self, text, allowed, exclude):
+        grams = _trigrams(text)
+        counts = {}
+        for gram in grams:
+            for position in self.trigrams.get(gram, ()):
+                counts[position] = counts.get(position, 0) + 1
+        scored = {}
+        for position, shared in counts.items():
+            if position in exclude or self.entries[position]["type"] not in allowed:
+                continue
+            # Dice katsayısı: uzun adların kısa sorguyla kolayca eşleşmesini engeller
+            similarity = 2 * shared / (len(grams) + self.gram_counts[position])
+            if similarity >= FUZZY_THRESHOLD:
+                scored[position] = similarity
+        return scored
+
+    def search(self, text, types=None, limit=TYPEAHEAD_LIMIT):
+        tokens = strip_titles(fold_tokens(text))
+        if not tokens:
+            return []
+        allowed = set(types or TYPE_ORDER)
+        exact = self._prefix_matches(tokens, allowed)
+        query = " ".join(tokens)
+
+        def rank(position):
+            # Tam ad öneki > herhangi bir kelime öneki; sonra tür ve puan
+            return (not " ".join(self.tokens[position]).startswith(query),) + self.base_rank[position]
+
+        # Kısa öneklerde aday kümesi büyük; tamamını sıralamak yerine ilk `limit` seçilir
+        ordered = heapq.nsmallest(limit, exact, key=rank)
+        # Kısa sorgularda trigram benzerliği gürültülü; yazım hatası toleransı 4+ harfte
+        if len(ordered) < limit and len(query) >= 4:
+            fuzzy = self._fuzzy_matches(query, allowed, exact)
+            ordered += heapq.nsmallest(limit - len(ordered), fuzzy, key=lambda p: (-fuzzy[p],) + self.base_rank[p])
+        return [self.entries[position] for position in ordered]
+
+
+class DirectorySnapshot:
+    """Bir sürüme ait değişmez dizin verisi"""
+
+    def __init__(self, version, departments, hospitals, doctors):
+        self.version = version
+        self.departments = {}          # id -> {'id', 'name', 'icon'}
+        self.department_aliases = {}   # katlanmış ad -> id
+        self.hospitals = {}            # id -> hastane sözlüğü
+        self.hospitals_by_department = {}  # department_id -> [hastane, ...] (puana göre)
+        self.doctors_by_hospital_department = {}  # (hospital_id, department_id) -> [doktor, ...]
+        self.doctor_ids_by_department = {}  # department_id -> [doktor ID, ...]
+        self.doctor_ids = set()
+
+        for dept_id, name, icon in departments:
+            self.departments[dept_id] = {'id': dept_id, 'name': name, 'icon': icon}
+            self.department_aliases[turkish_fold(name)] = dept_id
+            for synonym in DEPARTMENT_SYNONYMS.get(name, ()):
+                self.department_aliases.setdefault(turkish_fold(synonym), dept_id)
+        # Uzun takma adlar önce denensin ("göğüs hastalıkları" > "göğüs")
+        self._aliases_by_length = sorted(self.department_aliases.items(), key=lambda kv: -len(kv[0]))
+
+        for hospital_id, name, location, distance, rating, latitude, longitude in hospitals:
+            self.hospitals[hospital_id] = {
+                'id': hospital_id,
+                'name': name,
+                'address': location,
+                'distance': distance,
+                'rating': _to_float(rating, 4.0),
+                'latitude': latitude,
+                'longitude': longitude,
+            }
+
+        hospital_ids_by_department = {}
+        for doctor_id, name, experience, rating, department_id, hospital_id in doctors:
+            self.doctors_by_hospital_department.setdefault((hospital_id, department_id), []).append({
+                'id': doctor_id,
+                'name': name,
+                'experience': _parse_experience(experience),
+                'rating': _to_float(rating, 4.5),
+            })
+            hospital_ids_by_department.setdefault(department_id, set()).add(hospital_id)
+            self.doctor_ids_by_department.setdefault(department_id, []).append(doctor_id)
+            self.doctor_ids.add(doctor_id)
+
+        for doctor_list in self.doctors_by_hospital_department.values():
+            doctor_list.sort(key=lambda d: -d['rating'])
+        self._index_lock = threading.Lock()
+        self._hospital_ids_by_department = hospital_ids_by_department
+        self._locator = None
+        for department_id, hospital_ids in hospital_ids_by_department.items():
+            self.hospitals_by_department[department_id] = sorted(
+                (self.hospitals[h] for h in hospital_ids if h in self.hospitals),
+                key=lambda h: -h['rating']
+            )
+        # Arama indeksi yükleme sırasında kurulur; ilk typeahead isteği kurulum maliyetini ödemesin
+        entries = self._typeahead_entries()
+        aliases = {position: DEPARTMENT_SYNONYMS.get(entry['name'], ())
+                   for position, entry in enumerate(entries) if entry['type'] == 'department'}
+        self._typeahead = DirectoryTypeahead(entries, aliases)
+
+    def resolve_department(self, text):
+        """Serbest metinden (ör. AI önerisi) bölüm ID'si bul"""
+        folded = turkish_fold(text).strip(" .:-*[]()")
+        if not folded:
+            return None
+        if folded in self.department_aliases:
+            return self.department_aliases[folded]
+        for alias, dept_id in self._aliases_by_length:
+            if re.search(rf"\b{re.escape(alias)}\b", folded):
+                return dept_id
+        for alias, dept_id in self._aliases_by_length:
+            if folded in alias:
+                return dept_id
+        return None
+
+    def hospitals_for_department(self, department_id):
+        return self.hospitals_by_department.get(department_id, [])
+
+    def nearest_hospitals(self, department_id, location, k=NEAREST_LIMIT):
+        """Konuma en yakın k hastane (mesafesi hesaplanmış kopyalar); department_id=None tüm hastaneler.
+
+        Koordinatı olmayan hastaneler k'ya tamamlamak için puan sırasıyla sona eklenir.
+        """
+        lat, lon = location
+        results = []
+        for km, hospital_id in self.locator().nearest(lat, lon, department_id, k):
+            results.append({**self.hospitals[hospital_id], 'distance': format_distance(km),
+                            'distance_km': round(km, 2)})
+        if len(results) < k:
+            pool = self.hospitals_for_department(department_id) if department_id is not None \
+                else sorted(self.hospitals.values(), key=lambda h: -h['rating'])
+            located = self.locator().points
+            results += [dict(h) for h in pool if h['id'] not in located][:k - len(results)]
+        return results
+
+    def locator(self):
+        """Bu sürümün uzamsal indeksi; ilk konumlu sorguda bir kez kurulur"""
+        if self._locator is None:
+            with self._index_lock:
+                if self._locator is None:
+                    self._locator = HospitalLocator(self.hospitals, self._hospital_ids_by_department)
+        return self._locator
+
+    def doctors_for(self, hospital_id, department_id):
+        return self.doctors_by_hospital_department.get((hospital_id, department_id), [])
+
+    def typeahead(self):
+        """Bu sürümün arama indeksi (anlık görüntüyle birlikte kurulur)"""
+        return self._typeahead
+
+    def _typeahead_entries(self):
+        entries = [{'type': 'department', **department} for department in self.departments.values()]
+        departments_by_hospital = {}
+        doctors = []
+        for (hospital_id, department_id), doctor_list in self.doctors_by_hospital_department.items():
+            department = self.departments.get(department_id)
+            hospital = self.hospitals.get(hospital_id)
+            if department is None or hospital is None:
+                continue
+            departments_by_hospital.setdefault(hospital_id, []).append(
+                {'id': department_id, 'name': department['name']})
+            for doctor in doctor_list:
+                doctors.append({
+                    'type': 'doctor',
+                    'id': doctor['id'],
+                    'name': doctor['name'],
+                    'rating': doctor['rating'],
+                    'department_id': department_id,
+                    'department': department['name'],
+                    'hospital_id': hospital_id,
+                    'hospital': hospital['name'],
+                })
+        for hospital in self.hospitals.values():
+            entries.append({
+                'type': 'hospital',
+                'id': hospital['id'],
+                'name': hospital['name'],
+                'address': hospital['address'],
+                'rating': hospital['rating'],
+                'departments': sorted(departments_by_hospital.get(hospital['id'], []), key=lambda d: d['name']),
+            })
+        return entries + doctors
+
+
+class ClinicDirectory:
+    """Sürüm değişiminde yenilenen dizin anlık görüntüsü"""
+
+    def __init__(self, db=None, check_interval=VERSION_CHECK_INTERVAL):
+        self.db = db or database
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _read_version(conn):
+        try:
+            row = conn.execute("SELECT version FROM data_version WHERE name = 'directory'").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
+
+    @timed_query
+    def _load(self):
+        conn = self.db.reader()
+        # Sürüm ve tablolar aynı okuma işleminde: arada gelen yazma karışmasın
+        conn.execute("BEGIN")
+        try:
+            version = self._read_version(conn)
+            departments = conn.execute("SELECT id, name, icon FROM department").fetchall()
+            hospitals = conn.execute(
+                "SELECT id, name, location, distance, rating, latitude, longitude FROM hospital"
+            ).fetchall()
+            doctors = conn.execute(
+                "SELECT id, name, experience, rating, department_id, hospital_id FROM doctor"
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        return DirectorySnapshot(version, departments, hospitals, doctors)
+
+    @timed_query
+    def _current_version(self):
+        return self._read_version(self.db.reader())
+
+    def snapshot(self):
+        """Güncel anlık görüntü; sürüm kontrolü check_interval ile sınırlı"""
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and now - self._checked_at < self.check_interval:
+            record_cache('clinic_directory', True)
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+                record_cache('clinic_directory', True)
+                return snapshot
+            version = self._current_version() if snapshot is not None else None
+            hit = snapshot is not None and version is not None and version == snapshot.version
+            record_cache('clinic_directory', hit)
+            if not hit:
+                snapshot = self._snapshot = self._load()
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    def invalidate(self):
+        """Bu process içinde yapılan değişikliklerden sonra hemen yeniden yükle"""
+        with self._lock:
+            self._snapshot = None
+
+
+clinic_directory = ClinicDirectory()
@@ -0,0 +1,167 @@
+# geo.py
+"""Kullanıcı konumuna en yakın hastaneler için ızgara (grid) tabanlı uzamsal indeks.
+
+Hastaneler enlem/boylamlarına göre CELL_DEG derecelik hücrelere, bölüm
+başına ayrı kovalara yerleştirilir. k en yakın sorgusu kullanıcının
+hücresinden başlayıp halka halka genişler; bulunan k. hastane, henüz
+bakılmamış halkaların alt sınır mesafesinden yakınsa arama durur. Böylece
+binlerce tesiste de sorgu yalnızca çevredeki birkaç hücreye bakar. Hastanelerden
+uzak bir noktada (ör. yurt dışı) halkalar milyonlarca boş hücre tarayacağından,
+bakılan hücre sayısı dolu hücre sayısıyla orantılı bir bütçeyi aşınca bölümün
+hastaneleri doğrusal taranır.
+
+Sonuçlar (bölüm, kaba konum hücresi, k) anahtarıyla önbelleğe alınır: aynı
+mahalledeki kullanıcılar aynı aday listesini paylaşır, mesafeler ise her
+istekte gerçek konumdan yeniden hesaplanır. İndeks bir dizin anlık
+görüntüsüne bağlıdır ve dizin sürümü değişince yeniden kurulur.
+"""
+import heapq
+import math
+import os
+import threading
+from collections import OrderedDict
+
+from flask import session
+
+from metrics import record_cache
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+CELL_DEG = float(os.getenv("MEDVICE_GEO_CELL_DEG", "0.1"))          # indeks hücresi (~11 km)
+CACHE_CELL_DEG = float(os.getenv("MEDVICE_GEO_CACHE_CELL_DEG", "0.01"))  # önbellek hücresi (~1 km)
+CACHE_SIZE = 4096
+NEAREST_LIMIT = 5
+# Halka aramasında dolu hücre başına bakılabilecek hücre; aşılırsa doğrusal taramaya geçilir
+RING_CELL_BUDGET = 8
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def parse_location(lat, lon):
+    """Geçerli (enlem, boylam) demeti ya da None"""
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or math.isnan(lat) or math.isnan(lon):
+        return None
+    return lat, lon
+
+
+def remember_location(location):
+    """Tarayıcının gönderdiği konumu ({lat, lon}) oturumda sakla"""
+    if isinstance(location, dict):
+        parsed = parse_location(location.get("lat"), location.get("lon"))
+        if parsed:
+            session["location"] = list(parsed)
+
+
+def user_location():
+    location = session.get("location")
+    return parse_location(*location) if location else None
+
+
+def format_distance(km):
+    return f"{km:.1f} km" if km < 100 else f"{km:.0f} km"
+
+
+def _cell(lat, lon, size=CELL_DEG):
+    return math.floor(lat / size), math.floor(lon / size)
+
+
+class HospitalLocator:
+    """Bölüm başına hücre kovaları; department_id=None tüm hastaneleri kapsar"""
+
+    def __init__(self, hospitals, hospital_ids_by_department):
+        self.points = {}    # hastane ID -> (enlem, boylam)
+        self.buckets = {}   # department_id -> {hücre: [hastane ID, ...]}
+        self.extent = {}    # department_id -> (min satır, max satır, min sütun, max sütun)
+        for hospital_id, hospital in hospitals.items():
+            point = parse_location(hospital.get("latitude"), hospital.get("longitude"))
+            if point:
+                self.points[hospital_id] = point
+
+        groups = {None: list(self.points)}
+        for department_id, hospital_ids in hospital_ids_by_department.items():
+            groups[department_id] = [h for h in hospital_ids if h in self.points]
+        for department_id, hospital_ids in groups.items():
+            cells = {}
+            for hospital_id in hospital_ids:
+                cells.setdefault(_cell(*self.points[hospital_id]), []).append(hospital_id)
+            if cells:
+                self.buckets[department_id] = cells
+                rows = [cell[0] for cell in cells]
+                columns = [cell[1] for cell in cells]
+                self.extent[department_id] = (min(rows), max(rows), min(columns), max(columns))
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _ring(row, column, radius):
+        if radius == 0:
+            yield row, column
+            return
+        for c in range(column - radius, column + radius + 1):
+            yield row - radius, c
+            yield row + radius, c
+        for r in range(row - radius + 1, row + radius):
+            yield r, column - radius
+            yield r, column + radius
+
+    def _search(self, lat, lon, department_id, k):
+        cells = self.buckets.get(department_id)
+        if not cells:
+            return []
+        row, column = _cell(lat, lon)
+        min_row, max_row, min_column, max_column = self.extent[department_id]
+        max_radius = max(abs(row - min_row), abs(row - max_row), abs(column - min_column), abs(column - max_column))
+
+        budget = RING_CELL_BUDGET * len(cells) + 9  # en az ilk iki halka (3x3)
+        visited = 0
+        found = []
+        for radius in range(max_radius + 1):
+            visited += 8 * radius or 1
+            if visited > budget:
+                return self._scan(lat, lon, cells, k)
+            for cell in self._ring(row, column, radius):
+                for hospital_id in cells.get(cell, ()):
+                    found.append((haversine_km(lat, lon, *self.points[hospital_id]), hospital_id))
+            if len(found) >= k:
+                found.sort()
+                # Bakılmamış halkalardaki en yakın nokta en az bu kadar uzakta
+                # (boylam derecesi kutba doğru kısalır, bu yüzden en dar enlem alınır)
+                widest_lat = min(89.9, abs(lat) + (radius + 1) * CELL_DEG)
+                bound = radius * CELL_DEG * KM_PER_DEGREE * math.cos(math.radians(widest_lat))
+                if found[k - 1][0] <= bound:
+                    break
+        found.sort()
+        return [hospital_id for _, hospital_id in found[:k]]
+
+    def _scan(self, lat, lon, cells, k):
+        """Tüm kovalardaki hastaneler üzerinde doğrusal k en yakın"""
+        distances = ((haversine_km(lat, lon, *self.points[hospital_id]), hospital_id)
+                     for bucket in cells.values() for hospital_id in bucket)
+        return [hospital_id for _, hospital_id in heapq.nsmallest(k, distances)]
+
+    def nearest(self, lat, lon, department_id=None, k=NEAREST_LIMIT):
+        """[(mesafe km, hastane ID), ...] yakından uzağa; adaylar kaba hücre bazında önbellekli"""
+        key = (department_id, _cell(lat, lon, CACHE_CELL_DEG), k)
+        with self._lock:
+            hospital_ids = self._cache.get(key)
+            if hospital_ids is not None:
+                self._cache.move_to_end(key)
+        record_cache("nearest_hospitals", hospital_ids is not None)
+        if hospital_ids is None:
+            hospital_ids = self._search(lat, lon, department_id, k)
+            with self._lock:
+                self._cache[key] = hospital_ids
+                while len(self._cache) > CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        return sorted((haversine_km(lat, lon, *self.points[h]), h) for h in hospital_ids)
@@ -0,0 +1,145 @@
+# intent_matcher.py
+"""Randevu akışı için derlenmiş niyet ve seçim eşleştiricisi.
+
+Her niyet (randevu, aciliyet, onay, ret, ...) kendi derlenmiş regex'ine
+sahiptir; mesaj Türkçe kurallarıyla bir kez katlanır ve her niyet ayrı
+aranır. Niyetler örtüşebilir ("evet" hem onay hem son onaydır), bu yüzden
+tek bir alternasyon regex'i kullanılmaz: orada aynı konumda yalnızca ilk
+listelenen niyet eşleşir. Hastane/doktor seçimi
+ise aday isimler üzerinden kurulan kelime indeksiyle puanlanır; birden
+fazla aday aynı puanı alırsa ilk alt dize eşleşmesi seçilmek yerine
+belirsizlik bildirilir.
+"""
+import bisect
+import re
+from functools import lru_cache
+
+from text_utils import turkish_fold
+
+# Katlanmış (diakritiksiz, küçük harf) metin üzerinde çalışan kalıplar.
+# Başa kelime sınırı eklenir; Türkçe ekleri yakalamak için gereken yerde \w* var.
+INTENT_PATTERNS = {
+    'appointment': [r'randevu\w*', r'doktora git\w*', r'muayene ol\w*',
+                    r'hastaneye git\w*', r'doktor bul\w*'],
+    'urgency': [r'acil(?:en)?\b', r'derhal\b', r'hemen\b', r'acele\w*'],
+    'department_suggestion': [r'basvuru birimi:', r'bolum:', r'onerilen\b'],
+    'confirm': [r'evet\w*', r'tamam\w*', r'randevu al\w*', r'istiyorum\b'],
+    'final_confirm': [r'evet\w*', r'onay\w*', r'olustur\w*', r'tamam\w*'],
+    'alternative': [r'baska\w*', r'farkli\w*', r'degistir\w*'],
+    'decline': [r'hayir\w*', r'istemiyorum\b', r'iptal\w*', r'vazgec\w*'],
+}
+
+# Seçimde ayırt edici olmayan kelimeler (unvanlar, genel hastane kelimeleri)
+SELECTION_STOPWORDS = {
+    'prof', 'doc', 'uz', 'dr', 'op', 'dt', 'dyt',
+    'hastane', 'hastanesi', 'hastanesini', 'hastaneyi', 'universitesi',
+    'doktor', 'doktoru', 'doktorunu', 'hoca', 'hocayi', 'bey', 'hanim',
+    'istiyorum', 'olsun', 'secmek', 'seciyorum', 've', 'ile', 'bu', 'lutfen',
+}
+
+_NUMBER_RE = re.compile(r'\s*(\d+)\s*[.)]?\s*(?:numara\w*|nolu)?\s*')
+_TOKEN_RE = re.compile(r'\w+')
+
+
+class IntentMatcher:
+    """Niyet başına bir derlenmiş regex; örtüşen niyetlerin hepsini bulur"""
+
+    def __init__(self, patterns=INTENT_PATTERNS):
+        self._regexes = []
+        for intent, fragments in patterns.items():
+            # Uzun kalıplar önce: "randevu al" "randevu"dan önce denensin
+            alternation = "|".join(sorted(fragments, key=len, reverse=True))
+            self._regexes.append((intent, re.compile(r"(?<!\w)(?:" + alternation + ")")))
+
+    def find(self, text, folded=False):
+        """Metinde geçen niyetlerin kümesi"""
+        if not folded:
+            text = turkish_fold(text)
+        return {intent for intent, regex in self._regexes if regex.search(text)}
+
+
+intent_matcher = IntentMatcher()
+
+
+def classify_reply(message, options):
+    """Mesajı verilen sıradaki ilk uyan niyete eşle (örn. ret > onay)"""
+    found = intent_matcher.find(message)
+    for intent in options:
+        if intent in found:
+            return intent
+    return None
+
+
+class SelectionResult:
+    """Seçim sonucu: tek aday, belirsiz adaylar veya hiçbiri"""
+    __slots__ = ('index', 'ambiguous')
+
+    def __init__(self, index=None, ambiguous=()):
+        self.index = index
+        self.ambiguous = list(ambiguous)
+
+
+class CandidateIndex:
+    """Aday isimler (hastane/doktor) üzerinde kelime indeksi"""
+
+    def __init__(self, names):
+        self.names = list(names)
+        self._postings = {}  # kelime -> {aday indeksleri}
+        for i, name in enumerate(self.names):
+            for token in _TOKEN_RE.findall(turkish_fold(name)):
+                if token not in SELECTION_STOPWORDS:
+                    self._postings.setdefault(token, set()).add(i)
+        self._sorted_tokens = sorted(self._postings)
+
+    def _prefix_postings(self, token):
+        """token ile başlayan indeks kelimeleri (Türkçe ekler için: 'ankaradaki')"""
+        start = bisect.bisect_left(self._sorted_tokens, token)
+        for candidate in self._sorted_tokens[start:]:
+            if not candidate.startswith(token):
+                break
+            yield self._postings[candidate]
+
+    def match(self, message):
+        folded = turkish_fold(message)
+
+        number = _NUMBER_RE.fullmatch(folded)
+        if number:
+            idx = int(number.group(1)) - 1
+            return SelectionResult(idx if 0 <= idx < len(self.names) else None)
+
+        scores = {}
+        for token in _TOKEN_RE.findall(folded):
+            if token in SELECTION_STOPWORDS or len(token) < 2:
+                continue
+            matched = self._postings.get(token)
+            if matched:
+                for i in matched:
+                    scores[i] = scores.get(i, 0) + 1.0
+                continue
+            # Tam eşleşme yoksa: mesaj kelimesi aday kelimesinin öneki veya tersi
+            if len(token) >= 3:
+                partial = set()
+                for postings in self._prefix_postings(token):
+                    partial |= postings
+                for cut in range(len(token) - 1, 2, -1):
+                    partial |= self._postings.get(token[:cut], set())
+                for i in partial:
+                    scores[i] = scores.get(i, 0) + 0.5
+
+        if not scores:
+            return SelectionResult()
+        best = max(scores.values())
+        top = sorted(i for i, score in scores.items() if score == best)
+        if len(top) == 1:
+            return SelectionResult(top[0])
+        return SelectionResult(ambiguous=top)
+
+
+@lru_cache(maxsize=1024)
+def _cached_index(names):
+    return CandidateIndex(names)
+
+
+def select_candidate(message, names):
+    """Aday listesinden mesaja en uygun olanı seç"""
+    return _cached_index(tuple(names)).match(message)
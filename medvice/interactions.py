@@ -0,0 +1,359 @@
+# interactions.py
+"""Etken madde bazlı ilaç etkileşim indeksi.
+
+drug_interaction tablosundaki (etken madde A, etken madde B) çiftleri bir kez
+belleğe alınır: her etken maddeye bir tamsayı id verilir ve her id için
+etkileştiği id'lerin bitset'i (Python int) tutulur. Kullanıcının ilaç
+listesi tek geçişte kontrol edilir: her ilacın etken maddeleri, o ana kadar
+görülen maddelerin bitset'iyle AND'lenir; sonuç bitleri doğrudan etkileşen
+çiftlerdir. n ilaç için n² sorgu yerine tek sorgu ve n bit işlemi yapılır.
+
+Tablo değişince trigger'lar data_version'daki 'interactions' sürümünü
+artırır; indeks sürüm değişince yeniden yüklenir. Kullanıcı başına sonuçlar
+önbellekte tutulur ve kullanıcı yeni bir ilaç sipariş edip favorilediğinde
+yalnızca o ilaç eklenerek güncellenir. Önbellekteki sonuç, user_medicine
+trigger'larının artırdığı kullanıcı liste sürümüne bağlıdır; liste başka bir
+worker'da veya doğrudan SQL ile değişse de bir sonraki kontrolde yeniden
+hesaplanır (güvenlik kontrolü bayat sonuç dönmez).
+
+    python -m interactions etkilesimler.csv   # ingredient_a, ingredient_b, severity, description
+"""
+import csv
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from data_access import database, Database
+from metrics import record_cache, timed_query
+from text_utils import turkish_fold
+
+VERSION_CHECK_INTERVAL = float(os.getenv("MEDVICE_INTERACTIONS_CHECK_INTERVAL", "5"))
+USER_CACHE_SIZE = int(os.getenv("MEDVICE_INTERACTIONS_CACHE_SIZE", "2048"))
+
+SEVERITY_ORDER = {"major": 0, "moderate": 1, "minor": 2}
+
+# Kombine ürünler: "Amoksisilin + Klavulanik asit", "Parasetamol, Kafein"
+_INGREDIENT_SPLIT_RE = re.compile(r"\s*(?:\+|,|/|;|\bve\b)\s*")
+
+# Başlangıç verisi; gerçek veri seti `python -m interactions dosya.csv` ile yüklenir
+STARTER_INTERACTIONS = [
+    ("Varfarin", "Asetilsalisilik asit", "major", "Kanama riski belirgin şekilde artar."),
+    ("Varfarin", "Parasetamol", "moderate", "Düzenli parasetamol kullanımı INR değerini yükseltebilir."),
+    ("Varfarin", "İbuprofen", "major", "Kanama riski artar; birlikte kullanımdan kaçınılmalıdır."),
+    ("Amoksisilin", "Metotreksat", "major", "Metotreksat atılımı azalır, toksisite riski artar."),
+    ("İbuprofen", "Asetilsalisilik asit", "moderate", "İbuprofen aspirinin kalp koruyucu etkisini azaltabilir."),
+    ("Klaritromisin", "Simvastatin", "major", "Kas yıkımı (rabdomiyoliz) riski artar."),
+    ("Siprofloksasin", "Teofilin", "major", "Teofilin kan düzeyi yükselir, nöbet riski artar."),
+    ("Lansoprazol", "Metotreksat", "moderate", "Metotreksat düzeyi yükselebilir."),
+]
+
+
+def ingredient_key(name):
+    return " ".join(turkish_fold(name).split())
+
+
+def split_ingredients(active_ingredient):
+    """Etken madde metnini katlanmış madde anahtarlarına ayır"""
+    return [ingredient_key(part) for part in _INGREDIENT_SPLIT_RE.split(active_ingredient or "") if part.strip()]
+
+
+def install_interaction_schema(conn):
+    """drug_interaction tablosu, sürüm trigger'ları ve başlangıç verisi (idempotent)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS drug_interaction (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ingredient_a TEXT NOT NULL,
+            ingredient_b TEXT NOT NULL,
+            name_a TEXT NOT NULL,
+            name_b TEXT NOT NULL,
+            severity TEXT NOT NULL DEFAULT 'moderate',
+            description TEXT,
+            UNIQUE (ingredient_a, ingredient_b)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO data_version (name, version) VALUES ('interactions', 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_drug_interaction_{event.lower()}_version
+            AFTER {event} ON drug_interaction
+            BEGIN
+                UPDATE data_version SET version = version + 1 WHERE name = 'interactions';
+            END
+        """)
+    load_interactions(conn, STARTER_INTERACTIONS)
+
+
+def install_user_medicine_versions(conn):
+    """user_medicine değişikliklerinde kullanıcının liste sürümünü artıran trigger'lar (idempotent)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_medicine_version (
+            user_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    for event, rows in (("INSERT", ("NEW",)), ("UPDATE", ("OLD", "NEW")), ("DELETE", ("OLD",))):
+        bumps = "".join(f"""
+                INSERT INTO user_medicine_version (user_id, version) VALUES ({row}.user_id, 1)
+                ON CONFLICT (user_id) DO UPDATE SET version = version + 1;""" for row in rows)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_user_medicine_{event.lower()}_list_version
+            AFTER {event} ON user_medicine
+            BEGIN{bumps}
+            END
+        """)
+    conn.commit()
+
+
+def load_interactions(conn, rows):
+    """(madde A, madde B, şiddet, açıklama) satırlarını ekle/güncelle; çift sırası önemsiz"""
+    records = []
+    for name_a, name_b, severity, description in rows:
+        key_a, key_b = ingredient_key(name_a), ingredient_key(name_b)
+        if not key_a or not key_b or key_a == key_b:
+            continue
+        if key_b < key_a:
+            (key_a, name_a), (key_b, name_b) = (key_b, name_b), (key_a, name_a)
+        severity = (severity or "moderate").strip().lower()
+        records.append((key_a, key_b, name_a.strip(), name_b.strip(),
+                        severity if severity in SEVERITY_ORDER else "moderate", description))
+    conn.executemany("""
+        INSERT INTO drug_interaction (ingredient_a, ingredient_b, name_a, name_b, severity, description)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (ingredient_a, ingredient_b)
+        DO UPDATE SET severity = excluded.severity, description = excluded.description
+    """, records)
+    conn.commit()
+    return len(records)
+
+
+class InteractionIndex:
+    """Bir sürüme ait değişmez etkileşim bitset'leri"""
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.ids = {}        # katlanmış madde -> int id
+        self.names = []      # id -> görünen ad
+        self.adjacency = []  # id -> etkileştiği id'lerin bitset'i
+        self.details = {}    # (küçük id, büyük id) -> (şiddet, açıklama)
+        for key_a, key_b, name_a, name_b, severity, description in rows:
+            a, b = self._id(key_a, name_a), self._id(key_b, name_b)
+            self.adjacency[a] |= 1 << b
+            self.adjacency[b] |= 1 << a
+            self.details[(min(a, b), max(a, b))] = (severity, description)
+
+    def _id(self, key, name):
+        if key not in self.ids:
+            self.ids[key] = len(self.names)
+            self.names.append(name)
+            self.adjacency.append(0)
+        return self.ids[key]
+
+    def ingredient_ids(self, active_ingredient):
+        # Etkileşim verisinde geçmeyen maddeler kontrol dışı kalır
+        return [self.ids[key] for key in split_ingredients(active_ingredient) if key in self.ids]
+
+
+class UserInteractions:
+    """Bir kullanıcının ilaç listesi için artımlı etkileşim durumu"""
+
+    def __init__(self, index, list_version=None):
+        self.index = index
+        self.list_version = list_version  # hesaplandığı andaki user_medicine_version
+        self.seen = 0          # listedeki maddelerin bitset'i
+        self.owners = {}       # madde id -> [ilaç adı, ...]
+        self.medicine_ids = set()
+        self.found = {}        # (küçük id, büyük id) -> etkileşim sözlüğü
+
+    def add(self, medicine_id, name, active_ingredient):
+        """İlacı listeye ekle; yeni bulunan etkileşimleri döner"""
+        if medicine_id in self.medicine_ids:
+            return []
+        self.medicine_ids.add(medicine_id)
+        ids = self.index.ingredient_ids(active_ingredient)
+        new = []
+        for ingredient in ids:
+            hits = self.index.adjacency[ingredient] & self.seen
+            while hits:
+                low = hits & -hits
+                other = low.bit_length() - 1
+                hits ^= low
+                pair = (min(ingredient, other), max(ingredient, other))
+                interaction = self.found.get(pair)
+                if interaction is None:
+                    severity, description = self.index.details[pair]
+                    interaction = self.found[pair] = {
+                        "ingredients": [self.index.names[pair[0]], self.index.names[pair[1]]],
+                        "severity": severity,
+                        "description": description,
+                        "medicines": sorted(set(self.owners[other])),
+                    }
+                    new.append(interaction)
+                interaction["medicines"] = sorted(set(interaction["medicines"]) | {name})
+        # Aynı ürünün kendi maddeleri birbiriyle eşleşmesin diye bitler en sonda eklenir
+        for ingredient in ids:
+            self.seen |= 1 << ingredient
+            self.owners.setdefault(ingredient, []).append(name)
+        return new
+
+    def result(self):
+        interactions = sorted(self.found.values(), key=lambda item: SEVERITY_ORDER.get(item["severity"], 9))
+        return {
+            "version": self.index.version,
+            "checked_medicines": len(self.medicine_ids),
+            "interactions": interactions,
+        }
+
+
+class InteractionEngine:
+    """Sürüm kontrollü indeks ve kullanıcı başına artımlı sonuç önbelleği"""
+
+    def __init__(self, db=None, check_interval=VERSION_CHECK_INTERVAL, max_users=USER_CACHE_SIZE):
+        self.db = db or database
+        self.check_interval = check_interval
+        self.max_users = max_users
+        self._index = None
+        self._checked_at = 0.0
+        self._users = OrderedDict()  # user_id -> UserInteractions
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _read_version(conn):
+        try:
+            row = conn.execute("SELECT version FROM data_version WHERE name = 'interactions'").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
+
+    @timed_query
+    def _load(self):
+        conn = self.db.reader()
+        conn.execute("BEGIN")
+        try:
+            version = self._read_version(conn)
+            try:
+                rows = conn.execute("""
+                    SELECT ingredient_a, ingredient_b, name_a, name_b, severity, description
+                    FROM drug_interaction
+                """).fetchall()
+            except sqlite3.OperationalError:
+                rows = []
+        finally:
+            conn.execute("COMMIT")
+        return InteractionIndex(version, rows)
+
+    def index(self):
+        """Güncel indeks; sürüm kontrolü check_interval ile sınırlı"""
+        index = self._index
+        if index is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return index
+        with self._lock:
+            index = self._index
+            if index is None or time.monotonic() - self._checked_at >= self.check_interval:
+                version = self._read_version(self.db.reader()) if index is not None else None
+                if index is None or version != index.version:
+                    index = self._index = self._load()
+                    self._users.clear()
+                self._checked_at = time.monotonic()
+            return index
+
+    @timed_query
+    def _user_medicines(self, user_id):
+        return self.db.query_all("""
+            SELECT m.id, m.name, m.active_ingredient
+            FROM user_medicine um
+            JOIN medicine m ON um.medicine_id = m.id
+            WHERE um.user_id = ?
+            ORDER BY um.id
+        """, (user_id,))
+
+    def _list_version(self, user_id):
+        """Kullanıcının ilaç listesi sürümü; tablo yoksa None (önbelleğe güvenilmez)"""
+        try:
+            row = self.db.query_one("SELECT version FROM user_medicine_version WHERE user_id = ?", (user_id,))
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else 0
+
+    def _cached(self, user_id, index, list_version):
+        state = self._users.get(user_id)
+        if state is not None and state.index is index and list_version is not None \
+                and state.list_version == list_version:
+            return state
+        return None
+
+    def _state(self, user_id, index):
+        list_version = self._list_version(user_id)
+        with self._lock:
+            state = self._cached(user_id, index, list_version)
+            if state is not None:
+                self._users.move_to_end(user_id)
+                record_cache("interactions", True)
+                return state
+        record_cache("interactions", False)
+        state = UserInteractions(index, list_version)
+        for medicine_id, name, active_ingredient in self._user_medicines(user_id):
+            state.add(medicine_id, name, active_ingredient)
+        with self._lock:
+            self._users[user_id] = state
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return state
+
+    def check_user(self, user_id):
+        """Kullanıcının tüm ilaç listesindeki etkileşimler"""
+        index = self.index()
+        state = self._state(user_id, index)
+        with self._lock:
+            return state.result()
+
+    def add_medicine(self, user_id, medicine_id, name, active_ingredient):
+        """Kullanıcı listesine yeni ilaç eklendi: önbellekteki sonucu artımlı güncelle.
+        Yeni etkileşimleri döner (önbellekte yoksa tüm liste hesaplanır)."""
+        index = self.index()
+        list_version = self._list_version(user_id)
+        with self._lock:
+            # Yalnızca bu ekleme sürümü bir artırdıysa; araya başka değişiklik girdiyse baştan hesapla
+            state = self._cached(user_id, index, None if list_version is None else list_version - 1)
+            if state is not None:
+                state.list_version = list_version
+                return state.add(medicine_id, name, active_ingredient)
+        # Önbellekte yoksa liste (yeni ilaç dahil) baştan hesaplanır
+        state = self._state(user_id, index)
+        with self._lock:
+            return [item for item in state.found.values() if name in item["medicines"]]
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._index = None
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+
+interaction_engine = InteractionEngine()
+
+
+if __name__ == "__main__":
+    # CSV: ingredient_a, ingredient_b, severity, description (başlık satırlı)
+    if len(sys.argv) < 2:
+        print("Kullanım: python -m interactions etkilesimler.csv [db yolu]")
+        sys.exit(2)
+    conn = Database(sys.argv[2] if len(sys.argv) > 2 else database.db_path).connect()
+    install_interaction_schema(conn)
+    with open(sys.argv[1], encoding="utf-8-sig", newline="") as stream:
+        reader = csv.DictReader(stream)
+        count = load_interactions(conn, ((row["ingredient_a"], row["ingredient_b"], row.get("severity"),
+                                          row.get("description")) for row in reader))
+    print(f"{count} etkileşim yüklendi")
@@ -0,0 +1,223 @@
+# lab_import.py
+"""Laboratuvarlardan gelen toplu tahlil dosyalarının akışlı içe aktarımı.
+
+CSV veya JSON (JSON Lines ya da tek bir dizi) dosyası satır satır okunur,
+her satır tahlil şemasına göre doğrulanır (sayısal değer, tarih, referans
+aralığı). tc_no'lar parça başına tek sorguyla user.id'ye çevrilir ve satırlar
+parça başına bir BEGIN IMMEDIATE işleminde executemany ile yazılır. Bellekte
+en fazla bir parça ve sınırlı sayıda hata örneği tutulur, bu yüzden milyon
+satırlık dosyalar da sabit bellekle aktarılır.
+
+    python -m lab_import sonuclar.csv [--format csv|json] [--db yol] [--chunk-size 5000]
+    flask --app main import-labs sonuclar.csv [--format csv|json]
+
+İçe aktarım bilerek HTTP üzerinden sunulmaz (kimlik doğrulamasız bir uç
+nokta herkesin her hastaya sonuç yazmasına izin verirdi); yalnızca sunucuya
+erişimi olan operatör çalıştırır.
+
+Beklenen alanlar: tc_no, test_name, value, test_date (YYYY-MM-DD) zorunlu;
+test_type, unit, status, range_info, ref_low, ref_high isteğe bağlı.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import time
+from datetime import datetime
+
+from dashboard_page import invalidate_dashboard
+from data_access import database as default_database, Database
+from lab_series import parse_range, parse_value
+
+CHUNK_SIZE = int(os.getenv("MEDVICE_IMPORT_CHUNK_SIZE", "5000"))
+MAX_REPORTED_ERRORS = 100
+JSON_READ_SIZE = 64 * 1024
+MAX_JSON_RECORD = 1024 * 1024  # tek bir JSON kaydının azami boyutu
+
+REQUIRED_FIELDS = ("tc_no", "test_name", "value", "test_date")
+
+INSERT_SQL = """
+    INSERT INTO test_result (user_id, test_type, test_name, value, value_num, unit,
+                             status, range_info, ref_low, ref_high, test_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class InvalidRow(ValueError):
+    """Satır şemaya uymuyor"""
+
+
+def iter_csv(stream):
+    for row in csv.DictReader(stream):
+        yield row
+
+
+def iter_json(stream):
+    """JSON Lines veya '[{...}, {...}]' dizisini tüm dosyayı okumadan nesne nesne döner"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    eof = False
+    while True:
+        # Ayraçları (boşluk, virgül, köşeli parantez) atla
+        while position < len(buffer) and buffer[position] in " \t\r\n,[]":
+            position += 1
+        if position >= len(buffer):
+            if eof:
+                return
+            buffer, position = stream.read(JSON_READ_SIZE), 0
+            eof = not buffer
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof or len(buffer) - position > MAX_JSON_RECORD:
+                raise
+            chunk = stream.read(JSON_READ_SIZE)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        position = end
+        yield item
+
+
+READERS = {"csv": iter_csv, "json": iter_json, "jsonl": iter_json, "ndjson": iter_json}
+
+
+def _optional_float(value):
+    if value in (None, ""):
+        return None
+    return parse_value(value)
+
+
+def validate(row):
+    """Ham satırı (tc_no, test_result sütunları) demetine çevir; hatalıysa InvalidRow"""
+    if not isinstance(row, dict):
+        raise InvalidRow("satır bir nesne değil")
+    fields = {key.strip().lower(): (value.strip() if isinstance(value, str) else value)
+              for key, value in row.items() if key}
+    missing = [field for field in REQUIRED_FIELDS if fields.get(field) in (None, "")]
+    if missing:
+        raise InvalidRow(f"eksik alan: {', '.join(missing)}")
+
+    value_num = parse_value(fields["value"])
+    if value_num is None:
+        raise InvalidRow(f"sayısal olmayan değer: {fields['value']!r}")
+    try:
+        test_date = datetime.strptime(str(fields["test_date"])[:10], "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        raise InvalidRow(f"geçersiz tarih: {fields['test_date']!r}")
+
+    range_info = fields.get("range_info") or None
+    ref_low, ref_high = parse_range(range_info)
+    if fields.get("ref_low") not in (None, "") or fields.get("ref_high") not in (None, ""):
+        ref_low, ref_high = _optional_float(fields.get("ref_low")), _optional_float(fields.get("ref_high"))
+    if ref_low is not None and ref_high is not None and ref_low > ref_high:
+        raise InvalidRow(f"referans aralığı ters: {ref_low}-{ref_high}")
+
+    return (str(fields["tc_no"]), fields.get("test_type") or None, fields["test_name"],
+            str(fields["value"]), value_num, fields.get("unit") or None, fields.get("status") or None,
+            range_info, ref_low, ref_high, test_date)
+
+
+class LabImporter:
+    """Akışlı içe aktarma; import_stream bir rapor sözlüğü döner"""
+
+    def __init__(self, db=None, chunk_size=CHUNK_SIZE):
+        self.db = db or default_database
+        self.chunk_size = chunk_size
+
+    def _resolve_users(self, tc_numbers):
+        placeholders = ", ".join("?" * len(tc_numbers))
+        rows = self.db.query_all(f"SELECT tc_no, id FROM user WHERE tc_no IN ({placeholders})", list(tc_numbers))
+        return {row[0]: row[1] for row in rows}
+
+    def _flush(self, chunk, report):
+        # SQLite değişken sınırı (999) nedeniyle tc_no'lar 900'lük gruplarla çözülür
+        tc_numbers = list({row[0] for _, row in chunk})
+        user_ids = {}
+        for i in range(0, len(tc_numbers), 900):
+            user_ids.update(self._resolve_users(tc_numbers[i:i + 900]))
+
+        rows = []
+        for line, row in chunk:
+            user_id = user_ids.get(row[0])
+            if user_id is None:
+                self._reject(report, line, f"bilinmeyen tc_no: {row[0]}")
+                continue
+            rows.append((user_id, *row[1:]))
+        if rows:
+            with self.db.transaction() as conn:
+                conn.executemany(INSERT_SQL, rows)
+            report["imported"] += len(rows)
+            for user_id in {row[0] for row in rows}:
+                invalidate_dashboard(user_id)
+
+    @staticmethod
+    def _reject(report, line, reason):
+        report["rejected"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": line, "error": reason})
+
+    def import_stream(self, stream, fmt="csv"):
+        """Metin akışını içe aktar: {imported, rejected, errors, seconds, rows_per_second}"""
+        reader = READERS.get(fmt)
+        if reader is None:
+            raise ValueError(f"Desteklenmeyen biçim: {fmt}")
+        report = {"imported": 0, "rejected": 0, "errors": []}
+        started = time.perf_counter()
+        chunk = []
+        line = 0
+        try:
+            for line, raw in enumerate(reader(stream), start=1):
+                try:
+                    chunk.append((line, validate(raw)))
+                except InvalidRow as exc:
+                    self._reject(report, line, str(exc))
+                if len(chunk) >= self.chunk_size:
+                    self._flush(chunk, report)
+                    chunk = []
+        except (csv.Error, json.JSONDecodeError, UnicodeDecodeError) as exc:
+            # Bozuk dosya: o ana kadarki parçalar yazılmış olarak kalır
+            self._reject(report, line + 1, f"dosya okunamadı: {exc}")
+        if chunk:
+            self._flush(chunk, report)
+
+        seconds = time.perf_counter() - started
+        report["rows"] = line
+        report["seconds"] = round(seconds, 3)
+        report["rows_per_second"] = round(report["imported"] / seconds) if seconds > 0 else None
+        return report
+
+
+def detect_format(filename, default="csv"):
+    extension = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    return extension if extension in READERS else default
+
+
+def format_report(result, max_errors=20):
+    """İçe aktarım raporunun konsol özeti"""
+    lines = [f"İçe aktarılan: {result['imported']}, reddedilen: {result['rejected']}, "
+             f"süre: {result['seconds']} sn, {result['rows_per_second']} satır/sn"]
+    lines.extend(f"  satır {error['row']}: {error['error']}" for error in result["errors"][:max_errors])
+    return "\n".join(lines)
+
+
+def open_text(binary_stream):
+    """Yüklenen dosyayı (BOM'lu olabilir) metin akışına çevir"""
+    return io.TextIOWrapper(binary_stream, encoding="utf-8-sig", newline="")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tahlil sonuçlarını CSV/JSON dosyasından içe aktar")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=sorted(READERS))
+    parser.add_argument("--db", help="veritabanı yolu (varsayılan MEDVICE_DB_PATH)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    importer = LabImporter(Database(args.db) if args.db else None, args.chunk_size)
+    with open(args.path, encoding="utf-8-sig", newline="") as stream:
+        result = importer.import_stream(stream, args.format or detect_format(args.path))
+    print(format_report(result))
@@ -1,52 +1,58 @@
-from flask import Flask, render_template, request, redirect, url_for, Blueprint, session
-import sqlite3
+from flask import Flask, render_template, request, redirect, url_for, Blueprint, session, jsonify
+from lab_series import analyze, downsample, level_counts, load_results, user_summary
 lab_results_page = Blueprint('lab_results_page',__name__)
 
-
-def get_user_from_id(user_id):
-    conn = sqlite3.connect(r'C:\\Users\\melis\\YZTA_m\\medvica\\yzta_team_forty\\medvice\\db\\db.db')
-    cursor = conn.cursor()
-    
-    query = "SELECT name, tc_no, password FROM user WHERE tc_no = ?"
-    cursor.execute(query, (user_id,))
-    row = cursor.fetchalls()
-    conn.close()
-    
-    if row:
-        return {
-            "name":  row[0],
-            "tc_no":  row[1],
-            "password":  row[2]
-        }
-    return None
-
+MAX_PAGE_SIZE = 500
 
 
 def get_test_with_id(user_id):
-    conn = sqlite3.connect(r'C:\\Users\\melis\\YZTA_m\\medvica\\yzta_team_forty\\medvice\\db\\db.db')
-    cursor = conn.cursor()
-    
-    query = "SELECT id, test_type, test_name, value, unit, status, range_info, test_date FROM test_result WHERE user_id = ?"
-    cursor.execute(query, (user_id,))
-    rows = cursor.fetchall()
-    conn.close()
-    
-    results = []
-    for row in rows:
-        results.append({
-            "id": row[0], 
-            "test_type": row[1], 
-            "test_name": row[2], 
-            "value": row[3], 
-            "unit": row[4], 
-            "status": row[5],
-            "range_info": row[6], 
-            "test_date": row[7],
-        })
+    # Tüm sonuçlar tek sorguyla okunur; aralık dışı işaretleri NumPy ile toplu hesaplanır
+    results, summary = user_summary(user_id)
     return results
 
 @lab_results_page.route("/lab-results/<int:user_id>")
 def lab_results(user_id):
 
-    results = get_test_with_id(user_id)
-    return render_template("lab_results.html", user_id=user_id, lab_results=results)
+    results, summary = user_summary(user_id)
+    latest = max((str(result["test_date"]) for result in results), default=None)
+    return render_template("lab_results.html", user_id=user_id, lab_results=results,
+                           counts=level_counts(results), last_update=latest)
+
+@lab_results_page.route("/api/lab-results/<int:user_id>/summary")
+def lab_summary(user_id):
+    results, summary = user_summary(user_id)
+    return jsonify({
+        "counts": level_counts(results),
+        "tests": [{**test, "latest": _public(test["latest"])} for test in summary.values()],
+    })
+
+@lab_results_page.route("/api/lab-results/<int:user_id>/series")
+def lab_result_series(user_id):
+    """Tek testin zaman serisi: ?test_name=&start=&end=&max_points=&limit=&offset="""
+    test_name = request.args.get("test_name")
+    if not test_name:
+        return jsonify({"error": "test_name gerekli"}), 400
+    max_points = request.args.get("max_points", type=int)
+    if max_points is not None and max_points < 1:
+        return jsonify({"error": "max_points en az 1 olmalı"}), 400
+    limit = min(max(request.args.get("limit", MAX_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    offset = max(request.args.get("offset", 0, type=int), 0)
+
+    rows = load_results(user_id, test_name, request.args.get("start"), request.args.get("end"))
+    summary = analyze(rows).get(test_name)
+    points = downsample(rows, max_points)
+    return jsonify({
+        "test_name": test_name,
+        "unit": rows[-1]["unit"] if rows else None,
+        "ref_low": rows[-1]["ref_low"] if rows else None,
+        "ref_high": rows[-1]["ref_high"] if rows else None,
+        "trend": summary["trend"] if summary else None,
+        "slope_per_day": summary["slope_per_day"] if summary else None,
+        "total": len(points),
+        "offset": offset,
+        "limit": limit,
+        "points": points[offset:offset + limit],
+    })
+
+def _public(result):
+    return {**result, "test_date": str(result["test_date"])}
@@ -0,0 +1,223 @@
+# lab_series.py
+"""Tahlil sonuçları için sayısal zaman serisi ve NumPy ile toplu analiz.
+
+test_result.value metin, range_info serbest metin ("12-16", "Normal: 12-16",
+"<200") olarak saklanır. Bunların sayısal karşılıkları value_num, ref_low
+ve ref_high sütunlarında tutulur (migration 6). Aralık dışı işaretleri,
+bir önceki sonuca göre fark ve eğim (birim / gün), kullanıcının tüm
+sonuçları için tek seferde NumPy dizileri üzerinden hesaplanır; şablonlar
+satır satır karşılaştırma yapmaz.
+"""
+import re
+
+import numpy as np
+
+from data_access import query_all
+from metrics import timed_query
+
+# Aralığın bu oranından fazla dışarıdaysa "kritik" sayılır
+CRITICAL_MARGIN = 0.25
+# 30 günlük değişim ortalamanın bu oranından küçükse eğilim "sabit"
+TREND_TOLERANCE = 0.02
+
+_NUMBER = r"[-+]?\d+(?:[.,]\d+)?"
+_RANGE_RE = re.compile(rf"({_NUMBER})\s*[-–]\s*({_NUMBER})")
+_BOUND_RE = re.compile(rf"([<>]=?|≤|≥)\s*({_NUMBER})")
+_VALUE_RE = re.compile(_NUMBER)
+
+# Eski kayıtlardaki serbest metin durumlarının karşılığı (sayısal aralık yoksa)
+STATUS_LEVELS = {
+    "normal": "normal",
+    "uyarı": "warning", "dikkat": "warning", "warning": "warning",
+    "kritik": "critical", "critical": "critical",
+}
+
+SERIES_COLUMNS = ("id", "test_type", "test_name", "value", "value_num", "unit",
+                  "ref_low", "ref_high", "status", "range_info", "test_date")
+
+
+def _to_float(text):
+    return float(text.replace(",", "."))
+
+
+def parse_value(value):
+    """'14.2', '14,2', '<5' gibi değerlerden sayıyı çıkar; yoksa None"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _VALUE_RE.search(str(value))
+    return _to_float(match.group()) if match else None
+
+
+def parse_range(range_info):
+    """'12-16', 'Normal: 12-16', '<200', '>40' -> (alt, üst); bilinmeyen sınır None"""
+    if not range_info:
+        return None, None
+    match = _RANGE_RE.search(range_info)
+    if match:
+        return _to_float(match.group(1)), _to_float(match.group(2))
+    match = _BOUND_RE.search(range_info)
+    if match:
+        bound = _to_float(match.group(2))
+        return (None, bound) if match.group(1) in ("<", "<=", "≤") else (bound, None)
+    return None, None
+
+
+def backfill_lab_values(conn):
+    """Sayısal sütunları boş kalan satırları metin alanlarından doldur"""
+    rows = conn.execute("""
+        SELECT id, value, range_info FROM test_result
+        WHERE value_num IS NULL AND value IS NOT NULL
+    """).fetchall()
+    updates = []
+    for row_id, value, range_info in rows:
+        value_num = parse_value(value)
+        if value_num is None:
+            continue
+        updates.append((value_num, *parse_range(range_info), row_id))
+    if updates:
+        conn.executemany(
+            "UPDATE test_result SET value_num = ?, ref_low = ?, ref_high = ? WHERE id = ?", updates)
+    conn.commit()
+
+
+@timed_query
+def load_results(user_id, test_name=None, start=None, end=None):
+    """Kullanıcının sonuçları, (test_name, test_date) sıralı; test_result(user_id, test_name, test_date) indeksi ile"""
+    query = f"SELECT {', '.join(SERIES_COLUMNS)} FROM test_result WHERE user_id = ?"
+    params = [user_id]
+    if test_name:
+        query += " AND test_name = ?"
+        params.append(test_name)
+    if start:
+        query += " AND test_date >= ?"
+        params.append(start)
+    if end:
+        query += " AND test_date <= ?"
+        params.append(end)
+    query += " ORDER BY test_name, test_date, id"
+    return [dict(zip(SERIES_COLUMNS, row)) for row in query_all(query, params)]
+
+
+def _column(rows, key):
+    return np.array([np.nan if row[key] is None else row[key] for row in rows], dtype=float)
+
+
+def analyze(rows):
+    """Satırlara flag/level/delta ekle ve test başına özet döner.
+
+    rows load_results sırasında (test_name, test_date) olmalı. flag:
+    normal / low / high / unknown, level: normal / warning / critical.
+    """
+    if not rows:
+        return {}
+    values = _column(rows, "value_num")
+    low = _column(rows, "ref_low")
+    high = _column(rows, "ref_high")
+    days = np.array([str(row["test_date"])[:10] for row in rows], dtype="datetime64[D]").astype(float)
+    names = np.array([row["test_name"] or "" for row in rows])
+
+    known = ~np.isnan(values)
+    with np.errstate(invalid="ignore"):
+        below = known & (values < low)
+        above = known & (values > high)
+        has_range = known & ~(np.isnan(low) & np.isnan(high))
+        # Aralık dışına çıkış miktarı, aralık genişliğine oranla
+        span = np.where(np.isnan(high - low), np.abs(np.fmax(low, high)), high - low)
+        span = np.where(span > 0, span, 1.0)
+        excess = np.where(below, low - values, np.where(above, values - high, 0.0)) / span
+    critical = excess > CRITICAL_MARGIN
+
+    # Aynı testin bir önceki sonucuna göre fark
+    same_test = np.concatenate(([False], names[1:] == names[:-1]))
+    delta = np.full(len(rows), np.nan)
+    delta[1:] = values[1:] - values[:-1]
+    delta[~same_test] = np.nan
+
+    # Test başına en küçük kareler eğimi: gruplar üzerinde reduceat ile toplamlar
+    starts = np.flatnonzero(~same_test)
+    weight = known.astype(float)
+    y = np.where(known, values, 0.0)
+    x = days - days[starts].repeat(np.diff(np.append(starts, len(rows))))
+    n = np.add.reduceat(weight, starts)
+    sx = np.add.reduceat(x * weight, starts)
+    sy = np.add.reduceat(y, starts)
+    sxx = np.add.reduceat(x * x * weight, starts)
+    sxy = np.add.reduceat(x * y, starts)
+    denominator = n * sxx - sx * sx
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = np.where(denominator > 0, (n * sxy - sx * sy) / denominator, np.nan)
+        mean = np.where(n > 0, sy / n, np.nan)
+    minimum = np.fmin.reduceat(values, starts)
+    maximum = np.fmax.reduceat(values, starts)
+
+    for i, row in enumerate(rows):
+        if has_range[i]:
+            row["flag"] = "low" if below[i] else "high" if above[i] else "normal"
+            row["level"] = "critical" if critical[i] else "warning" if row["flag"] != "normal" else "normal"
+        else:
+            row["flag"] = "unknown"
+            row["level"] = STATUS_LEVELS.get((row["status"] or "").strip().lower(), "normal")
+        row["abnormal"] = row["level"] != "normal"
+        row["delta"] = None if np.isnan(delta[i]) else round(float(delta[i]), 4)
+
+    summary = {}
+    ends = np.append(starts[1:], len(rows)) - 1
+    for group, (first, last) in enumerate(zip(starts, ends)):
+        latest = rows[last]
+        group_slope = None if np.isnan(slope[group]) else float(slope[group])
+        if group_slope is None:
+            trend = None
+        elif abs(group_slope * 30) <= TREND_TOLERANCE * abs(mean[group]):
+            trend = "stable"
+        else:
+            trend = "up" if group_slope > 0 else "down"
+        summary[latest["test_name"]] = {
+            "latest": latest,
+            "count": int(last - first + 1),
+            "min": None if np.isnan(minimum[group]) else float(minimum[group]),
+            "max": None if np.isnan(maximum[group]) else float(maximum[group]),
+            "slope_per_day": None if group_slope is None else round(group_slope, 6),
+            "trend": trend,
+        }
+    return summary
+
+
+def level_counts(rows):
+    """Analiz edilmiş satırlar için normal / warning / critical sayıları"""
+    levels = np.array([row["level"] for row in rows]) if rows else np.array([], dtype=str)
+    return {level: int(np.count_nonzero(levels == level)) for level in ("normal", "warning", "critical")}
+
+
+def downsample(rows, max_points):
+    """Seriyi en fazla max_points kovaya (en az 1) indir; kova başına ortalama/min/max ve son tarih.
+
+    max_points None ise seri olduğu gibi döner.
+    """
+    points = [row for row in rows if row["value_num"] is not None]
+    if max_points is not None:
+        max_points = max(int(max_points), 1)  # negatif / sıfır np.linspace'i bozar
+    if max_points is None or len(points) <= max_points:
+        return [{"date": str(row["test_date"]), "value": row["value_num"],
+                 "min": row["value_num"], "max": row["value_num"], "count": 1} for row in points]
+    values = np.array([row["value_num"] for row in points], dtype=float)
+    starts = np.unique(np.linspace(0, len(points), max_points, endpoint=False).astype(int))
+    counts = np.diff(np.append(starts, len(points)))
+    means = np.add.reduceat(values, starts) / counts
+    minimums = np.minimum.reduceat(values, starts)
+    maximums = np.maximum.reduceat(values, starts)
+    return [{
+        "date": str(points[start + count - 1]["test_date"]),
+        "value": round(float(mean), 4),
+        "min": float(minimum),
+        "max": float(maximum),
+        "count": int(count),
+    } for start, count, mean, minimum, maximum in zip(starts, counts, means, minimums, maximums)]
+
+
+def user_summary(user_id):
+    """Her testin en son sonucu ve eğilimi (ana ekran ve tahlil sayfası için)"""
+    rows = load_results(user_id)
+    summary = analyze(rows)
+    return rows, summary
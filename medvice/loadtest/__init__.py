@@ -0,0 +1 @@
+# Medvice yük testleri; medvice dizininden `python -m loadtest.<senaryo>` ile çalıştırılır.
@@ -0,0 +1,154 @@
+# loadtest/booking_race.py
+"""Popüler slotlar için yarışan kullanıcılarla rezervasyon yük testi.
+
+Geçici bir veritabanı üzerinde N thread, az sayıdaki doktor/saat için
+(çarpık dağılımla) tutma + onay yapar. Sonunda işlem hacmi, gecikme
+yüzdelikleri ve çift randevu sayısı raporlanır; çift randevu 0 değilse
+çıkış kodu 1'dir.
+
+    python -m loadtest.booking_race --users 32 --attempts 200
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from data_access import Database
+from directory import ClinicDirectory
+from migrations import create_appointments_schema, add_appointment_user_id
+from reservations import ReservationService, SlotUnavailable, HoldExpired
+from schedule import ScheduleEngine, install_schedule_schema
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def create_directory(conn, doctors):
+    """Rezervasyon doğrulaması için en küçük dizin: bir bölüm, bir hastane, `doctors` doktor"""
+    conn.executescript("""
+        CREATE TABLE department (id TEXT PRIMARY KEY, name TEXT, icon TEXT);
+        CREATE TABLE hospital (id INTEGER PRIMARY KEY, name TEXT, location TEXT, distance TEXT,
+                               rating TEXT, latitude REAL, longitude REAL);
+        CREATE TABLE doctor (id INTEGER PRIMARY KEY, name TEXT, experience TEXT, rating TEXT,
+                             department_id TEXT, hospital_id INTEGER);
+        INSERT INTO department VALUES ('1', 'Kardiyoloji', NULL);
+        INSERT INTO hospital VALUES (1, 'Şehir Hastanesi', NULL, NULL, '4.5', NULL, NULL);
+    """)
+    conn.executemany("INSERT INTO doctor VALUES (?, ?, '10 yıl', '4.5', '1', 1)",
+                     [(doctor_id, f"Dr. {doctor_id}") for doctor_id in range(1, doctors + 1)])
+
+
+def build_slots(schedule, doctors, days, times_per_day):
+    """2030'un ilk `days` iş gününde doktor şablonundan ilk `times_per_day` slot"""
+    slots = []
+    day = date(2030, 1, 1)
+    while days:
+        if schedule.day_template(1, day):
+            for doctor_id in range(1, doctors + 1):
+                for slot in schedule.day_template(doctor_id, day)[:times_per_day]:
+                    slots.append((doctor_id, day.isoformat(), slot))
+            days -= 1
+        day += timedelta(days=1)
+    return slots
+
+
+def run(args):
+    db_path = os.path.join(tempfile.mkdtemp(prefix="medvice_race_"), "race.db")
+    db = Database(db_path)
+    create_appointments_schema(db.writer())
+    add_appointment_user_id(db.writer())
+    install_schedule_schema(db.writer())
+    create_directory(db.writer(), args.doctors)
+
+    schedule = ScheduleEngine(db=db)
+    service = ReservationService(db=db, hold_ttl=args.hold_ttl, directory=ClinicDirectory(db=db),
+                                 schedule=schedule)
+    slots = build_slots(schedule, args.doctors, args.days, args.times_per_day)
+    # Zipf benzeri ağırlık: ilk slotlar çok daha popüler
+    weights = [1.0 / (rank + 1) for rank in range(len(slots))]
+
+    counters = {"held": 0, "confirmed": 0, "conflicts": 0, "expired": 0, "abandoned": 0}
+    latencies = []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(args.users)
+
+    def user(worker_id):
+        rng = random.Random(args.seed + worker_id)
+        local = {key: 0 for key in counters}
+        local_latencies = []
+        start_barrier.wait()
+        for _ in range(args.attempts):
+            doctor_id, day, slot = rng.choices(slots, weights)[0]
+            started = time.perf_counter()
+            try:
+                appointment_id, token, _ = service.hold(doctor_id, day, slot, "1", 1, f"user-{worker_id}")
+                local["held"] += 1
+                if rng.random() < args.abandon_rate:
+                    service.release(appointment_id, token)
+                    local["abandoned"] += 1
+                else:
+                    service.confirm(appointment_id, token)
+                    local["confirmed"] += 1
+            except SlotUnavailable:
+                local["conflicts"] += 1
+            except HoldExpired:
+                local["expired"] += 1
+            local_latencies.append(time.perf_counter() - started)
+            db.release()  # istek sonu gibi: bağlantılar havuza döner
+        with lock:
+            for key, value in local.items():
+                counters[key] += value
+            latencies.extend(local_latencies)
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(args.users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    conn = sqlite3.connect(db_path)
+    double_bookings = conn.execute("""
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM appointments WHERE status IN ('active', 'held')
+            GROUP BY doctor_id, appointment_date, appointment_time HAVING COUNT(*) > 1
+        )
+    """).fetchone()[0]
+    active = conn.execute("SELECT COUNT(*) FROM appointments WHERE status = 'active'").fetchone()[0]
+    conn.close()
+
+    total = args.users * args.attempts
+    print(f"Kullanıcı: {args.users}, deneme: {total}, slot: {len(slots)}, süre: {elapsed:.2f} sn")
+    print(f"İşlem hacmi: {total / elapsed:.0f} deneme/sn, {counters['confirmed'] / elapsed:.0f} onay/sn")
+    print(f"Tutma: {counters['held']}, onay: {counters['confirmed']}, bırakılan: {counters['abandoned']}, "
+          f"çakışma: {counters['conflicts']}, süresi dolan: {counters['expired']}")
+    print(f"Gecikme p50={percentile(latencies, 50) * 1000:.1f} ms "
+          f"p95={percentile(latencies, 95) * 1000:.1f} ms p99={percentile(latencies, 99) * 1000:.1f} ms")
+    print(f"Aktif randevu: {active}, çift randevu: {double_bookings}")
+    return 1 if double_bookings or active != counters["confirmed"] else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Randevu rezervasyonu yarış testi")
+    parser.add_argument("--users", type=int, default=32)
+    parser.add_argument("--attempts", type=int, default=200, help="kullanıcı başına deneme")
+    parser.add_argument("--doctors", type=int, default=3)
+    parser.add_argument("--days", type=int, default=2)
+    parser.add_argument("--times-per-day", type=int, default=21)
+    parser.add_argument("--abandon-rate", type=float, default=0.3, help="tutup vazgeçen oranı")
+    parser.add_argument("--hold-ttl", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=42)
+    raise SystemExit(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
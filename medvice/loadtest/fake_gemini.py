@@ -0,0 +1,234 @@
+# loadtest/fake_gemini.py
+"""Yük testleri için yerel Gemini taklidi (generateContent / streamGenerateContent).
+
+google.generativeai'nin REST taşımasının çağırdığı uç noktaları cevaplar;
+uygulama MEDVICE_GEMINI_ENDPOINT ile buraya yönlendirilir, kota harcanmaz:
+
+    python -m loadtest.fake_gemini --port 8765 --ttft-ms 600 --chunk-ms 40
+    MEDVICE_GEMINI_ENDPOINT=http://127.0.0.1:8765 python main.py
+
+Gecikme gerçek API'ye benzer şekilde log-normal dağılır: ilk parçaya kadar
+geçen süre (medyan --ttft-ms) + parça başına --chunk-ms. Akışlı istekler
+parçaları bu aralıklarla SSE (alt=sse) ya da JSON dizisi olarak gönderir.
+Yanıt metni uygulamanın beklediği biçimdedir ("Başvuru Birimi: ..."), bölüm
+belirtilerdeki anahtar kelimelerden seçilir; böylece randevu akışı da
+tetiklenir. --error-rate ve --max-concurrency hata / kota (429) davranışını
+taklit eder. GET /stats istek sayaçlarını döner.
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from text_utils import turkish_fold
+
+_MODEL_PATH_RE = re.compile(r"^/v1(?:beta)?/models/(?P<model>[^:/]+):(?P<method>generateContent|streamGenerateContent)$")
+_SYMPTOMS_RE = re.compile(r"KULLANICI BELİRTİLERİ:\*\*\s*(.*?)\s*\*\*YANIT FORMATI", re.S)
+
+# (katlanmış anahtar kelimeler, olası durum, bölüm, aciliyet)
+RULES = [
+    (("gogus", "gogs", "kalp", "carpinti"), "Kararsız angina veya ritim bozukluğu", "Kardiyoloji", "Yüksek"),
+    (("bas agri", "basim", "migren", "uyusma", "bas donme"), "Migren veya gerilim tipi baş ağrısı", "Nöroloji", "Orta"),
+    (("oksuru", "nefes", "balgam"), "Üst solunum yolu enfeksiyonu veya bronşit", "Göğüs Hastalıkları", "Orta"),
+    (("kasinti", "dokuntu", "cilt", "sivilce"), "Egzama veya alerjik dermatit", "Dermatoloji", "Düşük"),
+    (("diz", "bel ", "eklem", "kirik"), "Kas-iskelet zorlanması", "Ortopedi", "Düşük"),
+    (("bogaz", "kulak", "burun"), "Farenjit veya sinüzit", "KBB", "Düşük"),
+    (("goz", "bulanik"), "Konjonktivit veya kırma kusuru", "Göz Hastalıkları", "Düşük"),
+]
+DEFAULT_RULE = ((), "Genel viral enfeksiyon", "Dahiliye", "Düşük")
+
+
+def compose_answer(prompt):
+    """Uygulamanın yanıt formatında, belirtilere göre bölüm öneren metin"""
+    match = _SYMPTOMS_RE.search(prompt)
+    symptoms = turkish_fold(match.group(1) if match else prompt)
+    _, condition, department, urgency = next(
+        (rule for rule in RULES if any(keyword in symptoms for keyword in rule[0])), DEFAULT_RULE)
+    return (f"🔍 Olası Durum(lar): {condition}\n\n"
+            f"⚠️ Aciliyet Seviyesi: {urgency}\n\n"
+            f"🏥 Başvuru Birimi: {department}\n\n"
+            "📝 Açıklama: Belirtileriniz birkaç gün içinde geçmezse veya şiddetlenirse "
+            "ilgili bölüme başvurmanız önerilir. Bol sıvı tüketin ve dinlenin.\n")
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+def _response_json(text, finished=True, prompt_chars=0):
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if finished:
+        candidate["finishReason"] = "STOP"
+    return {
+        "candidates": [candidate],
+        "usageMetadata": {
+            "promptTokenCount": max(1, prompt_chars // 4),
+            "candidatesTokenCount": max(1, len(text) // 4),
+            "totalTokenCount": max(1, prompt_chars // 4) + max(1, len(text) // 4),
+        },
+    }
+
+
+class FakeGemini:
+    """Gecikme modeli ve sayaçlar (sunucu thread'leri arasında paylaşılır)"""
+
+    def __init__(self, ttft_ms=600, chunk_ms=40, sigma=0.35, chunk_chars=60,
+                 error_rate=0.0, max_concurrency=0, seed=None):
+        self.ttft_ms = ttft_ms
+        self.chunk_ms = chunk_ms
+        self.sigma = sigma
+        self.chunk_chars = chunk_chars
+        self.error_rate = error_rate
+        self.max_concurrency = max_concurrency
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "streamed": 0, "errors": 0, "throttled": 0, "in_flight": 0, "max_in_flight": 0}
+
+    def delay(self, median_ms):
+        with self.lock:
+            factor = math.exp(self.rng.gauss(0, self.sigma))
+        return median_ms * factor / 1000
+
+    def enter(self):
+        """İsteği say; (durum kodu, hata mesajı) ya da None döner"""
+        with self.lock:
+            self.stats["requests"] += 1
+            if self.max_concurrency and self.stats["in_flight"] >= self.max_concurrency:
+                self.stats["throttled"] += 1
+                return 429, "RESOURCE_EXHAUSTED"
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return 503, "UNAVAILABLE"
+            self.stats["in_flight"] += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+        return None
+
+    def leave(self):
+        with self.lock:
+            self.stats["in_flight"] -= 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fake = None  # make_server atar
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/stats":
+            self._send_json(200, self.fake.snapshot())
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "not found", "status": "NOT_FOUND"}})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        match = _MODEL_PATH_RE.match(url.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not match:
+            self._send_json(404, {"error": {"code": 404, "message": "not found", "status": "NOT_FOUND"}})
+            return
+        try:
+            request = json.loads(body or b"{}")
+            prompt = "".join(part.get("text", "") for content in request.get("contents", [])
+                             for part in content.get("parts", []))
+        except (ValueError, AttributeError):
+            self._send_json(400, {"error": {"code": 400, "message": "invalid JSON", "status": "INVALID_ARGUMENT"}})
+            return
+
+        failure = self.fake.enter()
+        if failure:
+            status, reason = failure
+            self._send_json(status, {"error": {"code": status, "message": reason, "status": reason}})
+            return
+        try:
+            chunks = _chunks(compose_answer(prompt), self.fake.chunk_chars)
+            time.sleep(self.fake.delay(self.fake.ttft_ms))
+            if match.group("method") == "streamGenerateContent":
+                self._stream(chunks, len(prompt), "sse" in parse_qs(url.query).get("alt", []))
+            else:
+                time.sleep(sum(self.fake.delay(self.fake.chunk_ms) for _ in chunks[1:]))
+                self._send_json(200, _response_json("".join(chunks), prompt_chars=len(prompt)))
+        finally:
+            self.fake.leave()
+
+    def _stream(self, chunks, prompt_chars, sse):
+        with self.fake.lock:
+            self.fake.stats["streamed"] += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream" if sse else "application/json; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, text in enumerate(chunks):
+            if i:
+                time.sleep(self.fake.delay(self.fake.chunk_ms))
+            payload = json.dumps(_response_json(text, i == len(chunks) - 1, prompt_chars), ensure_ascii=False)
+            if sse:
+                piece = f"data: {payload}\r\n\r\n"
+            else:
+                piece = ("[" if i == 0 else ",\r\n") + payload + ("]" if i == len(chunks) - 1 else "")
+            self._write_chunk(piece.encode())
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def make_server(host="127.0.0.1", port=8765, **options):
+    """Başlatılmamış sunucu; port=0 boş bir port seçer (server.server_port)"""
+    handler = type("Handler", (FakeGeminiHandler,), {"fake": FakeGemini(**options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_thread(**options):
+    """Aynı process içinde arka planda çalışan sunucu (senaryolar ve denemeler için)"""
+    server = make_server(**options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yerel Gemini taklit sunucusu")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft-ms", type=float, default=600, help="ilk parçaya kadar medyan gecikme")
+    parser.add_argument("--chunk-ms", type=float, default=40, help="parçalar arası medyan gecikme")
+    parser.add_argument("--sigma", type=float, default=0.35, help="log-normal gecikme yayılımı")
+    parser.add_argument("--chunk-chars", type=int, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="503 dönen istek oranı")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="aşılırsa 429 (0 = sınırsız)")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, ttft_ms=args.ttft_ms, chunk_ms=args.chunk_ms, sigma=args.sigma,
+                         chunk_chars=args.chunk_chars, error_rate=args.error_rate,
+                         max_concurrency=args.max_concurrency, seed=args.seed)
+    print(f"Gemini taklidi: http://{args.host}:{server.server_port} (MEDVICE_GEMINI_ENDPOINT)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# loadtest/run.py
+"""Çalışan bir Medvice sunucusuna senaryo karışımıyla HTTP yükü uygular.
+
+Her sanal kullanıcı kendi çerez oturumuyla (sohbet randevu akışı oturuma
+bağlıdır) ağırlıklara göre senaryo seçer ve süre dolana kadar tekrarlar.
+Sonunda uç nokta başına istek sayısı, hata oranı, işlem hacmi ve
+p50/p95/p99 gecikmeleri yazdırılır; bir gecikme bütçesi veya azami hata
+oranı aşılırsa çıkış kodu 1'dir.
+
+    python -m loadtest.fake_gemini --port 8765 &
+    MEDVICE_GEMINI_ENDPOINT=http://127.0.0.1:8765 python main.py &
+    python -m loadtest.run --base-url http://127.0.0.1:5000 --users 20 --duration 60 \\
+        --mix pages=5,api_booking=3,chat_question=2,chat_appointment=1 \\
+        --budget "GET /api/departments=p95:50" --json rapor.json
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+from loadtest.booking_race import percentile
+from loadtest.scenarios import SCENARIOS
+
+# Etiket -> {yüzdelik: ms}; --budget ile ezilir veya genişletilir
+DEFAULT_BUDGETS = {
+    "GET /api/departments": {"p95": 50},
+    "GET /api/hospitals/<department_id>": {"p95": 50},
+    "GET /api/doctors/<department_id>/<hospital_id>": {"p95": 50},
+    "GET /api/available-times/<doctor_id>/<date>": {"p95": 100},
+    "POST /api/hold-appointment": {"p95": 150},
+    "POST /api/create-appointment": {"p95": 200},
+    "GET /api/dashboard/<user_id>": {"p95": 150},
+    "GET /api/medicines/autocomplete": {"p95": 50},
+    "GET /api/directory/search": {"p95": 50},
+    "POST /ask": {"p95": 3000, "p99": 5000},
+}
+DEFAULT_MIX = "pages=5,api_booking=3,chat_question=2,chat_appointment=1"
+
+
+class Recorder:
+    """Thread'ler arası ortak ölçüm deposu: etiket -> [(süre sn, başarılı mı)]"""
+
+    def __init__(self):
+        self.samples = {}
+        self.statuses = {}
+        self.lock = threading.Lock()
+
+    def record(self, label, seconds, ok, status=None):
+        with self.lock:
+            self.samples.setdefault(label, []).append((seconds, ok))
+            counts = self.statuses.setdefault(label, {})
+            counts[status] = counts.get(status, 0) + 1
+
+    def report(self, elapsed):
+        rows = []
+        with self.lock:
+            items = sorted(self.samples.items())
+        for label, samples in items:
+            latencies = [seconds for seconds, _ in samples]
+            errors = sum(1 for _, ok in samples if not ok)
+            rows.append({
+                "label": label,
+                "count": len(samples),
+                "errors": errors,
+                "error_rate": errors / len(samples),
+                "rps": len(samples) / elapsed if elapsed else 0.0,
+                "p50": percentile(latencies, 50) * 1000,
+                "p95": percentile(latencies, 95) * 1000,
+                "p99": percentile(latencies, 99) * 1000,
+                "max": max(latencies) * 1000,
+                "statuses": {str(status): count for status, count in self.statuses[label].items()},
+            })
+        return rows
+
+
+class _Flow:
+    def __init__(self):
+        self.ok = True
+
+    def fail(self):
+        self.ok = False
+
+
+class Client:
+    """Sanal kullanıcının HTTP istemcisi; istekleri rota şablonu etiketiyle kaydeder"""
+
+    def __init__(self, base_url, recorder, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.recorder = recorder
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.etags = {}  # koşullu GET'ler için URL -> (ETag, gövde), tarayıcı önbelleği gibi
+
+    def request(self, method, path, label, expect=(200,), conditional=False, **kwargs):
+        url = self.base_url + path
+        cache_key = (url, tuple(sorted((kwargs.get("params") or {}).items())))
+        cached = self.etags.get(cache_key) if conditional else None
+        if cached:
+            kwargs.setdefault("headers", {})["If-None-Match"] = cached[0]
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        except requests.RequestException:
+            self.recorder.record(label, time.perf_counter() - started, False, "bağlantı")
+            return None
+        elapsed = time.perf_counter() - started
+        if response.status_code == 304 and cached:
+            response._content, response.status_code = cached[1], 200
+            self.recorder.record(label, elapsed, True, 304)
+            return response
+        self.recorder.record(label, elapsed, response.status_code in expect, response.status_code)
+        if conditional and response.status_code == 200 and response.headers.get("ETag"):
+            self.etags[cache_key] = (response.headers["ETag"], response.content)
+        return response
+
+    def get(self, path, label, **kwargs):
+        return self.request("GET", path, label, **kwargs)
+
+    def post(self, path, label, **kwargs):
+        return self.request("POST", path, label, **kwargs)
+
+    @staticmethod
+    def json(response):
+        return response.json()
+
+    @contextmanager
+    def flow(self, label):
+        """Çok adımlı akışın toplam süresi; adımlardan biri flow.fail() derse başarısız sayılır"""
+        flow = _Flow()
+        started = time.perf_counter()
+        try:
+            yield flow
+        except (requests.RequestException, ValueError, KeyError, IndexError, TypeError):
+            flow.fail()
+        self.recorder.record(label, time.perf_counter() - started, flow.ok, "ok" if flow.ok else "fail")
+
+
+def parse_mix(text):
+    mix = {}
+    for part in filter(None, text.split(",")):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Bilinmeyen senaryo: {name} (seçenekler: {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def parse_budgets(values, path=None):
+    """'ETİKET=p95:200,p99:400' biçimindeki bütçeleri varsayılanların üzerine uygula"""
+    budgets = {label: dict(limits) for label, limits in DEFAULT_BUDGETS.items()}
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for label, limits in json.load(f).items():
+                budgets.setdefault(label, {}).update(limits)
+    for value in values or ():
+        label, _, spec = value.rpartition("=")
+        for item in spec.split(","):
+            quantile, _, limit = item.partition(":")
+            budgets.setdefault(label, {})[quantile] = float(limit)
+    return budgets
+
+
+def parse_ids(text):
+    ids = []
+    for part in text.split(","):
+        start, _, end = part.partition("-")
+        ids.extend(range(int(start), int(end or start) + 1))
+    return ids
+
+
+def check(rows, budgets, max_error_rate):
+    """Bütçe ihlalleri listesi"""
+    violations = []
+    by_label = {row["label"]: row for row in rows}
+    for label, limits in budgets.items():
+        row = by_label.get(label)
+        if row is None:
+            continue
+        for quantile, limit in limits.items():
+            if row[quantile] > limit:
+                violations.append(f"{label}: {quantile}={row[quantile]:.1f} ms > {limit:.0f} ms")
+    for row in rows:
+        if row["error_rate"] > max_error_rate:
+            violations.append(f"{row['label']}: hata oranı %{row['error_rate'] * 100:.1f} > "
+                              f"%{max_error_rate * 100:.1f} {row['statuses']}")
+    return violations
+
+
+def run(args):
+    mix = parse_mix(args.mix)
+    budgets = parse_budgets(args.budget, args.budgets)
+    ctx = {"user_ids": parse_ids(args.user_ids)}
+    recorder = Recorder()
+    names, weights = list(mix), list(mix.values())
+    deadline = time.monotonic() + args.ramp_up + args.duration
+
+    def user(worker_id):
+        rng = random.Random(args.seed + worker_id)
+        # Kademeli başlangıç: kullanıcılar ramp-up süresine yayılır
+        time.sleep(args.ramp_up * worker_id / max(1, args.users))
+        client = Client(args.base_url, recorder, args.timeout)
+        while time.monotonic() < deadline:
+            SCENARIOS[rng.choices(names, weights)[0]](client, rng, ctx)
+            if args.think_ms:
+                time.sleep(rng.expovariate(1000 / args.think_ms))
+
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(args.users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    rows = recorder.report(elapsed)
+    width = max([len(row["label"]) for row in rows] + [10])
+    print(f"{'uç nokta':<{width}} {'istek':>7} {'hata':>6} {'istek/sn':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for row in rows:
+        print(f"{row['label']:<{width}} {row['count']:>7} {row['errors']:>6} {row['rps']:>9.1f} "
+              f"{row['p50']:>8.1f} {row['p95']:>8.1f} {row['p99']:>8.1f} {row['max']:>8.1f}")
+    total = sum(row["count"] for row in rows if not row["label"].startswith("FLOW"))
+    print(f"Toplam: {total} istek, {elapsed:.1f} sn, {total / elapsed:.1f} istek/sn (gecikmeler ms)")
+
+    violations = check(rows, budgets, args.max_error_rate)
+    for violation in violations:
+        print(f"BÜTÇE AŞILDI: {violation}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"elapsed": elapsed, "endpoints": rows, "violations": violations}, f, ensure_ascii=False, indent=2)
+    return 1 if violations else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Medvice HTTP yük testi")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--users", type=int, default=10, help="eşzamanlı sanal kullanıcı")
+    parser.add_argument("--duration", type=float, default=30, help="ramp-up sonrası süre (sn)")
+    parser.add_argument("--ramp-up", type=float, default=5)
+    parser.add_argument("--think-ms", type=float, default=0, help="ziyaretler arası ortalama bekleme")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="senaryo=ağırlık,...")
+    parser.add_argument("--user-ids", default="1-5", help="ör. 1-5 veya 1-100000 (sentetik veri)")
+    parser.add_argument("--budget", action="append", help="'ETİKET=p95:200,p99:400' (tekrarlanabilir)")
+    parser.add_argument("--budgets", help="JSON bütçe dosyası: {etiket: {p95: ms}}")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="raporu bu dosyaya da yaz")
+    raise SystemExit(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# loadtest/scenarios.py
+"""Yük testi senaryoları: her biri bir sanal kullanıcının tek bir ziyaretidir.
+
+Senaryo fonksiyonları (client, rng, ctx) alır; client.get/post her isteği
+rota şablonu etiketiyle ("GET /api/hospitals/<department_id>") kaydeder,
+client.flow ise çok adımlı akışın toplam süresini ayrı bir etiketle ölçer.
+"""
+from datetime import date, timedelta
+
+SYMPTOMS = [
+    "Göğsümde baskı hissi ve çarpıntı var",
+    "İki gündür başım çok ağrıyor ve midem bulanıyor",
+    "Kuru öksürüğüm geçmiyor, geceleri nefes darlığı oluyor",
+    "Kollarımda kaşıntılı kızarıklıklar çıktı",
+    "Dizim merdiven çıkarken ağrıyor",
+    "Boğazım ağrıyor ve yutkunmakta zorlanıyorum",
+    "Halsizim, ateşim 38 derece",
+]
+MEDICINE_QUERIES = ["parol", "parasetamol", "ibuprofen", "amoksisilin", "agri kesici", "oksuruk", "alerji",
+                    "mide", "tansiyon", "kolesterol"]
+DIRECTORY_QUERIES = ["kardiyo", "dahiliye", "göz", "sehir hastanesi", "ahmet", "dr ayse", "nöroloji", "cildiye"]
+LAB_TESTS = ["Hemoglobin", "Glukoz", "Kolesterol", "Trombosit", "Üre"]
+
+
+def chat_question(client, rng, ctx):
+    """Tek bir belirti sorusu (RAG + LLM)"""
+    client.post("/ask", "POST /ask", json={"question": rng.choice(SYMPTOMS)})
+
+
+def chat_appointment(client, rng, ctx):
+    """Sohbetten uçtan uca randevu: belirti -> bölüm onayı -> hastane -> doktor -> gün -> saat -> onay"""
+    steps = [
+        (f"{rng.choice(SYMPTOMS)}, randevu almak istiyorum", "Randevu Alma Sistemi Aktif"),
+        ("Evet, randevu al", "seçildi"),
+        ("1", "seçildi"),
+        ("1", "seçildi"),
+        ("bu hafta", "Müsait saatler"),
+        (str(rng.randint(1, 3)), "Randevu Özeti"),
+        ("Evet, oluştur", "Randevunuz oluşturuldu"),
+    ]
+    with client.flow("FLOW sohbet randevusu") as flow:
+        location = {"lat": 39.925 + rng.uniform(-0.1, 0.1), "lon": 32.855 + rng.uniform(-0.1, 0.1)}
+        for message, expected in steps:
+            response = client.post("/ask", "POST /ask (randevu)", json={"question": message, "location": location})
+            answer = response.json().get("answer", "") if response is not None and response.ok else ""
+            if expected not in answer:
+                flow.fail()
+                # Yarım kalan akış bir sonraki ziyarete taşınmasın
+                client.post("/ask", "POST /ask (randevu)", json={"question": "Hayır, iptal et"})
+                return
+
+
+def api_booking(client, rng, ctx):
+    """Randevu sayfasının API akışı: bölüm -> hastane -> doktor -> müsait saat -> tut -> onayla"""
+    with client.flow("FLOW API randevusu") as flow:
+        departments = client.get("/api/departments", "GET /api/departments", conditional=True)
+        if departments is None or not departments.ok:
+            return flow.fail()
+        # Küçük tohum verisinde çoğu bölümde doktor yok; gerçek kullanıcı gibi birkaç bölüm denenir
+        doctor = None
+        for department in rng.sample(client.json(departments), min(3, len(client.json(departments)))):
+            params = {"lat": f"{39.925 + rng.uniform(-0.1, 0.1):.3f}",
+                      "lon": f"{32.855 + rng.uniform(-0.1, 0.1):.3f}"} if rng.random() < 0.5 else None
+            hospitals = client.get(f"/api/hospitals/{department['id']}", "GET /api/hospitals/<department_id>",
+                                   params=params, conditional=True)
+            if hospitals is None or not hospitals.ok or not client.json(hospitals):
+                continue
+            hospital = rng.choice(client.json(hospitals)[:5])
+            doctors = client.get(f"/api/doctors/{department['id']}/{hospital['id']}",
+                                 "GET /api/doctors/<department_id>/<hospital_id>", conditional=True)
+            if doctors is not None and doctors.ok and client.json(doctors):
+                doctor = rng.choice(client.json(doctors))
+                break
+        if doctor is None:
+            return flow.fail()
+
+        start = date.today() + timedelta(days=1)
+        client.get("/api/availability", "GET /api/availability",
+                   params={"doctor_ids": doctor["id"], "start": start.isoformat(),
+                           "end": (start + timedelta(days=13)).isoformat()}, conditional=True)
+        free, day = [], None
+        for offset in range(7):
+            day = (start + timedelta(days=offset)).isoformat()
+            times = client.get(f"/api/available-times/{doctor['id']}/{day}",
+                               "GET /api/available-times/<doctor_id>/<date>")
+            if times is None or not times.ok:
+                return flow.fail()
+            free = [slot["time"] for slot in times.json() if slot["available"]]
+            if free:
+                break
+        if not free:
+            return flow.fail()
+
+        booking = {
+            "doctor_id": doctor["id"], "department_id": department["id"], "hospital_id": hospital["id"],
+            "appointment_date": day, "appointment_time": rng.choice(free[:6]),
+            "user_id": rng.choice(ctx["user_ids"]), "patient_name": "Yük Testi",
+        }
+        hold = client.post("/api/hold-appointment", "POST /api/hold-appointment", json=booking, expect=(200, 409))
+        if hold is None or hold.status_code != 200:
+            return flow.fail()
+        held = hold.json()
+        created = client.post("/api/create-appointment", "POST /api/create-appointment", expect=(200, 409),
+                              json={**booking, "appointment_id": held["appointment_id"],
+                                    "hold_token": held["hold_token"]})
+        if created is None or created.status_code != 200:
+            flow.fail()
+
+
+def pages(client, rng, ctx):
+    """Ana sayfa, tahlil ve ilaç sayfalarının okuma istekleri"""
+    user_id = rng.choice(ctx["user_ids"])
+    client.get(f"/api/dashboard/{user_id}", "GET /api/dashboard/<user_id>", expect=(200, 404))
+    client.get(f"/api/lab-results/{user_id}/summary", "GET /api/lab-results/<user_id>/summary")
+    client.get(f"/api/lab-results/{user_id}/series", "GET /api/lab-results/<user_id>/series",
+               params={"test_name": rng.choice(LAB_TESTS), "max_points": 200})
+    client.get(f"/medicines/{user_id}", "GET /medicines/<user_id>", expect=(200, 404))
+    client.get(f"/api/medicines/{user_id}/interactions", "GET /api/medicines/<user_id>/interactions")
+    query = rng.choice(MEDICINE_QUERIES)
+    for length in range(2, min(len(query), 5) + 1):  # yazarken otomatik tamamlama
+        client.get("/api/medicines/autocomplete", "GET /api/medicines/autocomplete", params={"q": query[:length]})
+    client.get("/api/medicines/search", "GET /api/medicines/search", params={"q": query})
+    client.get("/api/directory/search", "GET /api/directory/search", params={"q": rng.choice(DIRECTORY_QUERIES)})
+
+
+SCENARIOS = {
+    "chat_question": chat_question,
+    "chat_appointment": chat_appointment,
+    "api_booking": api_booking,
+    "pages": pages,
+}
@@ -8,12 +8,30 @@ from edevlet_page import edevlet_page
 from enabiz_page import enabiz_page
 from lab_results_page import lab_results_page
 from appointment_page import appointment_page
+from dashboard_page import dashboard_page
+from metrics import metrics_page
+from tracing import tracing_page
+from profiler import profile_blueprint
+from migrations import run_migrations
+from data_access import database, release_connections
+from reservations import start_hold_reaper
+from directory import clinic_directory
+from lab_import import LabImporter, READERS, detect_format, format_report
+import click
 import os
-from db.hospital import db, db_page
+import random
+from db.hospital import ensure_schema, seed_database
 
 main = Flask(__name__)
 main.secret_key = os.urandom(24)
+# İsteğe bağlı profillenecek blueprint'ler (kayıttan önce hook eklenmeli)
+for profiled in (chat, appointment_page, lab_results_page):
+    profile_blueprint(profiled)
+
 # Blueprint'leri kaydet
+# Metrikler ilk sırada: istek süresi diğer before_request hook'larını da kapsasın
+main.register_blueprint(metrics_page)
+main.register_blueprint(tracing_page)
 main.register_blueprint(chat)
 main.register_blueprint(app)
 main.register_blueprint(medicine_page)
@@ -21,15 +39,53 @@ main.register_blueprint(edevlet_page)
 main.register_blueprint(enabiz_page)
 main.register_blueprint(lab_results_page)
 main.register_blueprint(appointment_page)
+main.register_blueprint(dashboard_page)
+
+# Werkzeug her istek için yeni thread açar; bağlantılar istek sonunda havuza döner
+main.teardown_appcontext(release_connections)
 
 @main.route('/')
 def index():
     return render_template("index.html")
 
 
-with db_page.app_context():
-    db.create_all()
+@main.cli.command("seed")
+@click.option("--reset", is_flag=True, help="ORM tablolarını silip yeniden oluştur (tüm veri silinir)")
+@click.option("--yes", is_flag=True, help="--reset için onay sorma")
+@click.option("--random-seed", type=int, default=None, help="Tekrarlanabilir örnek veri için")
+def seed_command(reset, yes, random_seed):
+    """Örnek bölüm, hastane, doktor, kullanıcı ve ilaç verilerini yükle."""
+    if reset and not yes:
+        click.confirm("Tüm tablolar silinecek. Devam edilsin mi?", abort=True)
+    if not seed_database(reset=reset, rng=random.Random(random_seed)):
+        raise click.ClickException("Veritabanında zaten veri var; yeniden yüklemek için --reset kullanın.")
+    # drop_all ile giden trigger, FTS ve indeksleri geri kur
+    conn = database.connect()
+    run_migrations(conn)
+    conn.close()
+    clinic_directory.invalidate()
+
+
+@main.cli.command("import-labs")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(sorted(READERS)), default=None,
+              help="Verilmezse dosya uzantısından anlaşılır")
+def import_labs_command(path, fmt):
+    """Laboratuvar toplu dosyasındaki tahlil sonuçlarını içe aktar."""
+    with open(path, encoding="utf-8-sig", newline="") as stream:
+        result = LabImporter().import_stream(stream, fmt or detect_format(path))
+    click.echo(format_report(result))
+
+
+# Eksik tablolar oluşturulur; mevcut veri korunur (örnek veri için: flask --app main seed)
+if ensure_schema():
     print("Veritabanı oluşturuldu.")
 
+# Şema migration'ları, indeksler ve sürüm trigger'ları (istek sırasında şema kontrolü yapılmaz)
+_conn = database.connect()
+run_migrations(_conn)
+_conn.close()
+start_hold_reaper()
+
 if __name__ == '__main__':
     main.run(debug=True)
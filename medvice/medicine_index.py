@@ -0,0 +1,228 @@
+# medicine_index.py
+"""Belirtiden reçetesiz ilaç önerisi için ilaç endikasyonu vektör indeksi.
+
+three.json hastalık indeksinden bağımsız ikinci bir FAISS indeksi:
+medicine tablosundaki her ürün için "ad: endikasyon. Etken madde: ..."
+metni, EnhancedRAGSystem'in zaten yüklediği sentence transformer ile
+gömülür. İndeks ve metadata ayrı cache dosyalarında tutulur. Sorgu tarafında
+ayrı bir encode yapılmaz: hastalık araması için üretilen sorgu vektörü bu
+indekste de aranır.
+
+Değişiklik kontrolü data_version'daki 'medicines' satırını okur (trigger'lar
+artırır). Sürüm değişince indeks arka plan thread'inde medicine.id bazında
+artımlı güncellenir: silinen / metni değişen ürünler remove_ids ile çıkarılır,
+yalnız yeni ve değişen ürünler encode edilir. Güncelleme indeksin bir
+kopyasında yapılır; istekler takas anına kadar eski indeksi kullanır.
+"""
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import faiss
+import numpy as np
+
+from data_access import database
+from metrics import record_cache, stage_timer
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+CACHE_PREFIX = os.path.join(BASE_DIR, "medicine_index")
+
+# İlaç verisinin sürümü en fazla bu sıklıkla kontrol edilir (saniye); kontrol tek satırlık okumadır
+CHECK_INTERVAL = float(os.getenv("MEDVICE_MEDICINE_INDEX_CHECK_INTERVAL", "5"))
+SUGGESTION_LIMIT = 3
+SIMILARITY_THRESHOLD = float(os.getenv("MEDVICE_MEDICINE_SIMILARITY_THRESHOLD", "0.35"))
+ENCODE_BATCH_SIZE = 64
+# Değişen ürün oranı bunu aşarsa artımlı güncelleme yerine indeks baştan kurulur
+REBUILD_RATIO = 0.5
+
+
+def medicine_text(row):
+    name, active_ingredient, indication = row[1], row[2], row[3]
+    return f"{name}: {indication or ''}. Etken madde: {active_ingredient or ''}"
+
+
+def _item_text(item):
+    return medicine_text((item["id"], item["name"], item["active_ingredient"], item["indication"]))
+
+
+def _item(row):
+    return {
+        "id": row[0],
+        "name": row[1],
+        "active_ingredient": row[2],
+        "indication": row[3],
+        "prescription": bool(row[4]),
+    }
+
+
+class MedicineVectorIndex:
+    """İlaç endikasyonları üzerinde IndexIDMap (id = medicine.id) + IndexFlatIP"""
+
+    def __init__(self, encoder, model_name, db=None, cache_prefix=CACHE_PREFIX, check_interval=CHECK_INTERVAL):
+        self.encoder = encoder
+        self.model_name = model_name
+        self.db = db or database
+        self.index_cache_file = f"{cache_prefix}_faiss.index"
+        self.metadata_cache_file = f"{cache_prefix}_metadata.pkl"
+        self.check_interval = check_interval
+        # (faiss indeksi, medicine.id -> {'id', 'name', 'active_ingredient', 'indication', 'prescription'});
+        # tek referans olarak takas edilir, arama hiçbir zaman yarım güncellenmiş bir çift görmez
+        self._snapshot = (None, {})
+        self.version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()  # güncellemeleri sıraya koyar; arama kilit almaz
+
+    @property
+    def faiss_index(self):
+        return self._snapshot[0]
+
+    @property
+    def items(self):
+        return self._snapshot[1]
+
+    def _rows(self):
+        return self.db.query_all(
+            "SELECT id, name, active_ingredient, indication, prescription FROM medicine ORDER BY id")
+
+    def _version(self):
+        try:
+            row = self.db.query_one("SELECT version FROM data_version WHERE name = 'medicines'")
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
+
+    def _load_cache(self):
+        if not (os.path.exists(self.index_cache_file) and os.path.exists(self.metadata_cache_file)):
+            return None
+        try:
+            with open(self.metadata_cache_file, "rb") as f:
+                metadata = pickle.load(f)
+            if metadata.get("model_name") != self.model_name:
+                return None
+            return faiss.read_index(self.index_cache_file), metadata["items"]
+        except Exception as e:
+            logger.warning(f"İlaç indeksi cache'i okunamadı: {e}")
+            return None
+
+    def _save_cache(self, index, items, version):
+        faiss.write_index(index, self.index_cache_file)
+        with open(self.metadata_cache_file, "wb") as f:
+            pickle.dump({"version": version, "model_name": self.model_name, "items": items}, f)
+
+    def _encode(self, rows):
+        embeddings = self.encoder.encode([medicine_text(row) for row in rows], batch_size=ENCODE_BATCH_SIZE,
+                                         convert_to_numpy=True).astype("float32")
+        faiss.normalize_L2(embeddings)
+        return embeddings, np.array([row[0] for row in rows], dtype="int64")
+
+    def _apply(self, index, items, rows):
+        """Satırlara göre yeni (indeks, items); yalnız eklenen / metni değişen ürünler encode edilir.
+
+        Eldeki indeks değiştirilmez, gerekirse kopyası güncellenir. Değişiklik yoksa None döner.
+        """
+        current = {row[0]: row for row in rows}
+        stale = [medicine_id for medicine_id, item in items.items()
+                 if medicine_id not in current or _item_text(item) != medicine_text(current[medicine_id])]
+        stale_ids = set(stale)
+        added = [row for row in rows if row[0] not in items or row[0] in stale_ids]
+        new_items = {row[0]: _item(row) for row in rows}
+        if not stale and not added:
+            # Yalnızca reçete bilgisi değişmiş olabilir; vektörler aynı kalır
+            return None if new_items == items else (index, new_items)
+        if not rows:
+            return None, {}
+
+        if index is None or len(stale) + len(added) > len(rows) * REBUILD_RATIO:
+            embeddings, ids = self._encode(rows)
+            index = faiss.IndexIDMap2(faiss.IndexFlatIP(embeddings.shape[1]))
+            index.add_with_ids(embeddings, ids)
+            logger.info(f"İlaç indeksi oluşturuldu: {len(rows)} ürün")
+            return index, new_items
+
+        index = faiss.clone_index(index)
+        if stale:
+            index.remove_ids(np.array(stale, dtype="int64"))
+        if added:
+            index.add_with_ids(*self._encode(added))
+        logger.info(f"İlaç indeksi güncellendi: {len(added)} ürün eklendi/yenilendi, "
+                    f"{len(stale_ids - set(current))} ürün silindi")
+        return index, new_items
+
+    def _sync(self, use_cache=False):
+        """Kilit altında çağrılır: indeksi veritabanıyla eşitle ve tek adımda takas et"""
+        # Sürüm satırlardan önce okunur; arada gelen değişiklik bir sonraki kontrolde yakalanır
+        version = self._version()
+        rows = self._rows()
+        index, items = self._snapshot
+        if use_cache and index is None:
+            cached = self._load_cache()
+            if cached is not None:
+                index, items = cached
+        updated = self._apply(index, items, rows)
+        record_cache("medicine_index", updated is None)
+        if updated is not None:
+            index, items = updated
+            if index is not None:
+                self._save_cache(index, items, version)
+        self._snapshot = (index, items)
+        self.version = version
+
+    def _update_in_background(self):
+        # Kilit refresh'te alınıp bu thread'e devredilir
+        try:
+            self._sync()
+        except Exception:
+            logger.exception("İlaç indeksi güncellenemedi; eski indeks kullanılmaya devam ediyor")
+        finally:
+            self._lock.release()
+
+    def refresh(self, force=False):
+        """force: cache'ten yükle / eşitle (açılışta, senkron). Aksi halde sürüm değiştiyse
+        güncellemeyi arka planda başlat; çağıran beklemez ve eski indeks kullanılır."""
+        if force:
+            with self._lock:
+                self._sync(use_cache=True)
+                self._checked_at = time.monotonic()
+            return
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return
+        self._checked_at = time.monotonic()
+        version = self._version()
+        if version is None or version == self.version:
+            return
+        if not self._lock.acquire(blocking=False):
+            return  # güncelleme zaten sürüyor
+        try:
+            threading.Thread(target=self._update_in_background, name="medicine-index", daemon=True).start()
+        except Exception:
+            self._lock.release()
+            raise
+
+    def search(self, query_embedding, top_k=SUGGESTION_LIMIT, threshold=SIMILARITY_THRESHOLD, otc_only=True):
+        """Normalize edilmiş sorgu vektörüne (1 x d) en yakın ürünler"""
+        self.refresh()
+        index, items = self._snapshot
+        if index is None or index.ntotal == 0:
+            return []
+        with stage_timer("medicine_search"):
+            # Reçeteli ürünler elendiğinde de top_k öneri kalsın diye fazladan aday
+            candidates = min(index.ntotal, top_k * 4 if otc_only else top_k)
+            similarities, ids = index.search(query_embedding, candidates)
+
+        suggestions = []
+        for score, medicine_id in zip(similarities[0], ids[0]):
+            item = items.get(int(medicine_id))
+            if item is None or score < threshold or (otc_only and item["prescription"]):
+                continue
+            suggestions.append({**item, "score": round(float(score), 4)})
+            if len(suggestions) == top_k:
+                break
+        return suggestions
+
+    def cache_files(self):
+        return [self.index_cache_file, self.metadata_cache_file]
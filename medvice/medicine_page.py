@@ -1,13 +1,15 @@
-import sqlite3
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, request, jsonify
+from metrics import timed_query
+from data_access import query_all, query_one, transaction
+from interactions import interaction_engine
+from user_repository import session_user
+from medicine_search import search_medicines, autocomplete_medicines, MAX_SEARCH_LIMIT, SEARCH_LIMIT
 
 # Blueprint olarak tanımlayın, Flask app değil
 medicine_page = Blueprint('medicine_page', __name__)
 
+@timed_query
 def get_user_medicines(user_id):
-    conn = sqlite3.connect(r'C:\\Users\\melis\\YZTA_m\\medvica\\yzta_team_forty\\medvice\\db\\db.db')
-    cursor = conn.cursor()
-
     query = """
     SELECT um.id, um.user_id, um.medicine_id, um.favorited, um.ordered, um.timestamp,
            m.name, m.active_ingredient, m.manufacturer, m.price
@@ -15,9 +17,7 @@ def get_user_medicines(user_id):
     JOIN medicine m ON um.medicine_id = m.id
     WHERE um.user_id = ?
     """
-    cursor.execute(query, (user_id,))
-    rows = cursor.fetchall()
-    conn.close()
+    rows = query_all(query, (user_id,))
 
     result = []
     for row in rows:
@@ -35,32 +35,62 @@ def get_user_medicines(user_id):
         })
     return result
 
-def get_user(user_id):
-    conn = sqlite3.connect(r'C:\\Users\\melis\\YZTA_m\\medvica\\yzta_team_forty\\medvice\\db\\db.db')
-    cursor = conn.cursor()
-    
-    query = "SELECT id, email, name FROM user WHERE id = ?"
-    cursor.execute(query, (user_id,))
-    row = cursor.fetchone()
-    conn.close()
-    
-    if row:
-        return {
-            "id": row[0],
-            "email": row[1],
-            "name": row[2]
-        }
-    return None
 @medicine_page.route('/medicines/<int:user_id>')
 def user_medicines(user_id):
     medicines = get_user_medicines(user_id)
-    user = get_user(user_id)
-    
-    print(f"Medicines data: {medicines}")
-    print(f"User data: {user}")
-    print(f"User id: {user_id}")
+    # Giriş yapan kullanıcıysa oturumdan, değilse kullanıcı önbelleğinden
+    user = session_user(user_id)
     
     if not user:
         return "Kullanıcı bulunamadı", 404
     
-    return render_template('medicine.html', medicines=medicines, user=user, user_id=user_id)
\ No newline at end of file
+    interactions = interaction_engine.check_user(user_id)
+    return render_template('medicine.html', medicines=medicines, user=user, user_id=user_id,
+                           interactions=interactions["interactions"])
+
+@medicine_page.route('/api/medicines/search')
+def medicine_search():
+    # ?q=&limit=&offset= ; bm25 sıralı katalog araması
+    text = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', SEARCH_LIMIT, type=int), 1), MAX_SEARCH_LIMIT)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    return jsonify({"query": text, "results": search_medicines(text, limit, offset)})
+
+@medicine_page.route('/api/medicines/<int:user_id>/interactions')
+def medicine_interactions(user_id):
+    return jsonify(interaction_engine.check_user(user_id))
+
+def record_user_medicine(user_id, medicine_id, flag):
+    """Sipariş/favori işaretini kaydet; ilaç listeye yeni eklendiyse True döner"""
+    with transaction() as conn:
+        updated = conn.execute(
+            f"UPDATE user_medicine SET {flag} = 1 WHERE user_id = ? AND medicine_id = ?",
+            (user_id, medicine_id),
+        ).rowcount
+        if not updated:
+            conn.execute(
+                f"INSERT INTO user_medicine (user_id, medicine_id, {flag}, timestamp) VALUES (?, ?, 1, CURRENT_TIMESTAMP)",
+                (user_id, medicine_id),
+            )
+    return not updated
+
+@medicine_page.route('/api/medicines/<int:user_id>/<any(order, favorite):action>', methods=['POST'])
+def mark_medicine(user_id, action):
+    # Döngüsel import: dashboard_page bu modülden get_user_medicines alıyor
+    from dashboard_page import invalidate_dashboard
+
+    data = request.get_json(silent=True) or {}
+    medicine = query_one("SELECT id, name, active_ingredient FROM medicine WHERE id = ?",
+                         (data.get('medicine_id'),))
+    if medicine is None or session_user(user_id) is None:
+        return jsonify({'error': 'İlaç veya kullanıcı bulunamadı'}), 404
+
+    added = record_user_medicine(user_id, medicine[0], 'ordered' if action == 'order' else 'favorited')
+    invalidate_dashboard(user_id)
+    # Yalnızca yeni eklenen ilaç mevcut listeyle karşılaştırılır
+    new_interactions = interaction_engine.add_medicine(user_id, *medicine) if added else []
+    return jsonify({'success': True, 'added': added, 'interactions': new_interactions})
+
+@medicine_page.route('/api/medicines/autocomplete')
+def medicine_autocomplete():
+    return jsonify(autocomplete_medicines(request.args.get('q', '')))
@@ -0,0 +1,168 @@
+# medicine_search.py
+"""İlaç kataloğu için FTS5 tam metin araması ve önek otomatik tamamlama.
+
+medicine tablosunun ad, etken madde, endikasyon, kullanım ve uyarı metinleri
+`medicine_fts` FTS5 tablosunda (rowid = medicine.id) indekslenir. unicode61
+tokenizer'ı büyük/küçük harfi ve diakritikleri (ç, ğ, ö, ş, ü) katlar.
+Türkçe'ye özgü ı / İ harflerini trigger'lar metni yazarken 'i'ye çevirir.
+Sorgular da text_utils.turkish_fold ile aynı biçime getirilir, böylece
+"agri kesici" sorgusu "Ağrı kesici" metnini bulur. Trigger'lar indeksi
+medicine tablosuyla senkron tutar; 2 ve 3 harflik önek indeksleri otomatik
+tamamlamayı tablo taramadan cevaplar.
+"""
+from data_access import query_all
+from metrics import timed_query
+from text_utils import fold_tokens
+
+FTS_COLUMNS = ("name", "active_ingredient", "indication", "usage", "warning")
+# bm25 sütun ağırlıkları: ad eşleşmesi en önemli, uyarı metni en az
+RANK_WEIGHTS = (10.0, 6.0, 3.0, 1.0, 0.5)
+AUTOCOMPLETE_LIMIT = 8
+AUTOCOMPLETE_CANDIDATES = 5  # öneri başına okunan aday
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+MAX_QUERY_TOKENS = 8
+
+RESULT_COLUMNS = ("id", "name", "active_ingredient", "manufacturer", "price", "prescription",
+                  "stock", "usage", "warning", "indication")
+
+
+def _folded(column, source="new."):
+    # SQLite lower() ASCII dışını bilmez; ı/İ dışındaki harfleri tokenizer katlar
+    return f"replace(replace(coalesce({source}{column}, ''), 'ı', 'i'), 'İ', 'i')"
+
+
+def _trigger_sql():
+    columns = ", ".join(FTS_COLUMNS)
+    values = ", ".join(_folded(column) for column in FTS_COLUMNS)
+    insert = f"INSERT INTO medicine_fts (rowid, {columns}) VALUES (new.id, {values});"
+    delete = "DELETE FROM medicine_fts WHERE rowid = old.id;"
+    return {
+        "trg_medicine_fts_insert": f"AFTER INSERT ON medicine BEGIN {insert} END",
+        "trg_medicine_fts_update": f"AFTER UPDATE ON medicine BEGIN {delete} {insert} END",
+        "trg_medicine_fts_delete": f"AFTER DELETE ON medicine BEGIN {delete} END",
+    }
+
+
+def install_medicine_search(conn):
+    """FTS tablosu ve trigger'lar (idempotent). medicine tablosu yeniden
+    oluşturulmuşsa (trigger'ları gitmişse) indeks baştan doldurulur."""
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS medicine_fts USING fts5(
+            {', '.join(FTS_COLUMNS)},
+            tokenize = "unicode61 remove_diacritics 2",
+            prefix = '2 3'
+        )
+    """)
+    existing = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'medicine'")}
+    triggers = _trigger_sql()
+    if not set(triggers) <= existing:
+        conn.execute("DELETE FROM medicine_fts")
+        values = ", ".join(_folded(column, source="") for column in FTS_COLUMNS)
+        conn.execute(f"INSERT INTO medicine_fts (rowid, {', '.join(FTS_COLUMNS)}) "
+                     f"SELECT id, {values} FROM medicine")
+        for name, body in triggers.items():
+            conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    conn.commit()
+
+
+def install_medicine_version_trigger(conn):
+    """medicine değişince data_version'daki 'medicines' sürümünü artıran trigger'lar (idempotent)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO data_version (name, version) VALUES ('medicines', 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_medicine_{event.lower()}_version
+            AFTER {event} ON medicine
+            BEGIN
+                UPDATE data_version SET version = version + 1 WHERE name = 'medicines';
+            END
+        """)
+    conn.commit()
+
+
+def build_match(text, prefix_all=True, column=None):
+    """Kullanıcı metnini güvenli bir FTS5 MATCH ifadesine çevir; kelime yoksa None.
+
+    Her kelime tırnaklanır (FTS sözdizimi karakterleri etkisiz kalır);
+    kelimeler önek olarak aranır (prefix_all=False ise yalnız sonuncusu).
+    """
+    tokens = fold_tokens(text)[:MAX_QUERY_TOKENS]
+    if not tokens:
+        return None
+    terms = []
+    for i, token in enumerate(tokens):
+        star = "*" if prefix_all or i == len(tokens) - 1 else ""
+        terms.append(f'"{token}"{star}')
+    expression = " ".join(terms)
+    return f"{{{column}}} : ({expression})" if column else expression
+
+
+@timed_query
+def search_medicines(text, limit=SEARCH_LIMIT, offset=0):
+    """bm25 ile sıralı katalog araması"""
+    match = build_match(text)
+    if match is None:
+        return []
+    weights = ", ".join(str(weight) for weight in RANK_WEIGHTS)
+    query = f"""
+    SELECT {', '.join('m.' + column for column in RESULT_COLUMNS)},
+           bm25(medicine_fts, {weights}) AS score
+    FROM medicine_fts
+    JOIN medicine m ON m.id = medicine_fts.rowid
+    WHERE medicine_fts MATCH ?
+    ORDER BY score
+    LIMIT ? OFFSET ?
+    """
+    rows = query_all(query, (match, limit, offset))
+
+    results = []
+    for row in rows:
+        item = dict(zip(RESULT_COLUMNS, row))
+        item["prescription"] = bool(item["prescription"])
+        item["score"] = round(-row[-1], 4)
+        results.append(item)
+    return results
+
+
+@timed_query
+def autocomplete_medicines(text, limit=AUTOCOMPLETE_LIMIT):
+    """Ad ve etken madde öneklerinden öneriler: [{id, name, active_ingredient}]
+
+    Adaylar LIMIT'ten önce bm25 ile sıralanır (rowid sırasıyla kesmek en iyi
+    eşleşmeleri dışarıda bırakabilir); en iyi adaylar arasında adı önekle
+    başlayanlar öne alınır.
+    """
+    match = build_match(text, prefix_all=False, column="name active_ingredient")
+    if match is None:
+        return []
+    weights = ", ".join(str(weight) for weight in RANK_WEIGHTS)
+    query = f"""
+    SELECT m.id, m.name, m.active_ingredient
+    FROM medicine_fts
+    JOIN medicine m ON m.id = medicine_fts.rowid
+    WHERE medicine_fts MATCH ?
+    ORDER BY bm25(medicine_fts, {weights})
+    LIMIT ?
+    """
+    rows = query_all(query, (match, limit * AUTOCOMPLETE_CANDIDATES))
+
+    prefix = " ".join(fold_tokens(text))
+    ranked = sorted(rows, key=lambda row: (not " ".join(fold_tokens(row[1])).startswith(prefix),
+                                           not " ".join(fold_tokens(row[2])).startswith(prefix),
+                                           len(row[1] or "")))
+    suggestions, seen = [], set()
+    for row in ranked:
+        if row[1] in seen:
+            continue
+        seen.add(row[1])
+        suggestions.append({"id": row[0], "name": row[1], "active_ingredient": row[2]})
+        if len(suggestions) == limit:
+            break
+    return suggestions
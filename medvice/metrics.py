@@ -0,0 +1,227 @@
+# metrics.py
+"""Hafif, bağımlılıksız Prometheus metrikleri ve /metrics endpoint'i.
+
+Sıcak yolda (her /ask isteğinde) çalıştığı için ölçüm maliyeti bir
+perf_counter çağrısı, bir bisect ve kısa bir kilitten ibarettir.
+"""
+import bisect
+import threading
+import time
+from functools import wraps
+
+from flask import Blueprint, Response, g, request
+
+metrics_page = Blueprint('metrics_page', __name__)
+
+# Saniye cinsinden histogram sınırları (0.5 ms - 10 sn)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Etiketli, monoton artan sayaç"""
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def label_sets(self):
+        with self._lock:
+            return list(self._values)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f'{self.name}{_format_labels(self.label_names, label_values)} {value}')
+        return lines
+
+
+class _Timer:
+    """Histogram'a süre yazan context manager"""
+    __slots__ = ('_histogram', '_label_values', '_start')
+
+    def __init__(self, histogram, label_values):
+        self._histogram = histogram
+        self._label_values = label_values
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._histogram.observe(time.perf_counter() - self._start, *self._label_values)
+        return False
+
+
+class Histogram:
+    """Sabit sınırlı (bucket) etiketli histogram"""
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # label_values -> [bucket sayaçları..., +Inf sayacı, toplam]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[idx] += 1
+            series[-1] += value
+
+    def time(self, *label_values):
+        return _Timer(self, label_values)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for label_values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.label_names, label_values, f'le="{bound}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            labels = _format_labels(self.label_names, label_values, 'le="+Inf"')
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            base = _format_labels(self.label_names, label_values)
+            lines.append(f'{self.name}_sum{base} {series[-1]}')
+            lines.append(f'{self.name}_count{base} {cumulative}')
+        return lines
+
+
+# ==================== METRİKLER ====================
+
+STAGE_DURATION = Histogram(
+    'medvice_stage_duration_seconds',
+    'RAG ve randevu akışındaki aşamaların süresi',
+    ('stage',)
+)
+DB_QUERY_DURATION = Histogram(
+    'medvice_db_query_duration_seconds',
+    'SQLite yardımcı fonksiyonlarının süresi',
+    ('helper',)
+)
+HTTP_REQUEST_DURATION = Histogram(
+    'medvice_http_request_duration_seconds',
+    'Route bazında HTTP istek süresi',
+    ('route', 'method')
+)
+HTTP_REQUESTS = Counter(
+    'medvice_http_requests_total',
+    'Route ve durum koduna göre HTTP istek sayısı',
+    ('route', 'method', 'status')
+)
+CACHE_REQUESTS = Counter(
+    'medvice_cache_requests_total',
+    'Önbellek erişimleri (hit/miss)',
+    ('cache', 'result')
+)
+
+REGISTRY = [STAGE_DURATION, DB_QUERY_DURATION, HTTP_REQUEST_DURATION, HTTP_REQUESTS, CACHE_REQUESTS]
+
+
+def stage_timer(stage):
+    """`with stage_timer('embedding'):` şeklinde aşama süresi ölç"""
+    return STAGE_DURATION.time(stage)
+
+
+def record_cache(cache, hit):
+    """Önbellek isabetini kaydet"""
+    CACHE_REQUESTS.inc(cache, 'hit' if hit else 'miss')
+
+
+def timed_query(func):
+    """SQLite yardımcı fonksiyonlarının süresini ölçen dekoratör"""
+    label = f"{func.__module__}.{func.__qualname__}"
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            DB_QUERY_DURATION.observe(time.perf_counter() - start, label)
+    return wrapper
+
+
+def _render_cache_ratios():
+    lines = ['# HELP medvice_cache_hit_ratio Önbellek isabet oranı',
+             '# TYPE medvice_cache_hit_ratio gauge']
+    caches = sorted({labels[0] for labels in CACHE_REQUESTS.label_sets()})
+    for cache in caches:
+        hits = CACHE_REQUESTS.value(cache, 'hit')
+        total = hits + CACHE_REQUESTS.value(cache, 'miss')
+        ratio = hits / total if total else 0.0
+        lines.append(f'medvice_cache_hit_ratio{{cache="{_escape(cache)}"}} {ratio:.6f}')
+    return lines
+
+
+def render_metrics():
+    """Prometheus text formatında tüm metrikleri üret"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(_render_cache_ratios())
+    return '\n'.join(lines) + '\n'
+
+
+# ==================== HTTP HOOK'LARI ====================
+
+@metrics_page.before_app_request
+def _start_request_timer():
+    g._metrics_start = time.perf_counter()
+
+
+@metrics_page.after_app_request
+def _remember_status(response):
+    g._metrics_status = response.status_code
+    return response
+
+
+@metrics_page.teardown_app_request
+def _record_request(exc):
+    # Kayıt teardown'da: yakalanmamış hatada after_request çalışmayabilir, 500'ler de sayılsın
+    start = g.pop('_metrics_start', None)
+    if start is not None:
+        status = g.pop('_metrics_status', None)
+        if status is None or exc is not None:
+            status = 500
+        # Kardinaliteyi sınırlamak için gerçek URL yerine route kalıbını kullan
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, route, request.method)
+        HTTP_REQUESTS.inc(route, request.method, str(status))
+
+
+@metrics_page.route('/metrics')
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
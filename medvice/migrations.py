@@ -0,0 +1,230 @@
+# migrations.py
+"""Sürümlü şema migration'ları.
+
+Uygulama açılışında bir kez çalışır; istek sırasında sqlite_master kontrolü
+veya CREATE TABLE yapılmaz. Uygulanan sürümler `schema_migrations`
+tablosunda tutulur. Her adım idempotent yazılır (IF NOT EXISTS, eksik
+sütun kontrolü), böylece yarıda kalan bir migration bir sonraki açılışta
+baştan güvenle tekrar çalışır.
+
+Sorgu planlarını doğrulamak için:
+
+    python -m migrations --explain [db yolu]
+"""
+import logging
+import sys
+
+from data_access import Database, DB_PATH
+from directory import install_version_triggers
+from interactions import install_interaction_schema, install_user_medicine_versions
+from lab_series import backfill_lab_values
+from medicine_search import install_medicine_search, install_medicine_version_trigger
+from schedule import install_schedule_schema, install_booking_version_trigger
+
+logger = logging.getLogger(__name__)
+
+
+def add_column_if_missing(conn, table, column, column_type):
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+
+def create_appointments_schema(conn):
+    """Tek appointments şeması: tutma sütunları, canlı slot UNIQUE indeksi, doktor/tarih indeksi"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS appointments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patient_name TEXT NOT NULL,
+            department_id TEXT NOT NULL,
+            hospital_id INTEGER NOT NULL,
+            doctor_id INTEGER NOT NULL,
+            appointment_date TEXT NOT NULL,
+            appointment_time TEXT NOT NULL,
+            status TEXT DEFAULT 'active',
+            hold_token TEXT,
+            hold_expires_at REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # create_appointment'ın eski, istek içinde oluşturduğu tabloda bu sütunlar yok
+    add_column_if_missing(conn, "appointments", "hold_token", "TEXT")
+    add_column_if_missing(conn, "appointments", "hold_expires_at", "REAL")
+
+    # Eski verideki çift kayıtlar UNIQUE indeksi engellemesin: ilk kayıt kalır, diğerleri iptal
+    duplicates = conn.execute("""
+        UPDATE appointments SET status = 'cancelled'
+        WHERE status IN ('active', 'held') AND id NOT IN (
+            SELECT MIN(id) FROM appointments WHERE status IN ('active', 'held')
+            GROUP BY doctor_id, appointment_date, appointment_time
+        )
+    """).rowcount
+    if duplicates:
+        logger.warning(f"{duplicates} çift randevu iptal edildi")
+
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_appointments_live_slot
+        ON appointments(doctor_id, appointment_date, appointment_time)
+        WHERE status IN ('active', 'held')
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_appointments_doctor_date
+        ON appointments(doctor_id, appointment_date)
+    """)
+    conn.commit()
+
+
+def _drop_orm_appointment_table(conn):
+    # db/hospital.py'deki kullanılmayan Appointment modelinin tablosu
+    conn.execute("DROP TABLE IF EXISTS appointment")
+    conn.commit()
+
+
+# Sıcak sorguların filtrelediği sütunlar; ORM modellerinde aynı adlarla tanımlı.
+# Yayımlanmış migration 4'ün listesi değiştirilmez; sonraki indeksler kendi migration'larında
+HOT_PATH_INDEXES = [
+    ("idx_doctor_department_hospital", "doctor", "department_id, hospital_id"),
+    ("idx_test_result_user_id", "test_result", "user_id"),
+    ("idx_user_medicine_user_id", "user_medicine", "user_id"),
+]
+
+
+def create_hot_path_indexes(conn):
+    for name, table, columns in HOT_PATH_INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({columns})")
+    conn.commit()
+
+
+def add_appointment_user_id(conn):
+    """Randevuyu hastaya bağla; kullanıcının yaklaşan randevuları (user_id, tarih) ile okunur"""
+    add_column_if_missing(conn, "appointments", "user_id", "INTEGER")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_appointments_user_date
+        ON appointments(user_id, appointment_date)
+    """)
+    conn.commit()
+
+
+def add_lab_numeric_columns(conn):
+    """Tahlil değeri ve referans aralığının sayısal karşılıkları; mevcut satırlar doldurulur"""
+    add_column_if_missing(conn, "test_result", "value_num", "REAL")
+    add_column_if_missing(conn, "test_result", "ref_low", "REAL")
+    add_column_if_missing(conn, "test_result", "ref_high", "REAL")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_test_result_user_test_date
+        ON test_result(user_id, test_name, test_date)
+    """)
+    backfill_lab_values(conn)
+
+
+def add_hospital_coordinates(conn):
+    """Hastane enlem/boylamı; eski satırlar NULL kalır ve yakınlık sıralamasında sona düşer"""
+    add_column_if_missing(conn, "hospital", "latitude", "REAL")
+    add_column_if_missing(conn, "hospital", "longitude", "REAL")
+    conn.commit()
+
+
+# (sürüm, ad, adım) - yeni migration'lar listenin sonuna eklenir, mevcutlar değiştirilmez
+MIGRATIONS = [
+    (1, "appointments_schema", create_appointments_schema),
+    (2, "drop_orm_appointment_table", _drop_orm_appointment_table),
+    (3, "doctor_schedule", install_schedule_schema),
+    (4, "hot_path_indexes", create_hot_path_indexes),
+    (5, "appointments_user_id", add_appointment_user_id),
+    (6, "lab_numeric_columns", add_lab_numeric_columns),
+    (7, "medicine_fts", install_medicine_search),
+    (8, "drug_interactions", install_interaction_schema),
+    (9, "hospital_coordinates", add_hospital_coordinates),
+    (10, "user_medicine_versions", install_user_medicine_versions),
+    (11, "medicine_version", install_medicine_version_trigger),
+]
+
+# Her açılışta çalışan idempotent adımlar: `flask seed --reset` ORM tablolarını
+# yeniden oluşturduğunda trigger'lar ve indeksler de gider
+REPEATABLE_STEPS = [
+    install_version_triggers,
+    install_booking_version_trigger,
+    create_hot_path_indexes,
+    backfill_lab_values,
+    install_medicine_search,
+    install_user_medicine_versions,
+    install_medicine_version_trigger,
+]
+
+
+def applied_versions(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    return {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+
+
+def run_migrations(conn):
+    """Uygulanmamış migration'ları sırayla çalıştır; uygulanan sürümleri döner"""
+    done = applied_versions(conn)
+    applied = []
+    for version, name, step in MIGRATIONS:
+        if version in done:
+            continue
+        logger.info(f"Migration {version} ({name}) uygulanıyor")
+        step(conn)
+        conn.execute("INSERT INTO schema_migrations (version, name) VALUES (?, ?)", (version, name))
+        conn.commit()
+        applied.append(version)
+    for step in REPEATABLE_STEPS:
+        step(conn)
+    return applied
+
+
+# EXPLAIN QUERY PLAN ile doğrulanan sıcak sorgular: (sorgu, parametreler, kabul edilen indeksler)
+HOT_QUERIES = [
+    ("SELECT id, name, experience, rating FROM doctor WHERE department_id = ? AND hospital_id = ?",
+     ("kardiyoloji", 1), "idx_doctor_department_hospital"),
+    ("SELECT DISTINCT h.id FROM hospital h JOIN doctor d ON h.id = d.hospital_id WHERE d.department_id = ?",
+     ("kardiyoloji",), "idx_doctor_department_hospital"),
+    ("SELECT doctor_id, appointment_date, appointment_time FROM appointments "
+     "WHERE doctor_id IN (?, ?) AND appointment_date BETWEEN ? AND ?",
+     (1, 2, "2030-01-01", "2030-01-14"), "idx_appointments_doctor_date"),
+    ("SELECT id FROM appointments WHERE doctor_id = ? AND appointment_date = ? "
+     "AND appointment_time = ? AND status = 'held'",
+     (1, "2030-01-01", "09:00"), ("ux_appointments_live_slot", "idx_appointments_doctor_date")),
+    ("SELECT id, test_type, test_name, value FROM test_result WHERE user_id = ?",
+     (1,), "idx_test_result_user_id"),
+    ("SELECT um.id, m.name FROM user_medicine um JOIN medicine m ON um.medicine_id = m.id WHERE um.user_id = ?",
+     (1,), "idx_user_medicine_user_id"),
+    ("SELECT id, appointment_date FROM appointments WHERE user_id = ? AND status = 'active' "
+     "AND appointment_date >= ? ORDER BY appointment_date, appointment_time LIMIT 5",
+     (1, "2030-01-01"), "idx_appointments_user_date"),
+    ("SELECT id, value_num, test_date FROM test_result WHERE user_id = ? AND test_name = ? "
+     "AND test_date >= ? ORDER BY test_name, test_date, id",
+     (1, "Hemoglobin", "2030-01-01"), "idx_test_result_user_test_date"),
+]
+
+
+def verify_query_plans(conn):
+    """Her sıcak sorgunun beklenen indeksi kullandığını kontrol et; hatalar listesi döner"""
+    failures = []
+    for query, params, index_names in HOT_QUERIES:
+        if isinstance(index_names, str):
+            index_names = (index_names,)
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+        if not any(f"INDEX {name}" in detail for detail in plan for name in index_names):
+            failures.append(f"{'/'.join(index_names)} kullanılmadı: {query}\n    plan: {plan}")
+    return failures
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    conn = Database(args[0] if args else DB_PATH).connect()
+    print("Uygulanan migration'lar:", run_migrations(conn) or "yok")
+    if "--explain" in sys.argv:
+        problems = verify_query_plans(conn)
+        for problem in problems:
+            print(problem)
+        print("Sorgu planları:", "HATALI" if problems else "tamam")
+        sys.exit(1 if problems else 0)
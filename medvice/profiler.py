@@ -0,0 +1,201 @@
+# profiler.py
+"""İstek bazlı, isteğe bağlı örnekleyici (sampling) profiler.
+
+Yetkili bir debug başlığı taşıyan (veya ayarlanan route/oran ile eşleşen)
+istekler, istek thread'inin yığınını belirli aralıklarla okuyan ayrı bir
+thread altında profillenir. Her örnek, thread'in o aralıktaki CPU süresine
+göre CPU ya da WAIT olarak işaretlenir; böylece /ask'in zamanını hesapta mı
+yoksa Gemini/SQLite beklerken mi geçirdiği görülebilir. Sonuç, trace ID ile
+aynı isimde collapsed stack ve speedscope JSON dosyaları olarak yazılır.
+"""
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+
+from flask import g, request
+
+import tracing
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+# Ayarlar (ortam değişkenleriyle değiştirilebilir)
+PROFILE_HEADER = "X-Medvice-Profile"
+PROFILE_TOKEN = os.getenv("MEDVICE_PROFILE_TOKEN", "")
+PROFILE_ROUTES = {r.strip() for r in os.getenv("MEDVICE_PROFILE_ROUTES", "").split(",") if r.strip()}
+PROFILE_RATE = float(os.getenv("MEDVICE_PROFILE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("MEDVICE_PROFILE_INTERVAL_MS", "5")) / 1000.0
+PROFILE_DIR = os.getenv("MEDVICE_PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+MAX_STACK_DEPTH = 128
+
+# CPU süresi / duvar saati oranı bunun altındaysa örnek "bekleme" sayılır
+_CPU_RATIO_THRESHOLD = 0.5
+
+
+def _thread_cpu_clock(thread_ident):
+    """Başka bir thread'in CPU saatini oku (Linux); desteklenmiyorsa None"""
+    try:
+        clock_id = time.pthread_getcpuclockid(thread_ident)
+        return lambda: time.clock_gettime(clock_id)
+    except (AttributeError, OSError):
+        return None
+
+
+class SamplingProfiler:
+    """Tek bir thread'i arka planda örnekleyen profiler"""
+
+    def __init__(self, thread_ident, interval=PROFILE_INTERVAL):
+        self.thread_ident = thread_ident
+        self.interval = interval
+        self.samples = {}  # (durum, frame, frame, ...) -> örnek sayısı
+        self.cpu_seconds = 0.0
+        self.wall_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="medvice-profiler", daemon=True)
+        self._cpu_clock = _thread_cpu_clock(thread_ident)
+        self._started_at = None
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.wall_seconds = time.perf_counter() - self._started_at
+
+    def _run(self):
+        last_wall = time.perf_counter()
+        last_cpu = self._cpu_clock() if self._cpu_clock else None
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_ident)
+            if frame is None:
+                break
+
+            now_wall = time.perf_counter()
+            state = "CPU"
+            if self._cpu_clock:
+                now_cpu = self._cpu_clock()
+                cpu_delta = now_cpu - last_cpu
+                self.cpu_seconds += cpu_delta
+                if cpu_delta < (now_wall - last_wall) * _CPU_RATIO_THRESHOLD:
+                    state = "WAIT"
+                last_cpu = now_cpu
+            last_wall = now_wall
+
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(state)
+            key = tuple(reversed(stack))
+            self.samples[key] = self.samples.get(key, 0) + 1
+
+    def to_collapsed(self):
+        """Brendan Gregg collapsed stack formatı (flamegraph.pl uyumlu)"""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.samples.items()) + "\n"
+
+    def to_speedscope(self, name):
+        """speedscope.app 'sampled' profil formatı"""
+        frames, frame_index = [], {}
+        samples, weights = [], []
+        for stack, count in self.samples.items():
+            indices = []
+            for frame_name in stack:
+                if frame_name not in frame_index:
+                    frame_index[frame_name] = len(frames)
+                    frames.append({"name": frame_name})
+                indices.append(frame_index[frame_name])
+            samples.append(indices)
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": name,
+            "exporter": "medvice.profiler",
+            "metadata": {
+                "wall_seconds": round(self.wall_seconds, 6),
+                "cpu_seconds": round(self.cpu_seconds, 6) if self._cpu_clock else None,
+                "interval_seconds": self.interval,
+            },
+        }
+
+
+def should_profile():
+    """Bu istek profillenmeli mi?"""
+    header = request.headers.get(PROFILE_HEADER)
+    if header and PROFILE_TOKEN and hmac.compare_digest(header, PROFILE_TOKEN):
+        return True
+    if PROFILE_RATE <= 0:
+        return False
+    route = request.url_rule.rule if request.url_rule else None
+    if PROFILE_ROUTES and route not in PROFILE_ROUTES:
+        return False
+    return random.random() < PROFILE_RATE
+
+
+def write_profile(profiler, trace_id, name):
+    """Profili trace ID ile aynı isimde dosyalara yaz"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, trace_id)
+    with open(f"{base}.collapsed.txt", "w", encoding="utf-8") as f:
+        f.write(profiler.to_collapsed())
+    with open(f"{base}.speedscope.json", "w", encoding="utf-8") as f:
+        json.dump(profiler.to_speedscope(name), f, ensure_ascii=False)
+    return base
+
+
+def _start_profiling():
+    if not should_profile():
+        return
+    profiler = SamplingProfiler(threading.get_ident())
+    profiler.start()
+    g._profiler = profiler
+    # Profil ile trace dosyası yan yana incelenebilsin diye trace'i de yaz
+    tracing.force_sample()
+
+
+def _stop_profiling(response):
+    profiler = g.pop('_profiler', None)
+    if profiler is None:
+        return response
+    profiler.stop()
+    trace_id = tracing.current_trace_id() or f"untraced-{int(time.time() * 1000)}"
+    name = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+    try:
+        write_profile(profiler, trace_id, name)
+        response.headers["X-Medvice-Profile-Id"] = trace_id
+    except OSError as e:
+        logger.warning(f"Profil yazılamadı: {e}")
+    return response
+
+
+def _discard_profiling(exc):
+    # after_request çalışmadıysa örnekleyici thread'i açık bırakma
+    profiler = g.pop('_profiler', None)
+    if profiler is not None:
+        profiler.stop()
+
+
+def profile_blueprint(blueprint):
+    """Blueprint'in isteklerini profillenebilir yap (register_blueprint'ten önce çağrılmalı)"""
+    blueprint.before_request(_start_profiling)
+    blueprint.after_request(_stop_profiling)
+    blueprint.teardown_request(_discard_profiling)
+    return blueprint
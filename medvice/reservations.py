@@ -0,0 +1,184 @@
+# reservations.py
+"""Yarış durumuna dayanıklı randevu rezervasyonu.
+
+Aynı doktor/tarih/saat için en fazla bir canlı kayıt olabilir:
+appointments(doctor_id, appointment_date, appointment_time) üzerinde
+status 'active' veya 'held' olan satırlar için UNIQUE kısmi indeks vardır.
+Kullanıcı saat seçtiğinde kısa ömürlü bir 'held' kaydı (tutma) oluşturulur,
+onayda bu kayıt 'active'e çevrilir. Süresi dolan tutmalar arka planda
+temizlenir; aynı slota yeni bir istek geldiğinde de önce o slotun süresi
+dolmuş tutması silinir.
+"""
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from data_access import database
+from directory import clinic_directory
+from metrics import timed_query
+from schedule import _to_date, schedule_engine
+
+logger = logging.getLogger(__name__)
+
+HOLD_TTL = int(os.getenv("MEDVICE_HOLD_TTL", "300"))  # saniye
+REAPER_INTERVAL = int(os.getenv("MEDVICE_HOLD_REAPER_INTERVAL", "30"))
+
+
+class SlotUnavailable(Exception):
+    """Slot başka bir kullanıcı tarafından alınmış veya tutulmuş"""
+
+
+class SlotInPast(SlotUnavailable):
+    """Slotun tarihi / saati geçmişte kalıyor"""
+
+
+class InvalidBooking(ValueError):
+    """Tarih, saat veya doktor geçersiz (takvimde böyle bir slot yok)"""
+
+
+class HoldExpired(Exception):
+    """Tutma bulunamadı, süresi doldu veya token uyuşmuyor"""
+
+
+class ReservationService:
+    """Tutma / onay / serbest bırakma işlemleri"""
+
+    def __init__(self, db=None, hold_ttl=HOLD_TTL, directory=None, schedule=None):
+        self.db = db or database
+        self.hold_ttl = hold_ttl
+        self.directory = directory or clinic_directory
+        self.schedule = schedule or schedule_engine
+
+    def _validate(self, doctor_id, date, time_slot):
+        """Yazmadan önce slotu doğrula; (doctor_id, 'YYYY-AA-GG') döner"""
+        try:
+            doctor_id = int(doctor_id)
+            day = _to_date(date)
+        except (TypeError, ValueError):
+            raise InvalidBooking(f"Geçersiz doktor veya tarih: {doctor_id} {date}")
+        if doctor_id not in self.directory.snapshot().doctor_ids:
+            raise InvalidBooking(f"Doktor bulunamadı: {doctor_id}")
+        if time_slot not in self.schedule.day_template(doctor_id, day):
+            raise InvalidBooking(f"{day} {time_slot} doktorun çalışma saatlerinde değil")
+        # Geçmiş gün ya da bugünün geçmiş saati tutulamaz (_free_slots ile aynı kesme)
+        if f"{day.isoformat()} {time_slot}" <= datetime.now().strftime('%Y-%m-%d %H:%M'):
+            raise SlotInPast(f"{day} {time_slot} geçmişte kalıyor")
+        return doctor_id, day.isoformat()
+
+    def _update_schedule(self, mark, doctor_id, date, time_slot):
+        # Commit'ten sonra çalışır: hata isteği bozmasın, bitmap bir sonraki sorguda yeniden okunur
+        try:
+            mark(doctor_id, date, time_slot)
+        except Exception:
+            logger.exception(f"Takvim önbelleği güncellenemedi: {doctor_id} {date} {time_slot}")
+            self.schedule.invalidate(doctor_id)
+
+    def _insert(self, status, doctor_id, date, time_slot, department_id, hospital_id,
+                patient_name, user_id=None, hold_token=None, expires_at=None):
+        doctor_id, date = self._validate(doctor_id, date, time_slot)
+        now = time.time()
+        try:
+            with self.db.transaction() as conn:
+                # Bu slottaki süresi dolmuş tutma yeni isteği engellemesin
+                conn.execute("""
+                    DELETE FROM appointments
+                    WHERE doctor_id = ? AND appointment_date = ? AND appointment_time = ?
+                      AND status = 'held' AND hold_expires_at < ?
+                """, (doctor_id, date, time_slot, now))
+                cursor = conn.execute("""
+                    INSERT INTO appointments (patient_name, user_id, department_id, hospital_id, doctor_id,
+                                              appointment_date, appointment_time, status,
+                                              hold_token, hold_expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (patient_name, user_id, str(department_id), hospital_id, doctor_id,
+                      date, time_slot, status, hold_token, expires_at))
+        except sqlite3.IntegrityError:
+            raise SlotUnavailable(f"{date} {time_slot} dolu")
+        self._update_schedule(self.schedule.mark_booked, doctor_id, date, time_slot)
+        return cursor.lastrowid
+
+    @timed_query
+    def hold(self, doctor_id, date, time_slot, department_id, hospital_id, patient_name='Hasta',
+             user_id=None):
+        """Slotu kısa süreliğine tut; (appointment_id, hold_token, expires_at) döner"""
+        token = secrets.token_urlsafe(16)
+        expires_at = time.time() + self.hold_ttl
+        appointment_id = self._insert('held', doctor_id, date, time_slot, department_id,
+                                      hospital_id, patient_name, user_id, token, expires_at)
+        return appointment_id, token, expires_at
+
+    @timed_query
+    def confirm(self, appointment_id, hold_token, patient_name=None):
+        """Tutmayı kesin randevuya çevir"""
+        cursor = self.db.execute("""
+            UPDATE appointments
+            SET status = 'active', hold_token = NULL, hold_expires_at = NULL,
+                patient_name = COALESCE(?, patient_name)
+            WHERE id = ? AND hold_token = ? AND status = 'held' AND hold_expires_at >= ?
+        """, (patient_name, appointment_id, hold_token, time.time()))
+        if cursor.rowcount != 1:
+            raise HoldExpired("Tutma süresi doldu veya geçersiz")
+        return appointment_id
+
+    @timed_query
+    def release(self, appointment_id, hold_token):
+        """Tutmayı bırak (kullanıcı vazgeçti)"""
+        # RETURNING: yalnızca gerçekten silinen satır serbest sayılır (arada onaylanan tutma değil)
+        # fetchall: ifade sonuna kadar yürüsün ki autocommit'te yazma kilidi hemen bırakılsın
+        rows = self.db.execute(
+            "DELETE FROM appointments WHERE id = ? AND hold_token = ? AND status = 'held' "
+            "RETURNING doctor_id, appointment_date, appointment_time",
+            (appointment_id, hold_token)
+        ).fetchall()
+        for row in rows:
+            self._update_schedule(self.schedule.mark_free, *row)
+        return bool(rows)
+
+    @timed_query
+    def book(self, doctor_id, date, time_slot, department_id, hospital_id, patient_name='Hasta',
+             user_id=None):
+        """Tutma olmadan doğrudan, atomik randevu oluştur"""
+        return self._insert('active', doctor_id, date, time_slot, department_id,
+                            hospital_id, patient_name, user_id)
+
+    @timed_query
+    def reap_expired_holds(self):
+        """Süresi dolan tutmaları sil"""
+        rows = self.db.execute(
+            "DELETE FROM appointments WHERE status = 'held' AND hold_expires_at < ? "
+            "RETURNING doctor_id, appointment_date, appointment_time", (time.time(),)
+        ).fetchall()
+        for row in rows:
+            self._update_schedule(self.schedule.mark_free, *row)
+        return len(rows)
+
+
+reservation_service = ReservationService()
+
+_reaper_started = False
+_reaper_lock = threading.Lock()
+
+
+def start_hold_reaper(interval=REAPER_INTERVAL):
+    """Süresi dolan tutmaları periyodik olarak temizleyen daemon thread"""
+    global _reaper_started
+    with _reaper_lock:
+        if _reaper_started:
+            return
+        _reaper_started = True
+
+    def _loop():
+        while True:
+            time.sleep(interval)
+            try:
+                reaped = reservation_service.reap_expired_holds()
+                if reaped:
+                    logger.info(f"{reaped} süresi dolmuş randevu tutması temizlendi")
+            except Exception as e:
+                logger.error(f"Tutma temizleme hatası: {e}")
+
+    threading.Thread(target=_loop, name="medvice-hold-reaper", daemon=True).start()
@@ -0,0 +1,89 @@
+# response_cache.py
+"""Sürüme bağlı, serileştirilmiş JSON yanıt önbelleği.
+
+Gün içinde nadiren değişen uç noktaların (bölüm, hastane, doktor listeleri)
+gövdesi bir kez üretilip bayt olarak saklanır ve içeriğin SHA-1 özeti güçlü
+ETag olarak kullanılır. Anahtar istek yolu ve sorgu dizesi, geçerlilik ise
+verilen sürüm fonksiyonudur (ör. dizin trigger'larının artırdığı
+data_version): sürüm değişince önbellek boşaltılır. İstemcinin If-None-Match başlığı saklanan
+ETag ile eşleşirse görünüm fonksiyonu hiç çağrılmadan 304 döner.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, request
+
+from metrics import record_cache
+
+# Tarayıcı / ara önbellek bu süre boyunca yeniden doğrulamadan kullanabilir (saniye)
+MAX_AGE = int(os.getenv("MEDVICE_DIRECTORY_MAX_AGE", "60"))
+MAX_ENTRIES = 4096
+
+
+class ResponseCache:
+    """istek yolu ve sorgu dizesi -> (gövde, ETag); sürüm değişince tümü düşer"""
+
+    def __init__(self, name, version_fn, max_age=MAX_AGE, max_entries=MAX_ENTRIES):
+        self.name = name
+        self.version_fn = version_fn
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, version, key):
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+                return None
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _put(self, version, key, entry):
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries[key] = entry
+            # Geçersiz ID'lerle şişirilmesin: en eski girdiler atılır
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.version = None
+
+    def _respond(self, body, etag, status=200):
+        response = Response(body if status == 200 else None, status=status, mimetype="application/json")
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = f"public, max-age={self.max_age}, must-revalidate"
+        return response
+
+    def cached(self, view):
+        """Görünümün 200 yanıtlarını önbelleğe alan dekoratör; hata yanıtları olduğu gibi geçer"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version = self.version_fn()
+            key = request.full_path
+            entry = self._get(version, key)
+            record_cache(self.name, entry is not None)
+            if entry is None:
+                response = view(*args, **kwargs)
+                if not isinstance(response, Response) or response.status_code != 200:
+                    return response
+                body = response.get_data()
+                entry = (body, hashlib.sha1(body).hexdigest())
+                self._put(version, key, entry)
+
+            body, etag = entry
+            if etag in request.if_none_match:
+                return self._respond(None, etag, status=304)
+            return self._respond(body, etag)
+        return wrapper
@@ -0,0 +1,329 @@
+# schedule.py
+"""Doktor çalışma şablonları ve gün bazlı randevu slot bitmap'leri.
+
+Her doktorun haftalık şablonu (doctor_schedule tablosu, yoksa varsayılan
+şablon) gün içindeki slot saatlerini belirler. Alınmış randevular, her
+(doktor, gün) için bir tamsayı bitmap'e (bit i = i. slot dolu) dönüştürülüp
+bellekte tutulur; "bu doktorun / bölümün önümüzdeki 7 gündeki ilk N boş
+slotu" gibi sorgular appointments tablosunu taramadan bitmap'ler üzerinden
+cevaplanır. Bitmap'ler tek sorguyla toplu yüklenir, bu process'teki
+rezervasyonlarda anında güncellenir ve diğer worker'lar için kısa bir
+TTL ile tazelenir.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date as date_cls, datetime, timedelta
+
+from data_access import database
+from metrics import record_cache, timed_query
+
+# Başka worker'lardaki rezervasyonların görünme gecikmesi (saniye)
+BITMAP_TTL = float(os.getenv("MEDVICE_SCHEDULE_TTL", "30"))
+BITMAP_MAX_ENTRIES = int(os.getenv("MEDVICE_SCHEDULE_MAX_ENTRIES", "50000"))
+
+
+def _build_slots(ranges, slot_minutes):
+    """[('09:00', '12:00'), ...] aralıklarını slot saatlerine böl"""
+    slots = []
+    for start, end in ranges:
+        current = datetime.strptime(start, '%H:%M')
+        end_time = datetime.strptime(end, '%H:%M')
+        while current + timedelta(minutes=slot_minutes) <= end_time:
+            slots.append(current.strftime('%H:%M'))
+            current += timedelta(minutes=slot_minutes)
+    return tuple(slots)
+
+
+# Varsayılan şablon: hafta içi 09:00-12:00 ve 13:00-17:00, 20 dakikalık slotlar
+DEFAULT_DAY_SLOTS = _build_slots([('09:00', '12:00'), ('13:00', '17:00')], 20)
+DEFAULT_TEMPLATE = {weekday: DEFAULT_DAY_SLOTS for weekday in range(5)}  # 0 = Pazartesi
+
+
+def install_schedule_schema(conn):
+    """Doktor çalışma şablonu tablosu (idempotent)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS doctor_schedule (
+            doctor_id INTEGER NOT NULL,
+            weekday INTEGER NOT NULL,
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            slot_minutes INTEGER NOT NULL DEFAULT 20,
+            PRIMARY KEY (doctor_id, weekday, start_time)
+        )
+    """)
+    conn.commit()
+
+
+def install_booking_version_trigger(conn):
+    """appointments değişikliklerinde 'bookings' sürümünü artır (ETag için, idempotent)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO data_version (name, version) VALUES ('bookings', 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_appointments_{event.lower()}_bookings_version
+            AFTER {event} ON appointments
+            BEGIN
+                UPDATE data_version SET version = version + 1 WHERE name = 'bookings';
+            END
+        """)
+    conn.commit()
+
+
+def _to_date(value):
+    if isinstance(value, date_cls):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+class ScheduleEngine:
+    """Şablon + bitmap tabanlı müsaitlik motoru"""
+
+    def __init__(self, db=None, ttl=BITMAP_TTL, max_entries=BITMAP_MAX_ENTRIES):
+        self.db = db or database
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._templates = None   # doctor_id -> {weekday: (slot, ...)}
+        self._slot_index = {}    # (slot, ...) -> {'09:00': 0, ...}
+        self._bitmaps = OrderedDict()  # (doctor_id, 'YYYY-MM-DD') -> (yüklenme zamanı, bitmap)
+        self._bookings_version = None  # bitmap'lerin yüklendiği 'bookings' sürümü
+        self._lock = threading.Lock()
+
+    # ---------- Şablonlar ----------
+
+    @timed_query
+    def _load_templates(self):
+        templates = {}
+        try:
+            rows = self.db.query_all(
+                "SELECT doctor_id, weekday, start_time, end_time, slot_minutes FROM doctor_schedule"
+            )
+        except sqlite3.OperationalError:
+            rows = []
+
+        ranges = {}
+        for doctor_id, weekday, start, end, slot_minutes in rows:
+            ranges.setdefault((doctor_id, weekday, slot_minutes), []).append((start, end))
+        for (doctor_id, weekday, slot_minutes), day_ranges in ranges.items():
+            templates.setdefault(doctor_id, {})[weekday] = _build_slots(sorted(day_ranges), slot_minutes)
+        return templates
+
+    def reload_templates(self):
+        with self._lock:
+            self._templates = self._load_templates()
+
+    def day_template(self, doctor_id, day):
+        """Doktorun o günkü slot saatleri"""
+        if self._templates is None:
+            self.reload_templates()
+        template = self._templates.get(doctor_id, DEFAULT_TEMPLATE)
+        return template.get(day.weekday(), ())
+
+    def _index_of(self, slots):
+        index = self._slot_index.get(slots)
+        if index is None:
+            index = self._slot_index[slots] = {slot: i for i, slot in enumerate(slots)}
+        return index
+
+    # ---------- Bitmap'ler ----------
+
+    @timed_query
+    def _load_bookings(self, doctor_ids, start_day, end_day):
+        """Verilen doktor ve tarih aralığındaki aktif randevular ve geçerli tutmalar (tek sorgu)"""
+        placeholders = ",".join("?" * len(doctor_ids))
+        try:
+            return self.db.query_all(f"""
+                SELECT doctor_id, appointment_date, appointment_time FROM appointments
+                WHERE doctor_id IN ({placeholders})
+                  AND appointment_date BETWEEN ? AND ?
+                  AND (status = 'active' OR (status = 'held' AND hold_expires_at >= ?))
+            """, (*doctor_ids, start_day.isoformat(), end_day.isoformat(), time.time()))
+        except sqlite3.OperationalError:
+            # appointments tablosu henüz yoksa hiç randevu yok demektir
+            return []
+
+    def _materialize(self, doctor_ids, days):
+        """Eksik/eskimiş bitmap'leri tek sorguda yükle"""
+        now = time.monotonic()
+        missing_doctors, missing_days = set(), set()
+        with self._lock:
+            for doctor_id in doctor_ids:
+                for day in days:
+                    entry = self._bitmaps.get((doctor_id, day.isoformat()))
+                    if entry is None or now - entry[0] > self.ttl:
+                        missing_doctors.add(doctor_id)
+                        missing_days.add(day)
+        record_cache('schedule_bitmap', not missing_doctors)
+        if not missing_doctors:
+            return
+
+        rows = self._load_bookings(sorted(missing_doctors), min(missing_days), max(missing_days))
+        bitmaps = {(doctor_id, day.isoformat()): 0 for doctor_id in missing_doctors for day in missing_days}
+        for doctor_id, day_str, slot in rows:
+            key = (doctor_id, day_str)
+            if key not in bitmaps:
+                continue
+            index = self._index_of(self.day_template(doctor_id, _to_date(day_str))).get(slot)
+            if index is not None:
+                bitmaps[key] |= 1 << index
+
+        with self._lock:
+            for key, bitmap in bitmaps.items():
+                self._bitmaps[key] = (now, bitmap)
+                self._bitmaps.move_to_end(key)
+            while len(self._bitmaps) > self.max_entries:
+                self._bitmaps.popitem(last=False)
+
+    def _booked_bitmap(self, doctor_id, day):
+        entry = self._bitmaps.get((doctor_id, day.isoformat()))
+        return entry[1] if entry else 0
+
+    def _set_bit(self, doctor_id, day, slot, booked):
+        day = _to_date(day)
+        index = self._index_of(self.day_template(doctor_id, day)).get(slot)
+        if index is None:
+            return
+        key = (doctor_id, day.isoformat())
+        with self._lock:
+            entry = self._bitmaps.get(key)
+            if entry is None:
+                return  # henüz yüklenmediyse ilk sorguda zaten doğru gelir
+            bitmap = entry[1] | (1 << index) if booked else entry[1] & ~(1 << index)
+            self._bitmaps[key] = (entry[0], bitmap)
+
+    def mark_booked(self, doctor_id, day, slot):
+        """Bu process'te alınan randevuyu bitmap'e işle"""
+        self._set_bit(doctor_id, day, slot, True)
+
+    def mark_free(self, doctor_id, day, slot):
+        """İptal edilen/serbest kalan slotu bitmap'ten düş"""
+        self._set_bit(doctor_id, day, slot, False)
+
+    def invalidate(self, doctor_id=None):
+        with self._lock:
+            if doctor_id is None:
+                self._bitmaps.clear()
+            else:
+                for key in [k for k in self._bitmaps if k[0] == doctor_id]:
+                    del self._bitmaps[key]
+
+    @timed_query
+    def bookings_version(self):
+        """appointments tablosunun trigger'la artan sürümü; tablo yoksa None"""
+        try:
+            row = self.db.query_one("SELECT version FROM data_version WHERE name = 'bookings'")
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
+
+    def sync_version(self, version):
+        """Sürüm değiştiyse (başka worker'da rezervasyon) bitmap'leri düşür"""
+        with self._lock:
+            if version != self._bookings_version:
+                self._bitmaps.clear()
+                self._bookings_version = version
+
+    # ---------- Sorgular ----------
+
+    def _free_slots(self, doctor_id, day, now=None):
+        if now and day < now.date():
+            return  # geçmiş gün: boş slot yok
+        slots = self.day_template(doctor_id, day)
+        booked = self._booked_bitmap(doctor_id, day)
+        cutoff = now.strftime('%H:%M') if now and day == now.date() else None
+        for i, slot in enumerate(slots):
+            if not booked >> i & 1 and (cutoff is None or slot > cutoff):
+                yield slot
+
+    def day_slots(self, doctor_id, day):
+        """Bir günün tüm slotları ve müsaitlik durumu"""
+        day = _to_date(day)
+        self._materialize([doctor_id], [day])
+        now = datetime.now()
+        free = set(self._free_slots(doctor_id, day, now))
+        return [{'time': slot, 'available': slot in free} for slot in self.day_template(doctor_id, day)]
+
+    def available_times(self, doctor_id, day):
+        """Bir günün boş slot saatleri"""
+        day = _to_date(day)
+        self._materialize([doctor_id], [day])
+        return list(self._free_slots(doctor_id, day, datetime.now()))
+
+    def first_free_slots(self, doctor_ids, limit=5, days=7, start=None):
+        """Önümüzdeki `days` gün içinde en erken `limit` boş slot: [(tarih, saat, doktor_id), ...]"""
+        start = _to_date(start) if start else date_cls.today()
+        day_list = [start + timedelta(days=i) for i in range(days)]
+        doctor_ids = list(doctor_ids)
+        if not doctor_ids:
+            return []
+        self._materialize(doctor_ids, day_list)
+
+        now = datetime.now()
+        results = []
+        for day in day_list:
+            day_slots = []
+            for doctor_id in doctor_ids:
+                for slot in self._free_slots(doctor_id, day, now):
+                    day_slots.append((day.isoformat(), slot, doctor_id))
+            day_slots.sort()
+            results.extend(day_slots[:limit - len(results)])
+            if len(results) >= limit:
+                break
+        return results
+
+
+    def availability_grid(self, doctor_ids, start, end):
+        """Doktor x gün müsaitlik ızgarası (tek sorgu).
+
+        `slots` tüm doktorların slot saatlerinin birleşimidir; her doktor için gün
+        başına bir dize döner: '1' boş, '0' dolu/geçmiş, '-' çalışmıyor.
+        """
+        start, end = _to_date(start), _to_date(end)
+        day_list = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        doctor_ids = list(doctor_ids)
+        if doctor_ids and day_list:
+            self._materialize(doctor_ids, day_list)
+
+        slot_set = set()
+        for doctor_id in doctor_ids:
+            for day in day_list:
+                slot_set.update(self.day_template(doctor_id, day))
+        slots = sorted(slot_set)
+
+        now = datetime.now()
+        grid = {}
+        free_by_day = {day.isoformat(): 0 for day in day_list}
+        for doctor_id in doctor_ids:
+            rows = []
+            for day in day_list:
+                working = set(self.day_template(doctor_id, day))
+                free = set(self._free_slots(doctor_id, day, now))
+                free_by_day[day.isoformat()] += len(free)
+                rows.append("".join(
+                    '1' if slot in free else '0' if slot in working else '-' for slot in slots
+                ))
+            grid[str(doctor_id)] = rows
+        return {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'slots': slots,
+            'grid': grid,
+            'free_by_day': free_by_day,
+        }
+
+
+schedule_engine = ScheduleEngine()
+
+
+def first_free_slots_for_department(department_id, limit=5, days=7, start=None):
+    """Bölümdeki tüm doktorlar için en erken boş slotlar"""
+    from directory import clinic_directory
+    doctor_ids = clinic_directory.snapshot().doctor_ids_by_department.get(department_id, [])
+    return schedule_engine.first_free_slots(doctor_ids, limit, days, start)
@@ -0,0 +1,176 @@
+# session_store.py
+"""Randevu akışı için sınırlı, TTL ile temizlenen oturum deposu.
+
+İki arka uç vardır:
+- MemorySessionStore: tek process için LRU + TTL (geliştirme/test)
+- SQLiteSessionStore: WAL modunda paylaşılan SQLite dosyası; birden fazla
+  worker ve yeniden başlatmalar arasında oturumu korur
+
+Durum, kompakt JSON olarak (büyükse zlib ile sıkıştırılıp) saklanır.
+"""
+import json
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from data_access import Database
+from metrics import timed_query
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+# Ayarlar (ortam değişkenleriyle değiştirilebilir)
+SESSION_BACKEND = os.getenv("MEDVICE_SESSION_BACKEND", "sqlite")
+SESSION_TTL = int(os.getenv("MEDVICE_SESSION_TTL", "1800"))  # saniye (boşta kalma süresi)
+SESSION_MAX_ENTRIES = int(os.getenv("MEDVICE_SESSION_MAX_ENTRIES", "10000"))
+SESSION_DB_PATH = os.getenv("MEDVICE_SESSION_DB", os.path.join(BASE_DIR, "db", "sessions.db"))
+
+# Bu boyutun üstündeki durumlar zlib ile sıkıştırılır
+_COMPRESS_THRESHOLD = 512
+_RAW, _ZLIB = b"j", b"z"
+
+
+def encode_state(data):
+    """Oturum verisini kompakt bayt dizisine çevir"""
+    raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(raw) > _COMPRESS_THRESHOLD:
+        return _ZLIB + zlib.compress(raw, 6)
+    return _RAW + raw
+
+
+def decode_state(blob):
+    """encode_state ile yazılmış veriyi geri çöz"""
+    blob = bytes(blob)
+    body = zlib.decompress(blob[1:]) if blob[:1] == _ZLIB else blob[1:]
+    return json.loads(body.decode("utf-8"))
+
+
+class MemorySessionStore:
+    """Process içi LRU + TTL oturum deposu"""
+
+    def __init__(self, ttl=SESSION_TTL, max_entries=SESSION_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # session_id -> (son erişim, kodlanmış durum)
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if now - entry[0] > self.ttl:
+                del self._entries[session_id]
+                return None
+            self._entries[session_id] = (now, entry[1])
+            self._entries.move_to_end(session_id)
+            blob = entry[1]
+        return decode_state(blob)
+
+    def set(self, session_id, data):
+        blob = encode_state(data)
+        with self._lock:
+            self._entries[session_id] = (time.time(), blob)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def purge_expired(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            # OrderedDict erişim sırasında; en eskiler baştadır
+            while self._entries:
+                session_id, (last_seen, _) = next(iter(self._entries.items()))
+                if last_seen >= cutoff:
+                    break
+                del self._entries[session_id]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteSessionStore:
+    """WAL modunda SQLite üzerinde paylaşılan oturum deposu.
+
+    LRU sırası son yazma zamanına göredir; okuma yalnızca TTL kontrolü
+    yapar, böylece her mesajda fazladan yazma oluşmaz (akış adımları zaten
+    durumu günceller).
+    """
+
+    # Her bu kadar yazmada bir süresi dolanlar ve taşan kayıtlar temizlenir
+    PURGE_EVERY = 200
+
+    def __init__(self, db_path=SESSION_DB_PATH, ttl=SESSION_TTL, max_entries=SESSION_MAX_ENTRIES):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.db = Database(db_path)
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = self.db.writer()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS appointment_session (
+                session_id TEXT PRIMARY KEY,
+                state BLOB NOT NULL,
+                updated_at REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_appointment_session_updated "
+            "ON appointment_session(updated_at)"
+        )
+
+    @timed_query
+    def get(self, session_id):
+        row = self.db.query_one(
+            "SELECT state FROM appointment_session WHERE session_id = ? AND updated_at >= ?",
+            (session_id, time.time() - self.ttl)
+        )
+        return decode_state(row[0]) if row else None
+
+    @timed_query
+    def set(self, session_id, data):
+        self.db.execute(
+            "INSERT INTO appointment_session (session_id, state, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+            (session_id, encode_state(data), time.time())
+        )
+
+        with self._writes_lock:
+            self._writes += 1
+            purge = self._writes % self.PURGE_EVERY == 0
+        if purge:
+            self.purge_expired()
+
+    @timed_query
+    def delete(self, session_id):
+        self.db.execute("DELETE FROM appointment_session WHERE session_id = ?", (session_id,))
+
+    @timed_query
+    def purge_expired(self):
+        """Süresi dolanları sil, üst sınırı aşan en eski kayıtları at"""
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM appointment_session WHERE updated_at < ?", (time.time() - self.ttl,))
+            conn.execute("""
+                DELETE FROM appointment_session WHERE session_id IN (
+                    SELECT session_id FROM appointment_session
+                    ORDER BY updated_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+    def __len__(self):
+        return self.db.query_one("SELECT COUNT(*) FROM appointment_session")[0]
+
+
+def create_session_store():
+    """Ayarlara göre oturum deposunu oluştur"""
+    if SESSION_BACKEND == "memory":
+        return MemorySessionStore()
+    return SQLiteSessionStore()
@@ -0,0 +1,419 @@
+# synthetic_data.py
+"""Performans testleri için üretim ölçeğinde, tekrarlanabilir sentetik veri.
+
+Aynı --seed ile her çalıştırma aynı veritabanını üretir. Her tablo kendi
+tohumundan türetilen ayrı bir random.Random kullanır, böylece bir tablonun
+boyutunu değiştirmek diğerlerinin içeriğini kaydırmaz. Satırlar üreteçlerle
+akar ve parça başına tek işlemde executemany ile yazılır; yükleme sırasında
+dizin/randevu sürüm ve FTS trigger'ları kaldırılır, sonunda migration'ların
+tekrarlanan adımları bunları kurar ve FTS indeksini tek seferde doldurur.
+
+    python -m synthetic_data --db /tmp/perf.db --scale large --seed 42
+    python -m synthetic_data --db /tmp/perf.db --scale small --doctors 20000 --replace
+
+Randevular doktor başına çakışmasız slotlardan (varsayılan hafta içi
+şablonu) seçilir, tahliller kullanıcı başına zaman serisi olarak üretilir.
+"""
+import argparse
+import itertools
+import logging
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from data_access import Database, DB_PATH
+from interactions import STARTER_INTERACTIONS
+from migrations import REPEATABLE_STEPS, run_migrations, verify_query_plans
+from schedule import DEFAULT_DAY_SLOTS
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50_000
+
+SCALES = {
+    "tiny": dict(hospitals=50, doctors=1_000, users=10_000, appointments=20_000,
+                 lab_results=50_000, medicines=1_000, user_medicines=5_000),
+    "small": dict(hospitals=500, doctors=10_000, users=100_000, appointments=200_000,
+                  lab_results=500_000, medicines=5_000, user_medicines=50_000),
+    "medium": dict(hospitals=2_000, doctors=50_000, users=1_000_000, appointments=1_000_000,
+                   lab_results=2_000_000, medicines=15_000, user_medicines=250_000),
+    "large": dict(hospitals=5_000, doctors=100_000, users=3_000_000, appointments=3_000_000,
+                  lab_results=6_000_000, medicines=30_000, user_medicines=750_000),
+}
+
+# Yükleme süresince kaldırılan trigger'ların tabloları (hepsi REPEATABLE_STEPS ile yeniden kurulur)
+LOADED_TABLES = ("department", "hospital", "doctor", "user", "appointments",
+                 "test_result", "medicine", "user_medicine")
+
+DEPARTMENTS = [
+    "Kardiyoloji", "Nöroloji", "Ortopedi", "Dahiliye", "Çocuk Sağlığı",
+    "Göz Hastalıkları", "Dermatoloji", "Psikiyatri", "KBB", "Genel Cerrahi",
+    "Üroloji", "Göğüs Hastalıkları", "Radyoloji", "Fizik Tedavi", "Enfeksiyon",
+    "Kadın Hastalıkları", "Nefroloji", "Endokrinoloji", "Beslenme ve Diyet", "Acil Servis",
+    "Kalp ve Damar Cerrahisi", "Beyin ve Sinir Cerrahisi", "Plastik Cerrahi", "Gastroenteroloji",
+    "Hematoloji", "Tıbbi Onkoloji", "Romatoloji", "Alerji ve İmmünoloji", "Anesteziyoloji",
+    "Nükleer Tıp", "Çocuk Cerrahisi", "Göğüs Cerrahisi", "Ağız ve Diş Sağlığı", "Algoloji",
+    "Geriatri", "Spor Hekimliği", "Tıbbi Genetik", "Çocuk Psikiyatrisi", "Aile Hekimliği", "Patoloji",
+]
+# Her hastanede bulunan temel bölümler (DEPARTMENTS içindeki sıraları)
+CORE_DEPARTMENTS = (0, 3, 4, 9, 19)
+
+# (il, enlem, boylam, nüfus ağırlığı)
+CITIES = [
+    ("İstanbul", 41.015, 28.979, 15.0), ("Ankara", 39.925, 32.855, 6.0), ("İzmir", 38.420, 27.140, 5.0),
+    ("Bursa", 40.190, 29.060, 3.0), ("Antalya", 36.890, 30.710, 3.0), ("Adana", 37.000, 35.320, 2.5),
+    ("Konya", 37.870, 32.480, 2.5), ("Gaziantep", 37.060, 37.380, 2.0), ("Şanlıurfa", 37.160, 38.790, 2.0),
+    ("Kocaeli", 40.770, 29.940, 2.0), ("Mersin", 36.800, 34.640, 2.0), ("Diyarbakır", 37.910, 40.220, 2.0),
+    ("Hatay", 36.200, 36.160, 1.7), ("Manisa", 38.610, 27.430, 1.5), ("Kayseri", 38.720, 35.490, 1.5),
+    ("Samsun", 41.290, 36.330, 1.4), ("Balıkesir", 39.650, 27.880, 1.3), ("Sakarya", 40.780, 30.400, 1.2),
+    ("Van", 38.500, 43.380, 1.2), ("Denizli", 37.780, 29.090, 1.0), ("Trabzon", 41.000, 39.720, 0.9),
+    ("Eskişehir", 39.780, 30.520, 0.9), ("Malatya", 38.350, 38.310, 0.8), ("Erzurum", 39.900, 41.270, 0.8),
+]
+HOSPITAL_KINDS = [
+    ("{city} Devlet Hastanesi", 3), ("{city} Şehir Hastanesi", 1), ("{city} Eğitim ve Araştırma Hastanesi", 1),
+    ("{city} Üniversitesi Hastanesi", 1), ("Özel {brand} {city} Hastanesi", 4), ("{brand} Tıp Merkezi {city}", 3),
+    ("{city} Ağız ve Diş Sağlığı Merkezi", 1),
+]
+HOSPITAL_BRANDS = ["Medica", "Klinik Plus", "Sağlık", "Hayat", "Şifa", "Umut", "Yaşam", "Anadolu", "Park",
+                   "Liv", "Memorial", "Medline", "Kent", "Vita", "Nova", "Merkez", "Güven", "Akdeniz"]
+
+FIRST_NAMES = ["Ahmet", "Mehmet", "Mustafa", "Ali", "Hüseyin", "Hasan", "İbrahim", "Murat", "Emre", "Can",
+               "Kemal", "Okan", "Cem", "Kerem", "Selim", "Burak", "Onur", "Yusuf", "Ömer", "Eren",
+               "Ayşe", "Fatma", "Emine", "Hatice", "Zeynep", "Elif", "Merve", "Selin", "Derya", "Seda",
+               "Ebru", "Yasemin", "Melis", "Büşra", "Esra", "Gül", "Özlem", "Sibel", "Deniz", "İrem"]
+LAST_NAMES = ["Yılmaz", "Kaya", "Demir", "Şahin", "Çelik", "Yıldız", "Yıldırım", "Öztürk", "Aydın", "Özdemir",
+              "Arslan", "Doğan", "Kılıç", "Aslan", "Çetin", "Kara", "Koç", "Kurt", "Özkan", "Şimşek",
+              "Polat", "Korkmaz", "Aksoy", "Taş", "Acar", "Uysal", "Sarı", "Deniz", "Güneş", "Bulut"]
+DOCTOR_TITLES = [("Prof. Dr.", 1), ("Doç. Dr.", 2), ("Uz. Dr.", 5), ("Op. Dr.", 2), ("Dr.", 3)]
+
+# (test, tür, birim, referans alt, referans üst, popülasyon ortalaması, standart sapma, ondalık)
+LAB_TESTS = [
+    ("Hemoglobin", "Hemogram", "g/dL", 12, 16, 14, 1.6, 1),
+    ("Lökosit", "Hemogram", "10^3/uL", 4, 10, 7, 2, 1),
+    ("Trombosit", "Hemogram", "10^3/uL", 150, 400, 260, 70, 0),
+    ("Glukoz", "Biyokimya", "mg/dL", 70, 99, 95, 18, 0),
+    ("HbA1c", "Biyokimya", "%", 4, 5.6, 5.6, 0.9, 1),
+    ("Kolesterol", "Biyokimya", "mg/dL", 125, 200, 185, 35, 0),
+    ("Üre", "Biyokimya", "mg/dL", 10, 50, 30, 10, 0),
+    ("Kreatinin", "Biyokimya", "mg/dL", 0.6, 1.2, 0.9, 0.25, 2),
+    ("ALT", "Biyokimya", "U/L", 7, 56, 30, 15, 0),
+    ("TSH", "Hormon", "mIU/L", 0.4, 4.0, 2.0, 1.1, 2),
+    ("Ferritin", "Biyokimya", "ng/mL", 30, 400, 120, 80, 0),
+    ("D Vitamini", "Vitamin", "ng/mL", 30, 100, 25, 12, 1),
+]
+
+# (etken madde, endikasyon, reçeteli mi, mg dozları)
+INGREDIENTS = [
+    ("Parasetamol", "Baş ağrısı, ateş, kas ağrıları", False, (500, 1000)),
+    ("İbuprofen", "Ağrı, ateş, romatizmal iltihap", False, (200, 400, 600)),
+    ("Asetilsalisilik asit", "Ağrı, ateş; düşük dozda kalp krizi önleme", False, (100, 300, 500)),
+    ("Naproksen", "Eklem ve kas ağrıları, adet sancısı", False, (275, 550)),
+    ("Setirizin", "Alerjik nezle, kaşıntı, ürtiker", False, (10,)),
+    ("Loratadin", "Mevsimsel alerji, burun akıntısı", False, (10,)),
+    ("Psödoefedrin", "Burun tıkanıklığı, soğuk algınlığı", False, (60, 120)),
+    ("Dekstrometorfan", "Kuru öksürük", False, (15, 30)),
+    ("Guaifenesin", "Balgamlı öksürük", False, (100, 200)),
+    ("Famotidin", "Mide yanması, hazımsızlık", False, (20, 40)),
+    ("Simetikon", "Gaz, şişkinlik", False, (40, 80)),
+    ("Loperamid", "Akut ishal", False, (2,)),
+    ("Amoksisilin", "Üst solunum yolu enfeksiyonları, idrar yolu enfeksiyonları", True, (250, 500, 1000)),
+    ("Klaritromisin", "Solunum yolu ve cilt enfeksiyonları", True, (250, 500)),
+    ("Siprofloksasin", "İdrar yolu ve bağırsak enfeksiyonları", True, (250, 500, 750)),
+    ("Varfarin", "Pıhtılaşmanın önlenmesi, derin ven trombozu", True, (1, 3, 5)),
+    ("Metotreksat", "Romatoid artrit, sedef hastalığı", True, (2, 5, 10)),
+    ("Simvastatin", "Yüksek kolesterol", True, (10, 20, 40)),
+    ("Atorvastatin", "Yüksek kolesterol, kalp-damar hastalığı önleme", True, (10, 20, 40, 80)),
+    ("Metformin", "Tip 2 diyabet", True, (500, 850, 1000)),
+    ("Amlodipin", "Yüksek tansiyon, göğüs ağrısı", True, (5, 10)),
+    ("Ramipril", "Yüksek tansiyon, kalp yetmezliği", True, (2, 5, 10)),
+    ("Lansoprazol", "Mide ülseri, reflü", True, (15, 30)),
+    ("Pantoprazol", "Reflü, mide ülseri", True, (20, 40)),
+    ("Teofilin", "Astım, KOAH", True, (200, 300)),
+    ("Levotiroksin", "Hipotiroidi", True, (25, 50, 100)),
+    ("Sertralin", "Depresyon, anksiyete", True, (50, 100)),
+    ("Montelukast", "Astım, alerjik rinit", True, (4, 10)),
+]
+MEDICINE_FORMS = ["Tablet", "Film Tablet", "Kapsül", "Şurup", "Efervesan Tablet", "Süspansiyon", "Jel"]
+MANUFACTURERS = ["ABC İlaç", "XYZ İlaç", "Anadolu Farma", "Deva", "Nobel", "Bilim", "Abdi İbrahim",
+                 "Sanovel", "Atabay", "İlko", "Koçak", "World Medicine"]
+BRAND_SYLLABLES = ["par", "vol", "nu", "dex", "ra", "mo", "ta", "lin", "ver", "ko", "sil", "fen",
+                   "ma", "tor", "zel", "ri", "na", "gro", "pen", "do", "xa", "lo", "mi", "sta"]
+
+
+def _rng(seed, table):
+    return random.Random(f"{seed}:{table}")
+
+
+def person_name(index):
+    """ID'den türetilen ad (randevudaki hasta adı için kullanıcı listesi tutulmaz)"""
+    first = FIRST_NAMES[index % len(FIRST_NAMES)]
+    last = LAST_NAMES[(index // len(FIRST_NAMES) + index * 7) % len(LAST_NAMES)]
+    return f"{first} {last}"
+
+
+def _weighted(rng, pairs):
+    values, weights = zip(*pairs)
+    return rng.choices(values, weights)[0]
+
+
+def generate_departments():
+    return [(str(i).zfill(3), name, "🏥") for i, name in enumerate(DEPARTMENTS, start=1)]
+
+
+def generate_hospitals(rng, count):
+    """Hastane satırları ve hastane başına (ağırlık, bölüm ID'leri)"""
+    rows, profiles, seen = [], [], {}
+    city_weights = [city[3] for city in CITIES]
+    department_ids = [department[0] for department in generate_departments()]
+    for hospital_id in range(1, count + 1):
+        city, lat, lon, _ = rng.choices(CITIES, city_weights)[0]
+        template = _weighted(rng, HOSPITAL_KINDS)
+        name = template.format(city=city, brand=rng.choice(HOSPITAL_BRANDS))
+        seen[name] = seen.get(name, 0) + 1
+        if seen[name] > 1:
+            name = f"{name} {seen[name]}"
+        latitude = round(rng.gauss(lat, 0.08), 6)
+        longitude = round(rng.gauss(lon, 0.10), 6)
+        rows.append((hospital_id, name, f"{rng.randint(1, 250)}. Sokak, {city}",
+                     f"{rng.randint(1, 30)} km", f"{rng.triangular(3.0, 5.0, 4.3):.1f}", latitude, longitude))
+
+        # Büyük hastanelerde daha çok bölüm ve doktor
+        size = rng.lognormvariate(0, 0.8)
+        extra = min(len(department_ids) - len(CORE_DEPARTMENTS), int(size * 8))
+        others = [d for i, d in enumerate(department_ids) if i not in CORE_DEPARTMENTS]
+        departments = [department_ids[i] for i in CORE_DEPARTMENTS] + rng.sample(others, extra)
+        profiles.append((size, departments))
+    return rows, profiles
+
+
+def generate_doctors(rng, count, hospital_profiles):
+    """Doktor satırları; hastaneler büyüklükleriyle orantılı seçilir"""
+    cumulative = list(itertools.accumulate(size for size, _ in hospital_profiles))
+    hospital_indexes = rng.choices(range(len(hospital_profiles)), cum_weights=cumulative, k=count)
+    rows = []
+    for doctor_id, hospital_index in enumerate(hospital_indexes, start=1):
+        departments = hospital_profiles[hospital_index][1]
+        name = f"{_weighted(rng, DOCTOR_TITLES)} {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        rows.append((doctor_id, name, f"{rng.randint(1, 35)} yıl", f"{rng.triangular(3.0, 5.0, 4.4):.1f}",
+                     rng.choice(departments), hospital_index + 1))
+    return rows
+
+
+def generate_users(count):
+    for user_id in range(1, count + 1):
+        yield (user_id, str(10_000_000_000 + user_id), person_name(user_id),
+               f"kullanici{user_id}@ornek.com", "sifre123")
+
+
+def _working_days(start, end):
+    day, days = start, []
+    while day <= end:
+        if day.weekday() < 5:
+            days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+def generate_appointments(rng, count, doctors, user_count, today, past_days=180, future_days=60):
+    """Doktor başına çakışmasız slotlar; popüler doktorlar daha dolu"""
+    days = _working_days(today - timedelta(days=past_days), today + timedelta(days=future_days))
+    today_text = today.isoformat()
+    now = datetime.combine(today, datetime.min.time()) + timedelta(hours=12)
+    slots = DEFAULT_DAY_SLOTS
+    capacity = len(days) * len(slots)
+
+    popularity = [rng.lognormvariate(0, 0.75) for _ in doctors]
+    scale = count / sum(popularity)
+    for doctor, weight in zip(doctors, popularity):
+        doctor_id, _, _, _, department_id, hospital_id = doctor
+        booked = min(capacity, int(weight * scale + rng.random()))
+        for position in sorted(rng.sample(range(capacity), booked)):
+            day = days[position // len(slots)]
+            user_id = rng.randint(1, user_count)
+            status = "cancelled" if rng.random() < (0.10 if day < today_text else 0.03) else "active"
+            created = min(now, datetime.fromisoformat(day) - timedelta(days=rng.randint(1, 30),
+                                                                    minutes=rng.randint(0, 1439)))
+            yield (person_name(user_id), department_id, hospital_id, doctor_id, day,
+                   slots[position % len(slots)], status, created.strftime("%Y-%m-%d %H:%M:%S"), user_id)
+
+
+def generate_lab_results(rng, count, user_count, today, coverage=0.4):
+    """Kullanıcı başına 1-3 testin zaman serisi; kişisel taban değer + ölçüm gürültüsü"""
+    per_user = max(1.0, count / max(1, user_count * coverage))
+    produced = 0
+    user_id = 0
+    while produced < count:
+        user_id = user_id % user_count + 1
+        if rng.random() > coverage:
+            continue
+        total = min(count - produced, max(1, round(rng.expovariate(1 / per_user))))
+        tests = rng.sample(LAB_TESTS, min(len(LAB_TESTS), rng.randint(1, 3)))
+        series = [(test, rng.gauss(test[5], test[6] * 0.7), today) for test in tests]
+        for i in range(total):
+            test, baseline, last_date = series[i % len(series)]
+            name, test_type, unit, low, high, _, sd, digits = test
+            value = max(round(baseline + rng.gauss(0, sd * 0.4), digits), 10 ** -digits)
+            test_date = last_date - timedelta(days=rng.randint(20, 120))
+            series[i % len(series)] = (test, baseline, test_date)
+            status = "Normal" if low <= value <= high else "Uyarı"
+            yield (user_id, test_type, name, f"{value:.{digits}f}", value, unit, status,
+                   f"{low}-{high}", float(low), float(high), test_date.isoformat())
+        produced += total
+
+
+def _brand(rng):
+    return "".join(rng.choice(BRAND_SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+
+
+def generate_medicines(rng, count):
+    # Başlangıç etkileşim listesindeki maddeler de katalogda bulunsun
+    ingredients = INGREDIENTS + [(name, "Çeşitli endikasyonlar", True, (10, 50))
+                                 for pair in STARTER_INTERACTIONS for name in pair[:2]
+                                 if name not in {i[0] for i in INGREDIENTS}]
+    for medicine_id in range(1, count + 1):
+        ingredient, indication, prescription, doses = rng.choice(ingredients)
+        form = rng.choice(MEDICINE_FORMS)
+        name = f"{_brand(rng)} {rng.choice(doses)} mg {form}"
+        usage = f"{ingredient} içerir. {indication} için hekimin önerdiği dozda kullanılır."
+        warning = "Hamilelik ve emzirme döneminde doktora danışılmalıdır." if rng.random() < 0.5 \
+            else "Alerjik reaksiyon görülürse kullanımı bırakınız."
+        yield (medicine_id, name, ingredient, rng.choice(MANUFACTURERS), f"{rng.uniform(15, 900):.2f} TL",
+               prescription, rng.choice(["Yeterli", "Orta", "Az", "Tükendi"]), usage, warning, indication)
+
+
+def generate_user_medicines(rng, count, user_count, medicine_count, today):
+    for _ in range(count):
+        timestamp = datetime.combine(today, datetime.min.time()) - timedelta(minutes=rng.randint(0, 525_600))
+        yield (rng.randint(1, user_count), rng.randint(1, medicine_count), rng.random() < 0.3,
+               rng.random() < 0.6, timestamp.strftime("%Y-%m-%d %H:%M:%S.%f"))
+
+
+INSERTS = {
+    "department": "INSERT INTO department (id, name, icon) VALUES (?, ?, ?)",
+    "hospital": "INSERT INTO hospital (id, name, location, distance, rating, latitude, longitude) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+    "doctor": "INSERT INTO doctor (id, name, experience, rating, department_id, hospital_id) "
+              "VALUES (?, ?, ?, ?, ?, ?)",
+    "user": "INSERT INTO user (id, tc_no, name, email, password) VALUES (?, ?, ?, ?, ?)",
+    "appointments": "INSERT INTO appointments (patient_name, department_id, hospital_id, doctor_id, "
+                    "appointment_date, appointment_time, status, created_at, user_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "test_result": "INSERT INTO test_result (user_id, test_type, test_name, value, value_num, unit, status, "
+                   "range_info, ref_low, ref_high, test_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "medicine": "INSERT INTO medicine (id, name, active_ingredient, manufacturer, price, prescription, "
+                "stock, usage, warning, indication) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "user_medicine": "INSERT INTO user_medicine (user_id, medicine_id, favorited, ordered, timestamp) "
+                     "VALUES (?, ?, ?, ?, ?)",
+}
+
+
+def bulk_insert(conn, table, rows, batch_size=BATCH_SIZE):
+    """Satırları batch_size'lık işlemlerde executemany ile yaz; yazılan satır sayısını döner"""
+    started = time.perf_counter()
+    rows = iter(rows)
+    written = 0
+    while True:
+        chunk = list(itertools.islice(rows, batch_size))
+        if not chunk:
+            break
+        conn.execute("BEGIN")
+        conn.executemany(INSERTS[table], chunk)
+        conn.execute("COMMIT")
+        written += len(chunk)
+    seconds = time.perf_counter() - started
+    logger.info(f"{table}: {written} satır, {seconds:.1f} sn ({written / seconds if seconds else 0:,.0f} satır/sn)")
+    return written
+
+
+def prepare_schema(db_path):
+    """ORM tabloları + migration'lar; hedef tablolar boş olmalı"""
+    from sqlalchemy import create_engine
+    from db.hospital import db
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    conn = Database(db_path).connect()
+    run_migrations(conn)
+    filled = [table for table in LOADED_TABLES
+              if conn.execute(f'SELECT 1 FROM "{table}" LIMIT 1').fetchone() is not None]
+    if filled:
+        conn.close()
+        raise SystemExit(f"Hedef veritabanında veri var ({', '.join(filled)}); --replace ile yeniden oluşturun.")
+    return conn
+
+
+def drop_load_triggers(conn):
+    """Satır başına çalışan sürüm ve FTS trigger'larını kaldır (sonra yeniden kurulur)"""
+    placeholders = ", ".join("?" * len(LOADED_TABLES))
+    names = [row[0] for row in conn.execute(
+        f"SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ({placeholders})", LOADED_TABLES)]
+    for name in names:
+        conn.execute(f'DROP TRIGGER "{name}"')
+    return names
+
+
+def generate(db_path, sizes, seed=42, batch_size=BATCH_SIZE, today=None):
+    """Tüm tabloları üret; tablo başına yazılan satır sayılarını döner"""
+    today = today or date.today()
+    started = time.perf_counter()
+    conn = prepare_schema(db_path)
+    drop_load_triggers(conn)
+    conn.execute("PRAGMA synchronous=OFF")
+
+    counts = {"department": bulk_insert(conn, "department", generate_departments(), batch_size)}
+    hospitals, profiles = generate_hospitals(_rng(seed, "hospital"), sizes["hospitals"])
+    counts["hospital"] = bulk_insert(conn, "hospital", hospitals, batch_size)
+    doctors = generate_doctors(_rng(seed, "doctor"), sizes["doctors"], profiles)
+    counts["doctor"] = bulk_insert(conn, "doctor", doctors, batch_size)
+    counts["user"] = bulk_insert(conn, "user", generate_users(sizes["users"]), batch_size)
+    counts["appointments"] = bulk_insert(conn, "appointments", generate_appointments(
+        _rng(seed, "appointments"), sizes["appointments"], doctors, sizes["users"], today), batch_size)
+    counts["test_result"] = bulk_insert(conn, "test_result", generate_lab_results(
+        _rng(seed, "test_result"), sizes["lab_results"], sizes["users"], today), batch_size)
+    counts["medicine"] = bulk_insert(conn, "medicine", generate_medicines(
+        _rng(seed, "medicine"), sizes["medicines"]), batch_size)
+    counts["user_medicine"] = bulk_insert(conn, "user_medicine", generate_user_medicines(
+        _rng(seed, "user_medicine"), sizes["user_medicines"], sizes["users"], sizes["medicines"], today), batch_size)
+
+    # Trigger'lar, FTS indeksi (trigger'lar eksik olduğundan baştan doldurulur) ve indeksler
+    conn.execute("PRAGMA synchronous=NORMAL")
+    for step in REPEATABLE_STEPS:
+        step(conn)
+    conn.execute("UPDATE data_version SET version = version + 1")
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    problems = verify_query_plans(conn)
+    conn.close()
+    for problem in problems:
+        logger.warning(problem)
+    logger.info(f"Toplam süre: {time.perf_counter() - started:.1f} sn")
+    return counts
+
+
+def _remove_database(db_path):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    parser = argparse.ArgumentParser(description="Performans testleri için sentetik veritabanı üret")
+    parser.add_argument("--db", default=DB_PATH, help="hedef veritabanı (varsayılan MEDVICE_DB_PATH)")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--replace", action="store_true", help="hedef dosyayı silip baştan oluştur")
+    for name in SCALES["small"]:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, help=f"{name} sayısı (ölçeği ezer)")
+    args = parser.parse_args()
+
+    sizes = dict(SCALES[args.scale])
+    sizes.update({name: getattr(args, name) for name in sizes if getattr(args, name) is not None})
+    if args.replace:
+        _remove_database(args.db)
+    result = generate(args.db, sizes, args.seed, args.batch_size)
+    print(", ".join(f"{table}: {count:,}" for table, count in result.items()))
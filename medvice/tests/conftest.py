@@ -0,0 +1,6 @@
+# tests/conftest.py
+# Modüller medvice/ altında düz duruyor; testler `python -m pytest` ile her dizinden çalışsın
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
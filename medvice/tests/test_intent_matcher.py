@@ -0,0 +1,26 @@
+# tests/test_intent_matcher.py
+"""Sohbet randevu akışının cevap sınıflandırması.
+
+Akışı kilitleyen eski hata: tek alternasyonda "evet" yalnızca 'confirm'
+sayılıyordu, son onayda ve bölüm onayında cevap tanınmıyordu.
+"""
+import pytest
+
+from intent_matcher import classify_reply
+
+FINAL = ('decline', 'final_confirm')
+DEPARTMENT = ('alternative', 'decline', 'confirm')
+
+
+@pytest.mark.parametrize("message, options, expected", [
+    ("evet", FINAL, 'final_confirm'),
+    ("tamam", FINAL, 'final_confirm'),
+    ("evet, oluştur", FINAL, 'final_confirm'),
+    ("hayır, iptal et", FINAL, 'decline'),
+    ("randevu al", DEPARTMENT, 'confirm'),
+    ("evet", DEPARTMENT, 'confirm'),
+    ("randevu almak istemiyorum", DEPARTMENT, 'decline'),
+    ("başka bölüm", DEPARTMENT, 'alternative'),
+])
+def test_classify_reply(message, options, expected):
+    assert classify_reply(message, options) == expected
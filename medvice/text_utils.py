@@ -0,0 +1,81 @@
+# text_utils.py
+"""Türkçe metin normalizasyonu yardımcıları.
+
+str.lower() Türkçe'de hatalıdır: "İ".lower() -> "i̇" (noktalı birleşik
+karakter), "I".lower() -> "i" (olması gereken "ı"). Arama ve eşleştirme
+için önce Türkçe kurallarıyla küçük harfe çevirip ardından diakritikleri
+katlıyoruz: "Göğüs Hastalıkları" -> "gogus hastaliklari".
+"""
+import re
+
+_TR_UPPER_TO_LOWER = str.maketrans({"İ": "i", "I": "ı"})
+_TR_FOLD = str.maketrans({
+    "ç": "c", "ğ": "g", "ı": "i", "ö": "o", "ş": "s", "ü": "u",
+    "â": "a", "î": "i", "û": "u", "̇": None,
+})
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def turkish_lower(text):
+    """Türkçe kurallarıyla küçük harfe çevir (İ->i, I->ı)"""
+    return (text or "").translate(_TR_UPPER_TO_LOWER).lower()
+
+
+def turkish_fold(text):
+    """Küçük harf + diakritik katlama; karşılaştırma anahtarı olarak kullanılır"""
+    return turkish_lower(text).translate(_TR_FOLD)
+
+
+def fold_tokens(text):
+    """Katlanmış metni kelimelere ayır"""
+    return _TOKEN_RE.findall(turkish_fold(text))
+
+
+_MONTHS = {
+    "ocak": 1, "subat": 2, "mart": 3, "nisan": 4, "mayis": 5, "haziran": 6,
+    "temmuz": 7, "agustos": 8, "eylul": 9, "ekim": 10, "kasim": 11, "aralik": 12,
+}
+_MONTH_DATE_RE = re.compile(r"\b(\d{1,2})\s+(" + "|".join(_MONTHS) + r")\w*(?:\s+(\d{4}))?")
+_NUMERIC_DATE_RE = re.compile(r"\b(\d{1,2})[./](\d{1,2})(?:[./](\d{4}))?\b")
+_ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+
+
+def parse_turkish_date(text, today):
+    """`15 Ağustos`, `15.08`, `2025-08-15` gibi ifadelerden tarih çıkar; yoksa None.
+
+    Yıl verilmemişse ve tarih geçmişte kalıyorsa bir sonraki yıl varsayılır;
+    yılıyla birlikte verilen geçmiş tarih için None döner.
+    """
+    folded = turkish_fold(text)
+    year = None
+    match = _ISO_DATE_RE.search(folded)
+    if match:
+        year, month, day = (int(g) for g in match.groups())
+    else:
+        match = _MONTH_DATE_RE.search(folded)
+        if match:
+            day, month = int(match.group(1)), _MONTHS[match.group(2)]
+            year = int(match.group(3)) if match.group(3) else None
+        else:
+            match = _NUMERIC_DATE_RE.search(folded)
+            if not match:
+                return None
+            day, month = int(match.group(1)), int(match.group(2))
+            year = int(match.group(3)) if match.group(3) else None
+
+    if year is not None:
+        try:
+            parsed = today.replace(year=year, month=month, day=day)
+        except ValueError:
+            return None
+        # Gün düzeyinde karşılaştırma: today datetime ise saat farkı bugünü geçmiş saydırmasın
+        return parsed if (year, month, day) >= (today.year, today.month, today.day) else None
+    # Yıl verilmediyse bugün veya sonraki ilk geçerli yıl ("29 Şubat" bir sonraki artık yıla kayar)
+    for candidate in range(today.year, today.year + 9):
+        try:
+            parsed = today.replace(year=candidate, month=month, day=day)
+        except ValueError:
+            continue
+        if parsed >= today:
+            return parsed
+    return None
@@ -0,0 +1,256 @@
+# tracing.py
+"""İstek bazlı trace/span kaydı.
+
+Her istek için bir trace ID üretilir (veya gelen `traceparent` /
+`X-Trace-Id` başlığından alınır) ve contextvars ile ask_question,
+search_similar, Gemini çağrısı ve randevu akışı boyunca taşınır.
+Örneklenen trace'ler OTLP/JSON uyumlu satırlar halinde dönen (rotating)
+bir dosyaya yazılır. Yavaş istekler örnekleme oranından bağımsız olarak
+her zaman yazılır, böylece kuyruk gecikmeleri sonradan incelenebilir.
+"""
+import contextvars
+import json
+import logging
+import os
+import random
+import re
+import secrets
+import time
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+from flask import Blueprint, g, request
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+# Ayarlar (ortam değişkenleriyle değiştirilebilir)
+SAMPLE_RATE = float(os.getenv("MEDVICE_TRACE_SAMPLE_RATE", "0.1"))
+SLOW_THRESHOLD_MS = float(os.getenv("MEDVICE_TRACE_SLOW_MS", "2000"))
+TRACE_FILE = os.getenv("MEDVICE_TRACE_FILE", os.path.join(BASE_DIR, "traces", "spans.jsonl"))
+TRACE_FILE_MAX_BYTES = int(os.getenv("MEDVICE_TRACE_FILE_MAX_BYTES", str(10 * 1024 * 1024)))
+TRACE_FILE_BACKUPS = int(os.getenv("MEDVICE_TRACE_FILE_BACKUPS", "5"))
+SERVICE_NAME = "medvice"
+
+TRACE_ID_HEADER = "X-Trace-Id"
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+tracing_page = Blueprint('tracing_page', __name__)
+
+_current_trace = contextvars.ContextVar("medvice_trace", default=None)
+_current_span = contextvars.ContextVar("medvice_span", default=None)
+
+_span_logger = None
+
+
+def _get_span_logger():
+    """Trace dosyasına yazan logger'ı ilk kullanımda oluştur"""
+    global _span_logger
+    if _span_logger is None:
+        os.makedirs(os.path.dirname(TRACE_FILE), exist_ok=True)
+        handler = RotatingFileHandler(
+            TRACE_FILE, maxBytes=TRACE_FILE_MAX_BYTES,
+            backupCount=TRACE_FILE_BACKUPS, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        span_logger = logging.getLogger("medvice.traces")
+        span_logger.setLevel(logging.INFO)
+        span_logger.propagate = False
+        span_logger.addHandler(handler)
+        _span_logger = span_logger
+    return _span_logger
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes):
+    return [{"key": key, "value": _otlp_value(value)}
+            for key, value in attributes.items() if value is not None]
+
+
+class Span:
+    """Tek bir zamanlanmış işlem"""
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error", "kind")
+
+    # OTLP SpanKind: 1 = INTERNAL, 2 = SERVER
+    def __init__(self, name, parent_id, attributes, kind=1):
+        self.name = name
+        self.kind = kind
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def to_otlp(self, trace_id):
+        data = {
+            "traceId": trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            data["parentSpanId"] = self.parent_id
+        return data
+
+
+class _NoopSpan:
+    """Trace bağlamı dışında kullanılan boş span"""
+    span_id = None
+
+    def set_attribute(self, key, value):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class TraceContext:
+    """Bir isteğe ait trace ID, örnekleme kararı ve span listesi"""
+
+    def __init__(self, trace_id=None, parent_span_id=None, sampled=None):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.parent_span_id = parent_span_id
+        self.sampled = random.random() < SAMPLE_RATE if sampled is None else sampled
+        self.spans = []
+
+    def export(self):
+        """Span'leri OTLP/JSON (ExportTraceServiceRequest) formatında yaz"""
+        if not self.spans:
+            return
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+                "scopeSpans": [{
+                    "scope": {"name": "medvice.tracing"},
+                    "spans": [span.to_otlp(self.trace_id) for span in self.spans],
+                }],
+            }]
+        }
+        _get_span_logger().info(json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+
+
+def current_trace_id():
+    """Aktif trace ID'si (istek dışında None)"""
+    trace = _current_trace.get()
+    return trace.trace_id if trace else None
+
+
+def force_sample():
+    """Aktif trace'in örnekleme oranından bağımsız olarak yazılmasını sağla"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.sampled = True
+
+
+@contextmanager
+def span(name, **attributes):
+    """`with span('rag.search_similar', top_k=5) as s:` şeklinde span kaydı"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield _NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    current = Span(name, parent.span_id if parent else trace.parent_span_id, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        trace.spans.append(current)
+
+
+def start_trace(trace_id=None, parent_span_id=None, sampled=None):
+    """Yeni trace bağlamı başlat; finish_trace'e verilecek token döner"""
+    trace = TraceContext(trace_id, parent_span_id, sampled)
+    return trace, _current_trace.set(trace)
+
+
+def finish_trace(trace, token, duration_ms):
+    """Trace'i kapat; örneklendiyse ya da yavaşsa dosyaya yaz"""
+    _current_trace.reset(token)
+    if trace.sampled or duration_ms >= SLOW_THRESHOLD_MS:
+        try:
+            trace.export()
+        except OSError as e:
+            logging.getLogger(__name__).warning(f"Trace yazılamadı: {e}")
+
+
+def _trace_from_headers(headers):
+    """traceparent veya X-Trace-Id başlığından trace bilgisi çıkar"""
+    traceparent = headers.get("traceparent", "").strip().lower()
+    match = _TRACEPARENT_RE.match(traceparent)
+    if match:
+        trace_id, parent_id, flags = match.groups()
+        sampled = True if int(flags, 16) & 1 else None
+        return trace_id, parent_id, sampled
+
+    trace_id = headers.get(TRACE_ID_HEADER, "").strip().lower()
+    if re.fullmatch(r"[0-9a-f]{32}", trace_id):
+        return trace_id, None, None
+    return None, None, None
+
+
+# ==================== HTTP HOOK'LARI ====================
+
+@tracing_page.before_app_request
+def _begin_request_trace():
+    trace_id, parent_id, sampled = _trace_from_headers(request.headers)
+    trace, token = start_trace(trace_id, parent_id, sampled)
+    root = Span(f"{request.method} {request.path}", trace.parent_span_id, {
+        "http.method": request.method,
+        "http.target": request.path,
+    }, kind=2)
+    g._trace = (trace, token, root, _current_span.set(root))
+
+
+@tracing_page.after_app_request
+def _end_request_trace(response):
+    state = g.pop('_trace', None)
+    if state is None:
+        return response
+    trace, token, root, span_token = state
+
+    root.end_ns = time.time_ns()
+    if request.url_rule:
+        root.name = f"{request.method} {request.url_rule.rule}"
+        root.set_attribute("http.route", request.url_rule.rule)
+    root.set_attribute("http.status_code", response.status_code)
+    if response.status_code >= 500:
+        root.error = f"HTTP {response.status_code}"
+    trace.spans.append(root)
+
+    _current_span.reset(span_token)
+    finish_trace(trace, token, (root.end_ns - root.start_ns) / 1e6)
+    response.headers[TRACE_ID_HEADER] = trace.trace_id
+    return response
+
+
+@tracing_page.teardown_app_request
+def _discard_request_trace(exc):
+    # after_request çalışmadıysa (yakalanmamış hata) bağlamı sızdırma
+    state = g.pop('_trace', None)
+    if state is not None:
+        trace, token, root, span_token = state
+        _current_span.reset(span_token)
+        _current_trace.reset(token)
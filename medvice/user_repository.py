@@ -0,0 +1,120 @@
+# user_repository.py
+"""Kullanıcı kimlik sorguları için tek depo ve okuma önbelleği.
+
+id, tc_no ve ad ile yapılan aramalar tek sorguyla tüm kullanıcı satırını
+getirir ve aynı kayıt üç anahtarla da sınırlı bir LRU önbelleğe konur.
+Depo üzerinden yapılan yazmalar ilgili kaydı önbellekten düşer; başka
+worker'daki yazmalar için kayıtlar kısa bir TTL sonunda yeniden okunur.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import has_request_context, session
+
+from data_access import query_one, execute
+from metrics import record_cache, timed_query
+
+USER_CACHE_SIZE = int(os.getenv("MEDVICE_USER_CACHE_SIZE", "1024"))  # kullanıcı sayısı
+USER_CACHE_TTL = float(os.getenv("MEDVICE_USER_CACHE_TTL", "60"))  # saniye
+
+USER_COLUMNS = ("id", "tc_no", "name", "email", "password")
+LOOKUP_KEYS = ("id", "tc_no", "name")
+WRITABLE_COLUMNS = ("tc_no", "name", "email", "password")
+
+
+class UserRepository:
+    """id / tc_no / ad ile okuma önbellekli kullanıcı erişimi"""
+
+    def __init__(self, max_users=USER_CACHE_SIZE, ttl=USER_CACHE_TTL):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user_id -> (yüklenme zamanı, kullanıcı)
+        self._keys = {}  # ('tc_no', '123...') -> user_id
+        self._lock = threading.Lock()
+
+    def _cached(self, key, value):
+        with self._lock:
+            user_id = value if key == "id" else self._keys.get((key, value))
+            entry = self._entries.get(user_id)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def _store(self, user):
+        with self._lock:
+            self._drop(user["id"])
+            self._entries[user["id"]] = (time.monotonic(), user)
+            for key in ("tc_no", "name"):
+                self._keys[(key, user[key])] = user["id"]
+            while len(self._entries) > self.max_users:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            for key in ("tc_no", "name"):
+                if self._keys.get((key, entry[1][key])) == user_id:
+                    del self._keys[(key, entry[1][key])]
+
+    @timed_query
+    def _load(self, key, value):
+        row = query_one(f"SELECT {', '.join(USER_COLUMNS)} FROM user WHERE {key} = ?", (value,))
+        return dict(zip(USER_COLUMNS, row)) if row else None
+
+    def _get(self, key, value):
+        if value is None:
+            return None
+        user = self._cached(key, value)
+        record_cache("user", user is not None)
+        if user is None:
+            user = self._load(key, value)
+            if user is not None:
+                self._store(user)
+        return dict(user) if user else None
+
+    def by_id(self, user_id):
+        return self._get("id", int(user_id))
+
+    def by_tc_no(self, tc_no):
+        return self._get("tc_no", tc_no)
+
+    def by_name(self, name):
+        return self._get("name", name)
+
+    def update(self, user_id, **fields):
+        """Kullanıcıyı güncelle ve önbellekten düş"""
+        columns = [column for column in fields if column in WRITABLE_COLUMNS]
+        if not columns:
+            return
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        execute(f"UPDATE user SET {assignments} WHERE id = ?", (*[fields[c] for c in columns], user_id))
+        self.invalidate(user_id)
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+                self._keys.clear()
+            else:
+                self._drop(int(user_id))
+
+
+user_repository = UserRepository()
+
+
+def public_user(user):
+    """Oturuma konacak alanlar (şifre hariç)"""
+    return {"id": user["id"], "name": user["name"], "tc_no": user["tc_no"], "email": user["email"]}
+
+
+def session_user(user_id):
+    """Giriş yapmış kullanıcı istenen kullanıcıysa oturumdaki kaydı, değilse önbellekteki kaydı döner"""
+    if has_request_context():
+        current = session.get("user")
+        if current and current.get("id") == user_id:
+            return current
+    user = user_repository.by_id(user_id)
+    return public_user(user) if user else None